@@ -0,0 +1,83 @@
+"""
+Compare the sync and async read endpoints under concurrent, slow clients.
+
+Start the backend under an ASGI server with a single worker, e.g.
+
+    uvicorn chemical_equipment_api.asgi:application --workers 1
+
+then run, from the backend directory,
+
+    python -m benchmarks.async_concurrency --concurrency 64 --read-delay 0.05
+
+Every client fires the same request at /api/datasets/... and at
+/api/async/datasets/...; the script reports throughput and latency for each.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .client import ApiClient
+from .stats import summarize
+
+SAMPLE_CSV = Path(__file__).resolve().parents[2] / 'sample_equipment_data.csv'
+
+ENDPOINTS = {
+    'list': '/datasets/',
+    'summary': '/datasets/{id}/summary/',
+    'aggregates': '/datasets/{id}/aggregates/',
+    'equipment': '/datasets/{id}/equipment/',
+}
+
+
+def run_mode(base_url, token, path, concurrency, total, read_delay):
+    def one(_):
+        status, _, elapsed = ApiClient(base_url, token).request('GET', path, read_delay=read_delay)
+        return status, elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed for status, elapsed in results if status == 200]
+    return {
+        'path': path,
+        'requests': total,
+        'errors': sum(1 for status, _ in results if status != 200),
+        'wall_s': wall,
+        'throughput_rps': total / wall,
+        'latency': summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000/api')
+    parser.add_argument('--username', default='bench')
+    parser.add_argument('--password', default='bench-pass-123')
+    parser.add_argument('--csv', type=Path, default=SAMPLE_CSV, help='CSV uploaded as the test dataset')
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='summary')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--read-delay', type=float, default=0.0,
+                        help='seconds to sleep between 16 KiB response reads, simulating slow clients')
+    args = parser.parse_args()
+
+    client = ApiClient(args.url)
+    client.login_or_register(args.username, args.password)
+    status, body, _ = client.upload(args.csv.name, args.csv.read_bytes())
+    if status != 201:
+        raise SystemExit(f'Upload failed: HTTP {status} {body[:200]!r}')
+    path = ENDPOINTS[args.endpoint].format(id=json.loads(body)['id'])
+
+    report = {}
+    for mode, prefix in (('sync', ''), ('async', '/async')):
+        report[mode] = run_mode(args.url, client.token, prefix + path,
+                                args.concurrency, args.requests, args.read_delay)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Minimal stdlib HTTP client for driving a running backend from benchmark scripts"""
+import json
+import time
+import uuid
+import urllib.error
+import urllib.request
+
+
+class ApiError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f'HTTP {status}: {body[:200]!r}')
+        self.status = status
+        self.body = body
+
+
+class ApiClient:
+    def __init__(self, base_url, token=None, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None, read_delay=0.0):
+        """Send a request and return (status, body bytes, elapsed seconds)"""
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        req = urllib.request.Request(f'{self.base_url}{path}', data=body, headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status = response.status
+                data = _read(response, read_delay)
+        except urllib.error.HTTPError as e:
+            status, data = e.code, e.read()
+        return status, data, time.perf_counter() - start
+
+    def json(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        status, data, _ = self.request(method, path, body, {'Content-Type': 'application/json'})
+        if status >= 400:
+            raise ApiError(status, data)
+        return json.loads(data) if data else None
+
+    def login_or_register(self, username, password):
+        """Log in, registering the account first if it doesn't exist yet"""
+        try:
+            data = self.json('POST', '/auth/login/', {'username': username, 'password': password})
+        except ApiError:
+            data = self.json('POST', '/auth/register/', {'username': username, 'password': password})
+        self.token = data['token']
+        return data
+
+    def upload(self, filename, content):
+        body, content_type = encode_multipart('file', filename, content)
+        return self.request('POST', '/datasets/upload/', body, {'Content-Type': content_type})
+
+
+def _read(response, read_delay):
+    if not read_delay:
+        return response.read()
+    # Simulate a slow client draining the response a chunk at a time
+    chunks = []
+    while True:
+        chunk = response.read(16384)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+        time.sleep(read_delay)
+
+
+def encode_multipart(field, filename, content):
+    """Encode a single file field as multipart/form-data; returns (body, content type)"""
+    boundary = uuid.uuid4().hex
+    head = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        'Content-Type: text/csv\r\n\r\n'
+    ).encode()
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+    return head + content + tail, f'multipart/form-data; boundary={boundary}'
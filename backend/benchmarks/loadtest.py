@@ -0,0 +1,260 @@
+"""
+Multi-user load test replaying realistic API sessions.
+
+Starts the backend locally on a scratch SQLite database (or targets --url)
+and runs N simulated operators at once. Each logs in, then keeps picking an
+action from a weighted mix of login, upload, list, summary and generate_pdf
+calls until the duration runs out. Reports throughput, p50/p95/p99 latency
+per action and error rates, separating SQLite lock timeouts from other
+failures.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest --users 20 --duration 60 \\
+        --mix login=1,upload=1,list=4,summary=4,pdf=1 --rows 5000
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+from pathlib import Path
+
+from .client import ApiClient
+from .stats import summarize
+from .synthetic import iter_rows
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ACTIONS = ('login', 'upload', 'list', 'summary', 'pdf')
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f'unknown action {name!r}; expected one of {", ".join(ACTIONS)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """Backend process on a scratch database, migrated before it starts serving"""
+
+    def __init__(self, server, workdir):
+        self.server = server
+        self.port = free_port()
+        self.env = dict(os.environ,
+                        EQUIPMENT_DB_PATH=str(Path(workdir) / 'loadtest.sqlite3'),
+                        EQUIPMENT_MEDIA_ROOT=str(Path(workdir) / 'media'))
+        self.process = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}/api'
+
+    def start(self):
+        subprocess.run([sys.executable, 'manage.py', 'shards', '-v', '0'],
+                       cwd=BACKEND_DIR, env=self.env, check=True)
+        if self.server == 'asgi':
+            command = [sys.executable, '-m', 'uvicorn', 'chemical_equipment_api.asgi:application',
+                       '--port', str(self.port), '--log-level', 'warning']
+        else:
+            command = [sys.executable, 'manage.py', 'runserver', '--noreload', str(self.port)]
+        self.process = subprocess.Popen(command, cwd=BACKEND_DIR, env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError('Backend did not start within 30 seconds')
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait(10)
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {action: [] for action in ACTIONS}
+        self.errors = {}
+        # Operators that never got a session, as {username: error}
+        self.failed_operators = {}
+
+    def record(self, action, elapsed, error=None):
+        with self._lock:
+            if error is None:
+                self.latencies[action].append(elapsed)
+            else:
+                per_action = self.errors.setdefault(action, {})
+                per_action[error] = per_action.get(error, 0) + 1
+
+    def operator_failed(self, username, error):
+        with self._lock:
+            self.failed_operators[username] = error
+
+
+def classify(status, body):
+    if b'database is locked' in body or b'database table is locked' in body:
+        return 'lock_timeout'
+    if status >= 500:
+        return 'server_error'
+    return f'http_{status}'
+
+
+class Operator(threading.Thread):
+    """One simulated user working through a weighted random session"""
+
+    def __init__(self, index, url, mix, csv_bytes, deadline, think, results, seed):
+        super().__init__(daemon=True)
+        self.username = f'operator{index}'
+        self.password = 'load-test-pass-123'
+        self.client = ApiClient(url)
+        self.mix = mix
+        self.csv_bytes = csv_bytes
+        self.deadline = deadline
+        self.think = think
+        self.results = results
+        self.rng = random.Random(seed + index)
+        self.dataset_ids = []
+
+    def run(self):
+        try:
+            self.client.login_or_register(self.username, self.password)
+        except Exception as e:
+            # Without a session this operator can't take part; the run is reported as failed
+            self.results.record('login', None, f'session:{type(e).__name__}')
+            self.results.operator_failed(self.username, f'{type(e).__name__}: {e}')
+            return
+        actions, weights = zip(*self.mix.items())
+        while time.monotonic() < self.deadline:
+            action = self.rng.choices(actions, weights)[0]
+            try:
+                status, body, elapsed = self.perform(action)
+            except (urllib.error.URLError, OSError) as e:
+                self.results.record(action, None, f'connection:{type(e).__name__}')
+            else:
+                if status is not None:
+                    self.results.record(action, elapsed, None if status < 400 else classify(status, body))
+            if self.think:
+                time.sleep(self.rng.expovariate(1 / self.think))
+
+    def perform(self, action):
+        client = self.client
+        if action == 'login':
+            payload = json.dumps({'username': self.username, 'password': self.password}).encode()
+            return client.request('POST', '/auth/login/', payload, {'Content-Type': 'application/json'})
+        if action == 'upload':
+            status, body, elapsed = client.upload(f'{self.username}.csv', self.csv_bytes)
+            if status == 201:
+                self.dataset_ids = [json.loads(body)['id']] + self.dataset_ids[:4]
+            return status, body, elapsed
+        if action == 'list':
+            status, body, elapsed = client.request('GET', '/datasets/')
+            if status == 200:
+                self.dataset_ids = [dataset['id'] for dataset in json.loads(body)]
+            return status, body, elapsed
+        if not self.dataset_ids:
+            return None, b'', 0.0
+        dataset_id = self.rng.choice(self.dataset_ids)
+        path = f'/datasets/{dataset_id}/summary/' if action == 'summary' else f'/datasets/{dataset_id}/generate_pdf/'
+        status, body, elapsed = client.request('GET', path)
+        if status == 404:
+            # Pruned by one of our own uploads in the meantime
+            self.dataset_ids.remove(dataset_id)
+        return status, body, elapsed
+
+
+def run(url, users, duration, mix, rows, think, seed):
+    csv_bytes = ''.join(iter_rows(rows, seed)).encode()
+    results = Results()
+    deadline = time.monotonic() + duration
+    operators = [Operator(i, url, mix, csv_bytes, deadline, think, results, seed) for i in range(users)]
+
+    start = time.perf_counter()
+    for operator in operators:
+        operator.start()
+    for operator in operators:
+        operator.join()
+    wall = time.perf_counter() - start
+
+    report = {'users': users, 'duration_s': wall, 'rows_per_upload': rows, 'mix': mix, 'actions': {},
+              'failed_operators': results.failed_operators}
+    total_ok = total_errors = 0
+    for action in ACTIONS:
+        ok = len(results.latencies[action])
+        errors = results.errors.get(action, {})
+        failed = sum(errors.values())
+        if not ok and not failed:
+            continue
+        total_ok += ok
+        total_errors += failed
+        report['actions'][action] = {
+            'throughput_rps': ok / wall,
+            'error_rate': failed / (ok + failed),
+            'errors': errors,
+            'latency': summarize(results.latencies[action]),
+        }
+    report['throughput_rps'] = total_ok / wall
+    report['error_rate'] = total_errors / (total_ok + total_errors) if total_ok + total_errors else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='target an already running backend instead of starting one')
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi',
+                        help='local server: runserver (wsgi) or uvicorn (asgi)')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('login=1,upload=1,list=4,summary=4,pdf=1'))
+    parser.add_argument('--rows', type=int, default=1000, help='rows in each uploaded CSV')
+    parser.add_argument('--think', type=float, default=0.5, help='mean pause between actions, seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        url = args.url
+        if not url:
+            server = LocalServer(args.server, workdir)
+            server.start()
+            url = server.url
+        try:
+            report = run(url, args.users, args.duration, args.mix, args.rows, args.think, args.seed)
+        finally:
+            if server:
+                server.stop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+    if report['failed_operators']:
+        # The figures above come from fewer operators than requested
+        sys.exit(f"{len(report['failed_operators'])} of {args.users} operators could not start a session: "
+                 f"{next(iter(report['failed_operators'].values()))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Backend benchmark suite.
+
+Uploads synthetic datasets of each requested size through the Django test
+client against a fresh test database, then times the list, summary,
+retrieve, aggregates, export, generate_pdf and pruning paths. Results are
+written as JSON; --compare checks them against a stored baseline and exits
+non-zero when an operation got slower than the allowed threshold.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 1000,10000 --output bench.json
+    python -m benchmarks.run --sizes 1000,10000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Every stored dataset beyond this many per user is pruned on upload
+HISTORY_LIMIT = 5
+
+SERVER_TIMING_ENTRY = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+def parse_server_timing(header):
+    """Map span name -> milliseconds, plus 'db_queries', from a Server-Timing header"""
+    timings = {}
+    for name, duration, queries in SERVER_TIMING_ENTRY.findall(header or ''):
+        timings[name] = float(duration)
+        if queries:
+            timings['db_queries'] = int(queries)
+    return timings
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, operation, wall_ms, timing=None):
+        sample = {'wall_ms': wall_ms}
+        if timing:
+            sample['db_ms'] = timing.get('db')
+            sample['db_queries'] = timing.get('db_queries')
+        self.samples.setdefault(operation, []).append(sample)
+
+    def summary(self):
+        results = {}
+        for operation, samples in self.samples.items():
+            walls = [sample['wall_ms'] for sample in samples]
+            results[operation] = {
+                'runs': len(walls),
+                'median_ms': statistics.median(walls),
+                'min_ms': min(walls),
+                'max_ms': max(walls),
+                'db_queries': samples[-1].get('db_queries'),
+            }
+        return results
+
+
+def timed(client, method, path, **kwargs):
+    start = time.perf_counter()
+    response = getattr(client, method)(path, **kwargs)
+    # Streaming responses are drained so the whole body is part of the timing
+    if response.streaming:
+        for _ in response:
+            pass
+    wall_ms = (time.perf_counter() - start) * 1000
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method.upper()} {path} -> {response.status_code}')
+    return response, wall_ms
+
+
+def bench_size(client, rows, repeat, seed, workdir):
+    from benchmarks.synthetic import write_csv
+    from django.conf import settings
+    from equipment.models import Dataset
+    from equipment.shards import shard_aliases
+
+    recorder = Recorder()
+    csv_path = write_csv(Path(workdir) / f'equipment_{rows}.csv', rows, seed)
+
+    # Fill the history first so every timed upload also prunes one dataset
+    uploads = HISTORY_LIMIT + repeat
+    dataset_id = None
+    for i in range(uploads):
+        with open(csv_path, 'rb') as handle:
+            response, wall_ms = timed(client, 'post', '/api/datasets/upload/', data={'file': handle})
+        dataset_id = response.json()['id']
+        if i >= HISTORY_LIMIT:
+            timing = parse_server_timing(response['Server-Timing'])
+            recorder.add('upload', wall_ms, timing)
+            recorder.add('prune', timing.get('prune', 0.0))
+
+    for _ in range(repeat):
+        for operation, path in (
+            ('list', '/api/datasets/'),
+            ('retrieve', f'/api/datasets/{dataset_id}/'),
+            ('summary', f'/api/datasets/{dataset_id}/summary/'),
+            ('aggregates', f'/api/datasets/{dataset_id}/aggregates/'),
+            ('export_csv', f'/api/datasets/{dataset_id}/export/'),
+        ):
+            response, wall_ms = timed(client, 'get', path)
+            recorder.add(operation, wall_ms, parse_server_timing(response.get('Server-Timing')))
+
+        # Cold render, then a cache hit
+        for path in Path(settings.REPORT_CACHE_DIR).glob('*.pdf'):
+            path.unlink()
+        for path in Path(settings.CHART_CACHE_DIR).glob('*'):
+            path.unlink()
+        for operation in ('generate_pdf', 'generate_pdf_cached'):
+            response, wall_ms = timed(client, 'get', f'/api/datasets/{dataset_id}/generate_pdf/')
+            recorder.add(operation, wall_ms, parse_server_timing(response.get('Server-Timing')))
+
+    for alias in shard_aliases():
+        Dataset.objects.using(alias).all().delete()
+    return recorder.summary()
+
+
+def run(sizes, repeat, seed, db_file):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_equipment_api.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connections
+    from django.test.utils import setup_test_environment
+    from equipment.shards import shard_aliases
+    from rest_framework.test import APIClient
+
+    setup_test_environment()
+    # The main database and every shard, each replaced by a test database
+    aliases = ['default', *shard_aliases()]
+    if db_file:
+        for alias in aliases:
+            name = db_file if alias == 'default' else f'{db_file}.{alias}'
+            settings.DATABASES[alias].setdefault('TEST', {})['NAME'] = name
+            connections[alias].settings_dict.setdefault('TEST', {})['NAME'] = name
+    old_names = {alias: connections[alias].creation.create_test_db(verbosity=0) for alias in aliases}
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            settings.REPORT_CACHE_DIR = Path(workdir) / 'reports'
+            settings.CHART_CACHE_DIR = Path(workdir) / 'charts'
+            client = APIClient()
+            token = client.post('/api/auth/register/', {
+                'username': 'benchmark', 'password': 'benchmark-pass-123'
+            }, format='json').json()['token']
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+            results = {}
+            for rows in sizes:
+                print(f'Benchmarking {rows} rows...', file=sys.stderr)
+                results[str(rows)] = bench_size(client, rows, repeat, seed, workdir)
+    finally:
+        for alias, old_name in old_names.items():
+            connections[alias].creation.destroy_test_db(old_name, verbosity=0)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': 'file' if db_file else 'memory',
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return (size, operation, baseline ms, current ms) for every regression"""
+    regressions = []
+    for size, operations in current['results'].items():
+        for operation, stats in operations.items():
+            base = baseline.get('results', {}).get(size, {}).get(operation)
+            if not base or not base['median_ms']:
+                continue
+            if stats['median_ms'] > base['median_ms'] * (1 + threshold):
+                regressions.append((size, operation, base['median_ms'], stats['median_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='comma-separated row counts, e.g. 1000,100000,10000000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db-file', help='run against an on-disk SQLite file instead of memory')
+    parser.add_argument('--output', help='write results JSON here instead of stdout')
+    parser.add_argument('--compare', help='baseline results JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown of a median before it counts as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    report = run(sizes, args.repeat, args.seed, args.db_file)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold)
+        for size, operation, before, after in regressions:
+            print(f'REGRESSION {size} rows {operation}: {before:.1f} ms -> {after:.1f} ms '
+                  f'({after / before - 1:+.0%})', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against baseline', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
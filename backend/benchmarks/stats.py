@@ -0,0 +1,24 @@
+"""Latency summaries shared by the benchmark scripts"""
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies):
+    """p50/p95/p99/max/mean of a list of latencies in seconds, reported in milliseconds"""
+    values = sorted(latencies)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) * 1000,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': values[-1] * 1000,
+    }
@@ -0,0 +1,79 @@
+"""
+Deterministic synthetic equipment CSVs following sample_equipment_data.csv.
+
+The type mix and per-type parameter ranges mirror the sample file, so the
+generated data exercises the same grouping and cleaning paths. The same
+(rows, seed) always produces byte-identical output.
+
+    python -m benchmarks.synthetic 100000 -o equipment_100k.csv
+"""
+import argparse
+import random
+import sys
+
+HEADER = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+
+# (name prefix, type, weight, (flowrate, pressure, temperature) centre), from the sample
+EQUIPMENT_KINDS = [
+    ('Reactor', 'Reactor', 4, (132.8, 15.4, 352.5)),
+    ('Pump', 'Pump', 4, (84.6, 22.1, 44.8)),
+    ('Heat Exchanger', 'Heat Exchanger', 4, (202.8, 10.9, 179.5)),
+    ('Distillation Column', 'Column', 2, (147.9, 8.9, 217.5)),
+    ('Compressor', 'Compressor', 2, (91.9, 33.8, 57.5)),
+    ('Separator', 'Separator', 1, (105.3, 12.5, 95.0)),
+    ('Valve', 'Valve', 1, (45.0, 18.0, 35.0)),
+    ('Mixer', 'Mixer', 1, (110.0, 5.5, 75.0)),
+    ('Crystallizer', 'Crystallizer', 1, (65.0, 8.0, 50.0)),
+    ('Dryer', 'Dryer', 1, (55.5, 3.2, 180.0)),
+    ('Filter', 'Filter', 1, (75.0, 6.5, 40.0)),
+    ('Storage Tank', 'Tank', 1, (0.0, 2.0, 25.0)),
+    ('Condenser', 'Condenser', 1, (160.0, 7.5, 65.0)),
+    ('Boiler', 'Boiler', 1, (180.5, 25.0, 320.0)),
+]
+
+# Relative spread around each centre, and the share of rows with a blank field
+SPREAD = 0.08
+MISSING_RATE = 0.001
+
+
+def iter_rows(rows, seed=0):
+    """Yield CSV lines (header first) for ``rows`` synthetic equipment records"""
+    rng = random.Random(seed)
+    kinds = [kind for kind in EQUIPMENT_KINDS for _ in range(kind[2])]
+    yield HEADER
+    for i in range(rows):
+        prefix, equipment_type, _, centre = rng.choice(kinds)
+        values = [f'{max(0.0, rng.gauss(c, c * SPREAD)):.1f}' for c in centre]
+        if rng.random() < MISSING_RATE:
+            values[rng.randrange(3)] = ''
+        yield f'{prefix}-{chr(65 + i % 26)}{i},{equipment_type},{",".join(values)}\n'
+
+
+def write_csv(path, rows, seed=0, chunk_lines=10000):
+    """Write a synthetic CSV to ``path`` without holding it in memory"""
+    with open(path, 'w', newline='') as output:
+        batch = []
+        for line in iter_rows(rows, seed):
+            batch.append(line)
+            if len(batch) >= chunk_lines:
+                output.write(''.join(batch))
+                batch = []
+        output.write(''.join(batch))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='file to write; defaults to stdout')
+    args = parser.parse_args()
+
+    if args.output:
+        write_csv(args.output, args.rows, args.seed)
+    else:
+        sys.stdout.writelines(iter_rows(args.rows, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_equipment_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up; lets event streams end when their client leaves
+from equipment.asgi import DisconnectListener  # noqa: E402
+
+application = DisconnectListener(django_application)
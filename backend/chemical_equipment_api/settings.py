@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'equipment.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,10 +82,30 @@ WSGI_APPLICATION = 'chemical_equipment_api.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Overridable so tools like the load-test harness can use a scratch database
+        'NAME': os.environ.get('EQUIPMENT_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Datasets, equipment rows and equipment types are split by user across
+# EQUIPMENT_SHARD_COUNT SQLite files (aliases shard_0, shard_1, ...), so uploads
+# of users on different shards don't wait on each other's write locks. Auth
+# and the user -> shard assignments stay in 'default'. See equipment.shards;
+# `manage.py shards` migrates every database and rebalances users.
+EQUIPMENT_SHARD_COUNT = int(os.environ.get('EQUIPMENT_SHARD_COUNT', 4))
+EQUIPMENT_SHARD_DIR = Path(os.environ.get(
+    'EQUIPMENT_SHARD_DIR', Path(DATABASES['default']['NAME']).parent / 'shards'
+))
+for _index in range(EQUIPMENT_SHARD_COUNT):
+    DATABASES[f'shard_{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': EQUIPMENT_SHARD_DIR / f'shard_{_index}.sqlite3',
+        # Opened on first use; kept open per thread instead of per request
+        'CONN_MAX_AGE': None,
+    }
+
+DATABASE_ROUTERS = ['equipment.shards.ShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,6 +143,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded and generated files (cached PDF reports and charts)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = Path(os.environ.get('EQUIPMENT_MEDIA_ROOT', BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -143,10 +169,47 @@ CSRF_TRUSTED_ORIGINS = [
 # REST Framework - Add at the END
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'equipment.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'equipment.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Change temporarily for testing
     ],
-}
\ No newline at end of file
+}
+
+# PDF reports are cached on disk and rendered in parallel for bulk exports.
+# REPORT_WORKERS caps the render processes; None uses every core.
+REPORT_CACHE_DIR = MEDIA_ROOT / 'reports'
+REPORT_WORKERS = None
+
+# Chart images (PNG/SVG) rendered with matplotlib's Agg backend, cached on disk
+# and shared by the chart endpoint and the PDF reports
+CHART_CACHE_DIR = MEDIA_ROOT / 'charts'
+
+# CSV ingestion admission control (equipment.admission). Uploads are parsed
+# while the estimated peak memory of those in progress fits INGEST_MEMORY_BUDGET
+# bytes per process; others wait in line, at most INGEST_MAX_QUEUED of them for
+# INGEST_QUEUE_TIMEOUT seconds, then get a 503 with Retry-After: INGEST_RETRY_AFTER.
+# Files up to INGEST_MAX_FILE_SIZE bytes are accepted (larger ones get a 413); one
+# whose estimate exceeds the whole budget waits for it to be free and runs alone.
+# The default takes the 10M-row synthetic benchmark file (about 450 MB).
+INGEST_MEMORY_BUDGET = 512 * 1024 * 1024
+INGEST_MAX_FILE_SIZE = 1024 * 1024 * 1024
+INGEST_MAX_QUEUED = 8
+INGEST_QUEUE_TIMEOUT = 30
+INGEST_RETRY_AFTER = 10
+# Upload bodies above this size are spooled to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Values of derived columns (equipment.expressions), and the dataset columns they
+# are computed from, are kept per process in an LRU of at most this many bytes
+DERIVED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# In-process token -> user cache used by CachedTokenAuthentication.
+# Entries expire after TOKEN_CACHE_TTL seconds, bounding staleness across processes.
+TOKEN_CACHE_MAX_ENTRIES = 10000
+TOKEN_CACHE_TTL = 300
@@ -19,9 +19,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from equipment.instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('equipment.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
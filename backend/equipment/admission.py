@@ -0,0 +1,129 @@
+"""
+Admission control for CSV ingestion, bounded by an estimate of its memory use.
+
+Each upload's peak memory is estimated from its size. Uploads are ingested
+while the estimates of those running fit INGEST_MEMORY_BUDGET; the rest
+wait in arrival order, up to INGEST_MAX_QUEUED of them for at most
+INGEST_QUEUE_TIMEOUT seconds, and are turned away with a Retry-After hint
+beyond that. A file whose estimate exceeds the whole budget, but not
+INGEST_MAX_FILE_SIZE, takes the whole budget: it waits until nothing else
+is being ingested and then runs alone. The budget is per server process.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+# Peak traced memory of an upload is about 8x the CSV size (the parsed frame,
+# its columns as arrays and one insert batch of model instances) plus a few
+# MB fixed; estimates round both up
+INGEST_BASE_COST = 8 * 1024 * 1024
+INGEST_COST_PER_BYTE = 10
+
+
+def estimate_cost(size):
+    """Estimated peak memory in bytes of ingesting a CSV file of ``size`` bytes"""
+    return INGEST_BASE_COST + INGEST_COST_PER_BYTE * size
+
+
+def max_ingest_size():
+    """Largest CSV file, in bytes, accepted for ingestion"""
+    return settings.INGEST_MAX_FILE_SIZE
+
+
+class AdmissionRejected(Exception):
+    """The ingestion can't start now; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class IngestionBudget:
+    """
+    Counting semaphore over estimated bytes.
+
+    Waiters are admitted first come, first served, so a large upload isn't
+    starved by a stream of small ones that would each fit.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiting = deque()
+        self.in_use = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self):
+        return settings.INGEST_MEMORY_BUDGET
+
+    def cost_of(self, size):
+        """Budget taken by a CSV file of ``size`` bytes: its estimate, at most the whole budget"""
+        return min(estimate_cost(size), self.capacity)
+
+    def _reject(self, message):
+        self.rejected += 1
+        return AdmissionRejected(message, settings.INGEST_RETRY_AFTER)
+
+    def acquire(self, cost, on_queued=None):
+        """
+        Reserve ``cost`` bytes of the budget, waiting for it if needed.
+
+        ``on_queued`` is called, outside the lock, when the caller has to wait.
+        Raises AdmissionRejected when the queue is full or the wait times out.
+        """
+        with self._condition:
+            if not self._waiting and self.in_use + cost <= self.capacity:
+                self._admit(cost)
+                return
+            if len(self._waiting) >= settings.INGEST_MAX_QUEUED:
+                raise self._reject('Too many uploads are being processed; try again shortly')
+            ticket = object()
+            self._waiting.append(ticket)
+        if on_queued:
+            on_queued()
+        deadline = time.monotonic() + settings.INGEST_QUEUE_TIMEOUT
+        with self._condition:
+            try:
+                while self._waiting[0] is not ticket or self.in_use + cost > self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject('Timed out waiting for other uploads to finish; try again shortly')
+                    self._condition.wait(remaining)
+            except BaseException:
+                self._waiting.remove(ticket)
+                # The next waiter may have become the head of the line
+                self._condition.notify_all()
+                raise
+            self._waiting.popleft()
+            self._admit(cost)
+            # The next waiter may fit in what is left
+            self._condition.notify_all()
+
+    def _admit(self, cost):
+        self.in_use += cost
+        self.active += 1
+        self.admitted += 1
+
+    def release(self, cost):
+        with self._condition:
+            self.in_use -= cost
+            self.active -= 1
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'capacity': self.capacity,
+                'in_use': self.in_use,
+                'active': self.active,
+                'waiting': len(self._waiting),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+            }
+
+
+ingestion_budget = IngestionBudget()
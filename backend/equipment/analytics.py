@@ -0,0 +1,191 @@
+"""Dataset aggregates and equipment paging, shared by the sync and async views"""
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, Value
+from django.db.models.functions import Cast, Least
+
+NUMERIC_COLUMNS = ('flowrate', 'pressure', 'temperature')
+# Row fields as served by the API; query them from equipment_rows()
+EQUIPMENT_FIELDS = ('id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+
+DEFAULT_BINS = 10
+MAX_BINS = 100
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def parse_int_param(value, default, minimum, maximum):
+    """Parse an integer query parameter clamped to [minimum, maximum]; raises ValueError"""
+    if value in (None, ''):
+        return default
+    return max(minimum, min(maximum, int(value)))
+
+
+def parse_flag_param(value, default):
+    """Parse a boolean query parameter such as ?equipment=false"""
+    if value in (None, ''):
+        return default
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
+
+def equipment_rows(equipment):
+    """Equipment annotated with its type's name as ``equipment_type``, for values(*EQUIPMENT_FIELDS)"""
+    return equipment.annotate(equipment_type=F('type__name'))
+
+
+def type_distribution_query(equipment):
+    # Grouped on the integer key; names are looked up afterwards for the few groups
+    return equipment.values('type_id').annotate(count=Count('id')).order_by('-count')
+
+
+def type_names(type_ids, using):
+    # Imported here: report workers import this module before Django is set up
+    from .models import EquipmentType
+    # Types are per shard, so they are read from the database of the rows
+    return dict(EquipmentType.objects.using(using).filter(id__in=type_ids).values_list('id', 'name'))
+
+
+async def atype_names(type_ids, using):
+    from .models import EquipmentType
+    types = EquipmentType.objects.using(using).filter(id__in=type_ids)
+    return {type_id: name async for type_id, name in types.values_list('id', 'name')}
+
+
+def type_distribution(equipment):
+    """[(type name, row count)], most common type first"""
+    rows = list(type_distribution_query(equipment))
+    names = type_names([row['type_id'] for row in rows], equipment.db)
+    return [(names[row['type_id']], row['count']) for row in rows]
+
+
+async def atype_distribution(equipment):
+    """Async counterpart of type_distribution()"""
+    rows = [row async for row in type_distribution_query(equipment)]
+    names = await atype_names([row['type_id'] for row in rows], equipment.db)
+    return [(names[row['type_id']], row['count']) for row in rows]
+
+
+def _column_stats_expressions():
+    expressions = {}
+    for column in NUMERIC_COLUMNS:
+        expressions[f'{column}__min'] = Min(column)
+        expressions[f'{column}__max'] = Max(column)
+        expressions[f'{column}__avg'] = Avg(column)
+    return expressions
+
+
+def _by_type_query(equipment):
+    return equipment.values('type_id').annotate(
+        count=Count('id'),
+        **{f'avg_{column}': Avg(column) for column in NUMERIC_COLUMNS}
+    ).order_by('-count')
+
+
+def _histogram_query(equipment, column, low, high, bins):
+    # Bucket index computed in SQL; the maximum value lands in the last bucket
+    bucket = Least(
+        Cast((F(column) - low) * bins / (high - low), IntegerField()),
+        Value(bins - 1),
+    )
+    return equipment.annotate(bucket=bucket).values('bucket').annotate(
+        count=Count('id')
+    ).order_by()
+
+
+def _histogram(rows, low, high, bins):
+    counts = [0] * bins
+    for row in rows:
+        counts[row['bucket']] = row['count']
+    width = (high - low) / bins
+    return {
+        'edges': [low + width * i for i in range(bins)] + [high],
+        'counts': counts,
+    }
+
+
+def _histogram_plan(stats, bins):
+    """Decide per column whether a bucketed query is needed, or the result is trivial"""
+    plan = {}
+    for column in NUMERIC_COLUMNS:
+        low, high = stats[f'{column}__min'], stats[f'{column}__max']
+        if low is None:
+            plan[column] = {'edges': [], 'counts': []}
+        elif low == high:
+            plan[column] = None  # a single bucket holding every row
+        else:
+            plan[column] = (low, high, bins)
+    return plan
+
+
+def _payload(stats, by_type, names, histograms, total):
+    return {
+        'total_records': total,
+        'columns': {
+            column: {
+                'min': stats[f'{column}__min'],
+                'max': stats[f'{column}__max'],
+                'avg': stats[f'{column}__avg'],
+            }
+            for column in NUMERIC_COLUMNS
+        },
+        'by_type': {
+            names[row['type_id']]: {
+                'count': row['count'],
+                **{f'avg_{column}': row[f'avg_{column}'] for column in NUMERIC_COLUMNS},
+            }
+            for row in by_type
+        },
+        'histograms': histograms,
+    }
+
+
+def compute_aggregates(equipment, bins=DEFAULT_BINS):
+    """Per-column stats, per-type averages and histograms for an equipment queryset"""
+    stats = equipment.aggregate(count=Count('id'), **_column_stats_expressions())
+    by_type = list(_by_type_query(equipment))
+    names = type_names([row['type_id'] for row in by_type], equipment.db)
+
+    histograms = {}
+    for column, plan in _histogram_plan(stats, bins).items():
+        if plan is None:
+            value = stats[f'{column}__min']
+            histograms[column] = {'edges': [value, value], 'counts': [stats['count']]}
+        elif isinstance(plan, tuple):
+            rows = _histogram_query(equipment, column, *plan)
+            histograms[column] = _histogram(rows, *plan)
+        else:
+            histograms[column] = plan
+
+    return _payload(stats, by_type, names, histograms, stats['count'])
+
+
+async def acompute_aggregates(equipment, bins=DEFAULT_BINS):
+    """Async counterpart of compute_aggregates()"""
+    stats = await equipment.aaggregate(count=Count('id'), **_column_stats_expressions())
+    by_type = [row async for row in _by_type_query(equipment)]
+    names = await atype_names([row['type_id'] for row in by_type], equipment.db)
+
+    histograms = {}
+    for column, plan in _histogram_plan(stats, bins).items():
+        if plan is None:
+            value = stats[f'{column}__min']
+            histograms[column] = {'edges': [value, value], 'counts': [stats['count']]}
+        elif isinstance(plan, tuple):
+            rows = [row async for row in _histogram_query(equipment, column, *plan)]
+            histograms[column] = _histogram(rows, *plan)
+        else:
+            histograms[column] = plan
+
+    return _payload(stats, by_type, names, histograms, stats['count'])
+
+
+def equipment_page_query(equipment, after, limit):
+    """Keyset page of equipment rows in upload order, starting after the given id"""
+    return equipment_rows(equipment).filter(id__gt=after).order_by('id').values(*EQUIPMENT_FIELDS)[:limit]
+
+
+def equipment_page(rows, total, limit):
+    return {
+        'count': total,
+        'results': rows,
+        # Cursor for the following page, None once the dataset is exhausted
+        'next': rows[-1]['id'] if len(rows) == limit else None,
+    }
@@ -0,0 +1,37 @@
+"""Per-type outlier scores, computed once at upload and stored on each Equipment row"""
+import numpy as np
+import pandas as pd
+
+# Modified z-score above which a row is flagged (Iglewicz and Hoaglin)
+ANOMALY_THRESHOLD = 3.5
+# MAD / 0.6745 and 1.2533 * mean absolute deviation both estimate the
+# standard deviation of normally distributed data
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+
+DEFAULT_ANOMALY_LIMIT = 50
+MAX_ANOMALY_LIMIT = 1000
+
+
+def score_anomalies(types, values):
+    """
+    Robust z-score of every row against the rows of the same type.
+
+    ``types`` holds one equipment type per row and ``values`` is an (n, k)
+    array of the numeric columns. Per type and column, a row scores
+    |x - median| / (MAD / 0.6745); where MAD is zero (over half the rows
+    share a value) the scaled mean absolute deviation is used instead. The
+    row's score is its largest column score. Returns (scores, flags) arrays
+    aligned with the input.
+    """
+    frame = pd.DataFrame(np.asarray(values, dtype=np.float64))
+    groups = pd.factorize(pd.Series(types))[0]
+    deviations = (frame - frame.groupby(groups).transform('median')).abs()
+    by_type = deviations.groupby(groups)
+    mad = by_type.transform('median').to_numpy()
+    mean_ad = by_type.transform('mean').to_numpy()
+    scale = np.where(mad > 0, mad / MAD_SCALE, mean_ad * MEAN_AD_SCALE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, deviations.to_numpy() / scale, 0.0)
+    scores = z.max(axis=1)
+    return scores, scores > ANOMALY_THRESHOLD
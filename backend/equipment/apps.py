@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class EquipmentConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'equipment'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # SQLite creates shard files on first connection, but not their directory
+        Path(settings.EQUIPMENT_SHARD_DIR).mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,37 @@
+"""
+ASGI middleware telling views when their client has gone away.
+
+Django 4.2 only reads from the client while receiving the request body, so
+a streaming response never learns that its client disconnected and keeps
+running until it ends by itself. DisconnectListener reads the client's
+messages for the whole request instead, passes them on to Django, and sets
+``scope['disconnected']`` (an asyncio.Event, reachable as
+``request.scope['disconnected']``) on http.disconnect. Long-lived streams
+wait on it next to their own work.
+"""
+import asyncio
+
+
+class DisconnectListener:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        disconnected = asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def listen():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    return
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await self.app({**scope, 'disconnected': disconnected}, messages.get, send)
+        finally:
+            listener.cancel()
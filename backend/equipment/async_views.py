@@ -0,0 +1,211 @@
+"""
+Async versions of the hot read endpoints.
+
+Served under ASGI these don't hold a worker thread while waiting on the
+database or on slow clients. They mirror the DatasetViewSet routes of the
+same name and return the same payloads. The server-sent event stream is
+async only, and needs an ASGI server.
+"""
+import asyncio
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from .analytics import (
+    DEFAULT_BINS, DEFAULT_PAGE_SIZE, EQUIPMENT_FIELDS, MAX_BINS, MAX_PAGE_SIZE,
+    acompute_aggregates, atype_distribution, equipment_page, equipment_page_query,
+    equipment_rows, parse_flag_param, parse_int_param,
+)
+from .authentication import CachedTokenAuthentication
+from .conditional import dataset_etag, etag_matches, set_validators
+from .events import broker, format_event
+from .expressions import ExpressionError, add_derived_aggregates, derived_columns, derived_digest
+from .models import Dataset
+from .serializers import DatasetInfoSerializer, DatasetSerializer
+from .shards import auser_datasets
+
+# Rows fetched per round trip when streaming a summary
+SUMMARY_CHUNK_SIZE = 2000
+
+# An idle event stream sends a comment this often, so clients can tell it from a dead one
+EVENT_KEEPALIVE_INTERVAL = 15
+# Event streams end after this many seconds and clients resume them with
+# Last-Event-ID. They end sooner when their client leaves, if the server runs
+# the application from chemical_equipment_api.asgi (see equipment.asgi)
+EVENT_STREAM_MAX_AGE = 300
+EVENT_RETRY_MS = 3000
+
+
+def async_api_view(view):
+    """Token-authenticate a GET-only async view, setting request.user"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            result = await CachedTokenAuthentication().aauthenticate(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e.detail)}, status=401)
+        if result is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _get_dataset(request, pk):
+    try:
+        return await (await auser_datasets(request.user)).aget(pk=pk)
+    except Dataset.DoesNotExist:
+        return None
+
+
+def _not_found():
+    return JsonResponse({'detail': 'Not found.'}, status=404)
+
+
+@async_api_view
+async def dataset_list(request):
+    """List the user's last 5 datasets"""
+    queryset = (await auser_datasets(request.user)).annotate(
+        equipment_count=Count('equipment')
+    )[:5]
+    datasets = [dataset async for dataset in queryset]
+    return JsonResponse(DatasetSerializer(datasets, many=True).data, safe=False)
+
+
+@async_api_view
+async def dataset_summary(request, pk):
+    """Stream the dataset summary, fetching equipment rows in chunks"""
+    include_equipment = parse_flag_param(request.GET.get('equipment'), True)
+    dataset = await _get_dataset(request, pk)
+    if dataset is None:
+        return _not_found()
+    etag = dataset_etag(dataset) if include_equipment else dataset_etag(dataset, 'overview')
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return set_validators(HttpResponseNotModified(), etag)
+
+    header = dict(DatasetInfoSerializer(dataset).data)
+    header['type_distribution'] = dict(await atype_distribution(dataset.equipment.all()))
+    if not include_equipment:
+        return set_validators(JsonResponse(header), etag)
+    rows = equipment_rows(dataset.equipment.all()).values(*EQUIPMENT_FIELDS)
+
+    async def stream():
+        # Emit the header object with an open "equipment" array, then the rows
+        opening = json.dumps(header, cls=DjangoJSONEncoder)
+        yield opening[:-1] + ', "equipment": ['
+        batch = []
+        first = True
+        async for row in rows.aiterator(chunk_size=SUMMARY_CHUNK_SIZE):
+            batch.append(json.dumps(row))
+            if len(batch) >= SUMMARY_CHUNK_SIZE:
+                yield ('' if first else ', ') + ', '.join(batch)
+                batch, first = [], False
+        if batch:
+            yield ('' if first else ', ') + ', '.join(batch)
+        yield ']}'
+
+    return set_validators(StreamingHttpResponse(stream(), content_type='application/json'), etag)
+
+
+@async_api_view
+async def dataset_aggregates(request, pk):
+    """
+    Per-column statistics, per-type averages and histograms for a dataset;
+    ?derived=name,... adds those of the user's derived columns
+    """
+    try:
+        bins = parse_int_param(request.GET.get('bins'), DEFAULT_BINS, 1, MAX_BINS)
+    except ValueError:
+        return JsonResponse({'error': 'bins must be an integer'}, status=400)
+    try:
+        derived = await sync_to_async(derived_columns)(request.user, request.GET.get('derived'))
+    except ExpressionError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    dataset = await _get_dataset(request, pk)
+    if dataset is None:
+        return _not_found()
+    etag = dataset_etag(dataset, bins, *([derived_digest(derived)] if derived else []))
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return set_validators(HttpResponseNotModified(), etag)
+
+    data = await acompute_aggregates(dataset.equipment.all(), bins)
+    if derived:
+        # Evaluated with numpy over the whole columns, which is CPU work anyway
+        await sync_to_async(add_derived_aggregates)(data, dataset, derived, bins)
+    data['dataset'] = dataset.id
+    return set_validators(JsonResponse(data), etag)
+
+
+@async_api_view
+async def dataset_equipment(request, pk):
+    """Page through a dataset's equipment rows; pass the returned 'next' as 'after'"""
+    try:
+        after = parse_int_param(request.GET.get('after'), 0, 0, 2**63 - 1)
+        limit = parse_int_param(request.GET.get('limit'), DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'after and limit must be integers'}, status=400)
+    dataset = await _get_dataset(request, pk)
+    if dataset is None:
+        return _not_found()
+
+    rows = [row async for row in equipment_page_query(dataset.equipment.all(), after, limit)]
+    return JsonResponse(equipment_page(rows, dataset.total_records, limit))
+
+
+@async_api_view
+async def event_stream(request):
+    """Server-sent events for the user: upload progress, datasets created and deleted, reports ready"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'The event stream needs an ASGI server, e.g. uvicorn'}, status=503)
+    try:
+        last_event_id = parse_int_param(request.headers.get('Last-Event-ID'), None, 0, 2**63 - 1)
+    except ValueError:
+        last_event_id = None
+    user_id = request.user.id
+    # Never set when served without equipment.asgi.DisconnectListener
+    disconnected = request.scope.get('disconnected') or asyncio.Event()
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EVENT_STREAM_MAX_AGE
+        subscription, backlog, position = broker.subscribe(user_id, last_event_id)
+        gone = asyncio.ensure_future(disconnected.wait())
+        try:
+            if last_event_id is None:
+                # Gives a new client the id to resume from, should it reconnect before any event
+                yield f'retry: {EVENT_RETRY_MS}\nid: {position}\n\n'
+            else:
+                yield f'retry: {EVENT_RETRY_MS}\n\n'
+            for event in backlog:
+                yield format_event(event)
+            while (remaining := deadline - loop.time()) > 0:
+                received = asyncio.ensure_future(subscription.get())
+                await asyncio.wait(
+                    {received, gone}, timeout=min(EVENT_KEEPALIVE_INTERVAL, remaining),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if gone.done():
+                    received.cancel()
+                    return
+                if not received.done():
+                    received.cancel()
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_event(received.result())
+        finally:
+            gone.cancel()
+            broker.unsubscribe(user_id, subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies such as nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,134 @@
+"""Token authentication with an in-process token -> user cache"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key -> (token, user) with a per-entry TTL.
+
+    The cache is per process: deletions made by another process are only
+    picked up when the entry expires, so the TTL bounds how stale it can be.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, token, user):
+        with self._lock:
+            self._entries[key] = (token, user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1].pk == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.TOKEN_CACHE_TTL,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for TokenAuthentication that skips the Token->User join on cache hits"""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            token, user = cached
+            return (user, token)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token_cache.set(key, token, token.user)
+        return (token.user, token)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of authenticate() for plain Django async views"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        cached = token_cache.get(key)
+        if cached is not None:
+            token, user = cached
+            return (user, token)
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token_cache.set(key, token, token.user)
+        return (token.user, token)
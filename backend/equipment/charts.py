@@ -0,0 +1,197 @@
+"""Chart images rendered headlessly with matplotlib and cached on disk"""
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from matplotlib.figure import Figure
+
+from .analytics import DEFAULT_BINS, NUMERIC_COLUMNS, compute_aggregates, type_distribution
+from .expressions import derived_histogram, derived_values, expression_digest
+from .instrumentation import span
+
+CHART_KINDS = ('averages', 'distribution', 'histogram')
+CHART_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Part of every cache key; bump it when the look of the charts changes
+CHART_VERSION = 1
+CHART_SIZE = (8, 4)
+CHART_DPI = 150
+
+# Same palette as the web and desktop clients
+BAR_COLORS = ['#36A2EB', '#FF6384', '#FFCE56']
+PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF']
+HISTOGRAM_COLOR = '#667eea'
+
+# Charts embedded in PDF reports, in page order
+REPORT_CHARTS = (
+    ('averages', None, None, None),
+    ('distribution', None, None, None),
+    *(('histogram', column, DEFAULT_BINS, None) for column in NUMERIC_COLUMNS),
+)
+
+
+def chart_spec(kind, column=None, bins=DEFAULT_BINS, derived=None):
+    """
+    Normalized (kind, column, bins, expression) describing a chart; raises ValueError if invalid.
+
+    Histograms can also show one of ``derived``, a {name: expression} of
+    derived columns; the expression is None for the dataset's own columns.
+    """
+    if kind not in CHART_KINDS:
+        raise ValueError(f'kind must be one of {", ".join(CHART_KINDS)}')
+    if kind != 'histogram':
+        return (kind, None, None, None)
+    if derived and column in derived:
+        return (kind, column, bins, derived[column])
+    if column not in NUMERIC_COLUMNS:
+        raise ValueError(f'column must be one of {", ".join(NUMERIC_COLUMNS)} or a derived column')
+    return (kind, column, bins, None)
+
+
+def chart_name(spec):
+    kind, column, bins, expression = spec
+    # A derived column can be redefined under the same name
+    parts = (kind, column, bins, expression and expression_digest(expression))
+    return '-'.join(str(part) for part in parts if part is not None)
+
+
+def chart_cache_path(dataset, spec, file_format):
+    """Location of a cached chart image for the dataset's current contents"""
+    return Path(settings.CHART_CACHE_DIR) / (
+        f'equipment_chart_{dataset.id}_{dataset.fingerprint()}_v{CHART_VERSION}_{chart_name(spec)}.{file_format}'
+    )
+
+
+def purge_cached_charts(dataset_id, keep_fingerprint=None):
+    """Remove cached charts of a dataset, except those of its ``keep_fingerprint`` version"""
+    cache_dir = Path(settings.CHART_CACHE_DIR)
+    if not cache_dir.is_dir():
+        return
+    keep_prefix = f'equipment_chart_{dataset_id}_{keep_fingerprint}_'
+    for path in cache_dir.glob(f'equipment_chart_{dataset_id}_*'):
+        if keep_fingerprint is None or not path.name.startswith(keep_prefix):
+            path.unlink(missing_ok=True)
+
+
+def chart_context(dataset, spec, aggregates=None):
+    """
+    Collect what a chart shows as plain data, so rendering needs no ORM access.
+
+    Histograms are read from ``aggregates`` when given, which saves a query
+    per chart when several histograms of the same dataset are needed.
+    """
+    kind, column, bins, expression = spec
+    if kind == 'averages':
+        return {
+            'kind': kind,
+            'title': 'Average Parameters',
+            'labels': ['Flowrate', 'Pressure', 'Temperature'],
+            'values': [dataset.avg_flowrate or 0, dataset.avg_pressure or 0, dataset.avg_temperature or 0],
+        }
+    if kind == 'distribution':
+        distribution = type_distribution(dataset.equipment.all())
+        return {
+            'kind': kind,
+            'title': 'Equipment Type Distribution',
+            'labels': [name for name, _ in distribution],
+            'values': [count for _, count in distribution],
+        }
+    if expression is not None:
+        histogram = derived_histogram(derived_values(dataset, expression), bins)
+    else:
+        if aggregates is None:
+            aggregates = compute_aggregates(dataset.equipment.all(), bins)
+        histogram = aggregates['histograms'][column]
+    return {
+        'kind': kind,
+        'title': f'{column.capitalize()} Histogram',
+        **histogram,
+    }
+
+
+def render_chart(context, file_format, output):
+    """Draw the chart described by ``context`` into a path or file-like object"""
+    # A bare Figure renders with Agg and touches no pyplot global state,
+    # so charts can be drawn from several request threads at once
+    figure = Figure(figsize=CHART_SIZE)
+    ax = figure.add_subplot(111)
+    ax.set_title(context['title'], fontsize=14, fontweight='bold')
+    kind = context['kind']
+
+    if kind == 'averages':
+        ax.bar(context['labels'], context['values'], color=BAR_COLORS)
+        ax.set_ylabel('Value')
+    elif kind == 'distribution':
+        if sum(context['values']):
+            colors = [PIE_COLORS[i % len(PIE_COLORS)] for i in range(len(context['values']))]
+            ax.pie(context['values'], labels=context['labels'], colors=colors,
+                   autopct='%1.1f%%', startangle=90)
+        ax.set_aspect('equal')
+        ax.axis('off')
+    else:
+        edges, counts = context['edges'], context['counts']
+        if counts:
+            lefts = edges[:-1]
+            widths = [high - low for low, high in zip(edges, edges[1:])]
+            if not any(widths):
+                # Every value is the same: one bar of unit width around it
+                lefts, widths = [edges[0] - 0.5], [1]
+            ax.bar(lefts, counts, width=widths, align='edge', color=HISTOGRAM_COLOR, edgecolor='white')
+        ax.set_ylabel('Count')
+
+    figure.tight_layout()
+    figure.savefig(output, format=file_format, dpi=CHART_DPI)
+
+
+def render_chart_file(context, file_format, path):
+    """Render a chart into the cache; safe to call from worker processes"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename, so readers never see a partial image
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        render_chart(context, file_format, str(tmp_path))
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return str(path)
+
+
+def get_or_render_chart(dataset, spec, file_format):
+    """Return the path of a dataset chart, rendering it only on a cache miss"""
+    path = chart_cache_path(dataset, spec, file_format)
+    if not path.exists():
+        with span('render_chart'):
+            render_chart_file(chart_context(dataset, spec), file_format, path)
+    return path
+
+
+def report_charts(dataset):
+    """
+    (context, path) of the PNG charts a report embeds.
+
+    The context is None for charts already in the cache, so a report only
+    renders, and only queries data for, the images no one has asked for yet.
+    """
+    aggregates = None
+    charts = []
+    for spec in REPORT_CHARTS:
+        path = chart_cache_path(dataset, spec, 'png')
+        context = None
+        if not path.exists():
+            if spec[0] == 'histogram' and aggregates is None:
+                aggregates = compute_aggregates(dataset.equipment.all(), spec[2])
+            context = chart_context(dataset, spec, aggregates)
+        charts.append((context, str(path)))
+    return charts
+
+
+def ensure_chart_files(charts):
+    """Render the charts of report_charts() that are still missing; returns the paths that exist"""
+    paths = []
+    for context, path in charts:
+        if context is not None and not os.path.exists(path):
+            render_chart_file(context, 'png', path)
+        if os.path.exists(path):
+            paths.append(path)
+    return paths
@@ -0,0 +1,23 @@
+"""ETag helpers for conditional GETs on dataset-derived responses"""
+from django.utils.http import parse_etags
+
+
+def dataset_etag(dataset, *variant):
+    """Strong ETag for a response derived only from the dataset and ``variant`` (e.g. query options)"""
+    suffix = '-'.join(str(part) for part in variant)
+    return f'"{dataset.fingerprint()}{"-" + suffix if suffix else ""}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers ``etag``"""
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def set_validators(response, etag):
+    response['ETag'] = etag
+    # Clients may keep a copy but must revalidate it before use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,141 @@
+"""
+In-process publish/subscribe of per-user events, streamed to clients as server-sent events.
+
+Views and signal handlers publish from any thread; each subscriber is an
+event stream served by an async view, which receives events on its own
+event loop. Every user has a numbered history of recent events, so a client
+reconnecting with Last-Event-ID gets what it missed, or a ``resync`` event
+when that is no longer possible (e.g. after a server restart).
+
+The broker lives in the server process: run one ASGI worker, or clients of
+other workers only see the events published there.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Events kept per user for replay on reconnect
+EVENT_HISTORY = 100
+# Events queued for a slow subscriber before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """Events of one user delivered to one stream, read with ``await get()``"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Hand ``event`` to the subscriber's loop; safe from any thread"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync_event(event[0]))
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class _Channel:
+    def __init__(self):
+        self.last_id = 0
+        # Id of the newest event dropped from the history; clients behind it have missed events
+        self.dropped_id = 0
+        self.history = deque(maxlen=EVENT_HISTORY)
+        self.subscribers = set()
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self.published = 0
+
+    def _channel(self, user_id):
+        channel = self._channels.get(user_id)
+        if channel is None:
+            channel = self._channels[user_id] = _Channel()
+        return channel
+
+    def publish(self, user_id, name, data, transient=False):
+        with self._lock:
+            channel = self._channel(user_id)
+            channel.last_id += 1
+            event = (channel.last_id, name, data)
+            if not transient:
+                if len(channel.history) == channel.history.maxlen:
+                    channel.dropped_id = channel.history[0][0]
+                channel.history.append(event)
+            self.published += 1
+            subscribers = list(channel.subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # Its loop has closed; the stream is gone
+                self.unsubscribe(user_id, subscription)
+        return event
+
+    def subscribe(self, user_id, last_event_id=None):
+        """
+        Register a subscription on the running loop.
+
+        Returns it with the events to send first: those published after
+        ``last_event_id``, or a resync event if some of them are lost. Also
+        returns the id of the user's latest event, which a new client starts from.
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            channel = self._channel(user_id)
+            channel.subscribers.add(subscription)
+            if last_event_id is None:
+                backlog = []
+            elif last_event_id > channel.last_id or last_event_id < channel.dropped_id:
+                backlog = [resync_event(channel.last_id)]
+            else:
+                backlog = [event for event in channel.history if event[0] > last_event_id]
+            return subscription, backlog, channel.last_id
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            channel = self._channels.get(user_id)
+            if channel is not None:
+                channel.subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(channel.subscribers) for channel in self._channels.values())
+
+
+broker = EventBroker()
+
+
+def publish(user_id, name, data, transient=False):
+    """
+    Publish event ``name`` with JSON-serializable ``data`` to the user's streams.
+
+    Transient events, such as progress updates, are not replayed on reconnect.
+    """
+    return broker.publish(user_id, name, data, transient)
+
+
+def resync_event(last_id):
+    """Tells a client to reload its state, after which it is current up to ``last_id``"""
+    return (last_id, 'resync', {})
+
+
+def format_event(event):
+    """Encode an (id, name, data) event in the text/event-stream format"""
+    event_id, name, data = event
+    return f'id: {event_id}\nevent: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
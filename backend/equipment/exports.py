@@ -0,0 +1,100 @@
+"""Streaming CSV/XLSX export of a dataset's equipment rows"""
+import csv
+import tempfile
+from itertools import islice
+
+from .analytics import equipment_rows
+from .expressions import derived_values
+
+EXPORT_HEADER = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+EXPORT_FIELDS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+# Rows fetched per round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+
+# Header row plus 1,048,575 data rows per worksheet
+XLSX_MAX_ROWS = 1048575
+
+
+class _Echo:
+    """Pseudo-buffer whose write() hands the line straight back to the csv writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def export_header(derived=None):
+    return EXPORT_HEADER + list(derived or ())
+
+
+def export_rows(dataset, derived=None):
+    """
+    Iterate the dataset's rows in upload order, fetched from the database in chunks,
+    followed by the values of the ``derived`` {name: expression} columns
+    """
+    rows = equipment_rows(dataset.equipment.all()).order_by('id').values_list(*EXPORT_FIELDS).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    if not derived:
+        return rows
+    return _with_derived(rows, [derived_values(dataset, expression) for expression in derived.values()])
+
+
+def _with_derived(rows, columns):
+    # Derived values are arrays in upload order too; only one chunk of them is
+    # turned into Python floats (None for NaN) at a time
+    start = 0
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        extras = [
+            [None if value != value else value for value in values[start:start + len(chunk)].tolist()]
+            for values in columns
+        ]
+        for row, *extra in zip(chunk, *extras):
+            yield (*row, *extra)
+        start += len(chunk)
+
+
+def iter_csv(dataset, derived=None):
+    """
+    Yield the dataset as CSV text in the same layout the upload endpoint accepts,
+    with any derived columns after the others
+    """
+    writer = csv.writer(_Echo())
+    # The header goes out immediately; rows follow in batches to keep writes few
+    yield writer.writerow(export_header(derived))
+    batch = []
+    for row in export_rows(dataset, derived):
+        batch.append(writer.writerow(row))
+        if len(batch) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def write_xlsx(dataset, derived=None):
+    """
+    Write the dataset to a temporary XLSX file and return it rewound.
+
+    XLSX is a zip container, so it can't be produced incrementally; openpyxl's
+    write-only mode keeps memory flat by flushing rows to disk instead.
+    Returns None when openpyxl is not installed.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        return None
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title='Equipment')
+    sheet.append(export_header(derived))
+    for row in export_rows(dataset, derived):
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,321 @@
+"""
+Derived columns: arithmetic expressions over a dataset's numeric columns.
+
+Expressions such as ``pressure * flowrate`` or ``temperature + 273.15`` are
+parsed with the ast module and accepted only if every node is a number, one
+of NUMERIC_COLUMNS, an arithmetic operator or a call to one of FUNCTIONS, so
+evaluating one can reach nothing else. They are evaluated with numpy over
+whole columns at once; the results, and the columns they are computed from,
+are cached per dataset version in a process-wide LRU bounded in bytes.
+Values that come out undefined or infinite (e.g. division by zero) are NaN
+and left out of statistics.
+"""
+import ast
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .analytics import NUMERIC_COLUMNS, type_names
+from .instrumentation import span
+
+MAX_EXPRESSION_LENGTH = 200
+# Derived columns named in one request
+MAX_DERIVED_PER_REQUEST = 8
+DERIVED_NAME_PATTERN = re.compile(r'[a-z][a-z0-9_]{0,39}')
+
+OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+}
+UNARY_OPERATORS = {
+    ast.UAdd: np.positive,
+    ast.USub: np.negative,
+}
+# name -> (function, number of arguments)
+FUNCTIONS = {
+    'abs': (np.abs, 1),
+    'sqrt': (np.sqrt, 1),
+    'exp': (np.exp, 1),
+    'log': (np.log, 1),
+    'log10': (np.log10, 1),
+    'min': (np.minimum, 2),
+    'max': (np.maximum, 2),
+}
+
+
+class ExpressionError(ValueError):
+    """An expression that isn't valid, or uses something that isn't allowed"""
+
+
+def _check(node):
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError('only numbers are allowed as constants')
+        try:
+            float(node.value)
+        except OverflowError:
+            raise ExpressionError('number is too large')
+    elif isinstance(node, ast.Name):
+        if node.id not in NUMERIC_COLUMNS:
+            raise ExpressionError(f'unknown name "{node.id}", use {", ".join(NUMERIC_COLUMNS)}')
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in OPERATORS:
+            raise ExpressionError('only + - * / and ** are allowed')
+        _check(node.left)
+        _check(node.right)
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in UNARY_OPERATORS:
+            raise ExpressionError('only + - * / and ** are allowed')
+        _check(node.operand)
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ExpressionError(f'only the functions {", ".join(FUNCTIONS)} are allowed')
+        arity = FUNCTIONS[node.func.id][1]
+        if node.keywords or len(node.args) != arity:
+            raise ExpressionError(f'{node.func.id}() takes {arity} argument{"s" if arity > 1 else ""}')
+        for arg in node.args:
+            _check(arg)
+    else:
+        raise ExpressionError('only arithmetic on numbers and columns is allowed')
+
+
+def parse_expression(text):
+    """Validated syntax tree of an expression; raises ExpressionError"""
+    if not isinstance(text, str) or not text.strip():
+        raise ExpressionError('expression is empty')
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f'expression is longer than {MAX_EXPRESSION_LENGTH} characters')
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        raise ExpressionError('expression is not valid arithmetic')
+    try:
+        _check(tree.body)
+    except RecursionError:
+        raise ExpressionError('expression is nested too deeply')
+    return tree
+
+
+def normalize_expression(text):
+    """Canonical spelling of a valid expression (spacing, redundant parentheses), used as its key"""
+    expression = ast.unparse(parse_expression(text))
+    # Spacing added around operators could take it past the stored length
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f'expression is longer than {MAX_EXPRESSION_LENGTH} characters')
+    return expression
+
+
+def expression_digest(expression):
+    return hashlib.sha1(expression.encode('utf-8')).hexdigest()[:12]
+
+
+def validate_derived_name(name):
+    """Raises ExpressionError unless ``name`` can label a derived column"""
+    if not isinstance(name, str) or not DERIVED_NAME_PATTERN.fullmatch(name):
+        raise ExpressionError(
+            'name must start with a lowercase letter and contain at most 40 lowercase letters, digits or _'
+        )
+    if name in NUMERIC_COLUMNS or name in FUNCTIONS:
+        raise ExpressionError(f'"{name}" is reserved')
+
+
+def _evaluate(node, columns):
+    if isinstance(node, ast.Constant):
+        return np.float64(node.value)
+    if isinstance(node, ast.Name):
+        return columns[node.id]
+    if isinstance(node, ast.BinOp):
+        return OPERATORS[type(node.op)](_evaluate(node.left, columns), _evaluate(node.right, columns))
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, columns))
+    return FUNCTIONS[node.func.id][0](*(_evaluate(arg, columns) for arg in node.args))
+
+
+def evaluate(expression, columns, size):
+    """
+    Values of ``expression`` for each of ``size`` rows, as a float array with
+    NaN where undefined; ``columns`` maps column names to arrays.
+    """
+    tree = parse_expression(expression)
+    # Float scalars overflow to inf instead of raising, or hanging on huge integer powers
+    with np.errstate(all='ignore'):
+        values = np.asarray(_evaluate(tree.body, columns), dtype=np.float64)
+    values = np.array(np.broadcast_to(values, (size,)))
+    values[~np.isfinite(values)] = np.nan
+    return values
+
+
+class DerivedCache:
+    """
+    LRU of (dataset id, fingerprint, expression) -> numpy arrays, bounded by
+    their total size in bytes.
+
+    The fingerprint changes with the dataset, so stale entries are never
+    hit; they age out, or go when the dataset is deleted.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size):
+        with self._lock:
+            if size > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def forget_dataset(self, dataset_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dataset_id]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+derived_cache = DerivedCache(max_bytes=settings.DERIVED_CACHE_MAX_BYTES)
+
+# Expression slot of the cache entry holding a dataset's own columns
+_COLUMNS = None
+
+
+def dataset_columns(dataset):
+    """{'type_id' and each numeric column: array}, rows in upload order"""
+    key = (dataset.id, dataset.fingerprint(), _COLUMNS)
+    columns = derived_cache.get(key)
+    if columns is None:
+        rows = dataset.equipment.order_by('id').values_list('type_id', *NUMERIC_COLUMNS)
+        table = np.array(list(rows), dtype=np.float64).reshape(-1, 1 + len(NUMERIC_COLUMNS))
+        columns = {'type_id': table[:, 0].astype(np.int64)}
+        for index, column in enumerate(NUMERIC_COLUMNS, start=1):
+            columns[column] = np.ascontiguousarray(table[:, index])
+        derived_cache.set(key, columns, sum(values.nbytes for values in columns.values()))
+    return columns
+
+
+def derived_values(dataset, expression):
+    """Values of a normalized expression for each row of the dataset, in upload order"""
+    key = (dataset.id, dataset.fingerprint(), expression)
+    values = derived_cache.get(key)
+    if values is None:
+        columns = dataset_columns(dataset)
+        with span('derive'):
+            values = evaluate(expression, columns, len(columns['type_id']))
+        derived_cache.set(key, values, values.nbytes)
+    return values
+
+
+def derived_columns(user, names):
+    """
+    {name: expression} of the user's derived columns listed in ``names``
+    (comma-separated, as in ?derived=), in that order; raises ExpressionError.
+    """
+    # Imported here: charts, and through them report workers, import this module before Django is set up
+    from .models import DerivedColumn
+
+    requested = list(dict.fromkeys(name.strip() for name in (names or '').split(',') if name.strip()))
+    if len(requested) > MAX_DERIVED_PER_REQUEST:
+        raise ExpressionError(f'at most {MAX_DERIVED_PER_REQUEST} derived columns per request')
+    expressions = dict(
+        DerivedColumn.objects.filter(user=user, name__in=requested).values_list('name', 'expression')
+    )
+    unknown = [name for name in requested if name not in expressions]
+    if unknown:
+        raise ExpressionError(f'unknown derived column {", ".join(unknown)}')
+    return {name: expressions[name] for name in requested}
+
+
+def derived_digest(derived):
+    """Short digest of {name: expression}, for ETags of responses that include them"""
+    return expression_digest(';'.join(f'{name}={expression}' for name, expression in derived.items()))
+
+
+def derived_histogram(values, bins):
+    """Histogram in the layout of compute_aggregates(), over the defined values"""
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {'edges': [], 'counts': []}
+    low, high = float(values.min()), float(values.max())
+    if low == high:
+        return {'edges': [low, high], 'counts': [int(values.size)]}
+    counts, edges = np.histogram(values, bins=bins, range=(low, high))
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def add_derived_aggregates(aggregates, dataset, derived, bins):
+    """
+    Extend a compute_aggregates() payload with derived columns: their stats
+    under 'columns', per-type averages as avg_<name> under 'by_type', their
+    histograms, and 'derived' mapping each name to its expression.
+    """
+    if not derived:
+        return aggregates
+    type_ids = dataset_columns(dataset)['type_id']
+    ids, inverse = np.unique(type_ids, return_inverse=True)
+    names = type_names(ids.tolist(), dataset._state.db)
+    for name, expression in derived.items():
+        values = derived_values(dataset, expression)
+        defined = ~np.isnan(values)
+        if defined.any():
+            stats = {
+                'min': float(values[defined].min()),
+                'max': float(values[defined].max()),
+                'avg': float(values[defined].mean()),
+            }
+        else:
+            stats = {'min': None, 'max': None, 'avg': None}
+        aggregates['columns'][name] = stats
+        counts = np.bincount(inverse[defined], minlength=len(ids))
+        sums = np.bincount(inverse[defined], weights=values[defined], minlength=len(ids))
+        for index, type_id in enumerate(ids.tolist()):
+            average = float(sums[index] / counts[index]) if counts[index] else None
+            aggregates['by_type'].setdefault(names[type_id], {})[f'avg_{name}'] = average
+        aggregates['histograms'][name] = derived_histogram(values, bins)
+    aggregates['derived'] = dict(derived)
+    return aggregates
+
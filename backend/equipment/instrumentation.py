@@ -0,0 +1,274 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware records wall time, database query count and time,
+named spans (see span()) and response size for every request. It adds a
+Server-Timing header and feeds per-endpoint histograms that metrics_view
+exposes in the Prometheus text format.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760, 104857600)
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Measurements collected while a single request is handled"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.spans = {}
+
+    def add_span(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+
+@contextmanager
+def span(name):
+    """Time a named section of the current request; a no-op outside requests"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(name, time.perf_counter() - start)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Database execute wrapper counting queries against the current request"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.query_count += 1
+        timings.query_time += time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_labels(labels, le=bound)} {bucket_count}')
+            lines.append(f'{self.name}_bucket{_labels(labels, le="+Inf")} {count}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(labels)} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._series = {}
+
+    def inc(self, labels, value=1):
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._series.items()):
+            lines.append(f'{self.name}{_labels(labels)} {value}')
+        return lines
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """Process-wide request metrics; label sets are tuples of (name, value) pairs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Wall time spent handling a request.', LATENCY_BUCKETS)
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds', 'Time spent in database queries per request.', LATENCY_BUCKETS)
+        self.db_queries = Counter(
+            'http_request_db_queries_total', 'Database queries executed.')
+        self.span_duration = Histogram(
+            'http_request_span_duration_seconds', 'Time spent in named sections of a request.', LATENCY_BUCKETS)
+        self.response_size = Histogram(
+            'http_response_size_bytes', 'Size of non-streaming response bodies.', SIZE_BUCKETS)
+        # Extra gauge sources: callables returning {metric name: value}
+        self.collectors = []
+
+    def record(self, endpoint, method, status_code, timings, wall, size):
+        labels = (('endpoint', endpoint), ('method', method))
+        with self._lock:
+            self.request_duration.observe(labels + (('status', str(status_code)),), wall)
+            self.db_duration.observe(labels, timings.query_time)
+            self.db_queries.inc(labels, timings.query_count)
+            for name, duration in timings.spans.items():
+                self.span_duration.observe(labels + (('span', name),), duration)
+            if size is not None:
+                self.response_size.observe(labels, size)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.request_duration, self.db_duration, self.db_queries,
+                           self.span_duration, self.response_size):
+                lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, value in collector().items():
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _token_cache_metrics():
+    from .authentication import token_cache
+    stats = token_cache.stats()
+    return {
+        'token_auth_cache_entries': stats['entries'],
+        'token_auth_cache_hits': stats['hits'],
+        'token_auth_cache_misses': stats['misses'],
+        'token_auth_cache_hit_rate': stats['hit_rate'],
+        'token_auth_cache_evictions': stats['evictions'],
+        'token_auth_cache_invalidations': stats['invalidations'],
+    }
+
+
+registry.collectors.append(_token_cache_metrics)
+
+
+def _event_metrics():
+    from .events import broker
+    return {
+        'event_stream_subscribers': broker.subscriber_count(),
+        'events_published': broker.published,
+    }
+
+
+registry.collectors.append(_event_metrics)
+
+
+def _ingestion_metrics():
+    from .admission import ingestion_budget
+    stats = ingestion_budget.stats()
+    return {
+        'ingest_memory_budget_bytes': stats['capacity'],
+        'ingest_memory_in_use_bytes': stats['in_use'],
+        'ingest_active': stats['active'],
+        'ingest_waiting': stats['waiting'],
+        'ingest_admitted': stats['admitted'],
+        'ingest_rejected': stats['rejected'],
+    }
+
+
+registry.collectors.append(_ingestion_metrics)
+
+
+def _derived_cache_metrics():
+    from .expressions import derived_cache
+    stats = derived_cache.stats()
+    return {
+        'derived_cache_entries': stats['entries'],
+        'derived_cache_bytes': stats['bytes'],
+        'derived_cache_hits': stats['hits'],
+        'derived_cache_misses': stats['misses'],
+        'derived_cache_hit_rate': stats['hit_rate'],
+        'derived_cache_evictions': stats['evictions'],
+    }
+
+
+registry.collectors.append(_derived_cache_metrics)
+
+
+def _server_timing(timings, wall):
+    entries = [f'total;dur={wall * 1000:.2f}',
+               f'db;dur={timings.query_time * 1000:.2f};desc="{timings.query_count} queries"']
+    entries.extend(f'{name};dur={duration * 1000:.2f}' for name, duration in timings.spans.items())
+    return ', '.join(entries)
+
+
+class PerformanceMiddleware:
+    """Time each request and publish its measurements; works for sync and async stacks"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        wall = time.perf_counter() - timings.start
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else 'unmatched'
+
+        if response.streaming:
+            length = response.get('Content-Length')
+            size = int(length) if length else None
+        else:
+            size = len(response.content)
+
+        registry.record(endpoint, request.method, response.status_code, timings, wall, size)
+        response['Server-Timing'] = _server_timing(timings, wall)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text exposition of the collected metrics"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from equipment.models import TenantShard
+from equipment.shards import (
+    default_shard, move_misplaced_datasets, plan_rebalance, shard_aliases, shard_map, tenant_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Migrate the main database and every shard, then even out the rows stored per shard by "
+        "reassigning users, and move datasets that are not on their owner's shard (including those "
+        "uploaded before sharding). Run it with the API stopped: servers cache user -> shard assignments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-rebalance', action='store_true',
+                            help="Only migrate, and move datasets onto their owners' current shards")
+        parser.add_argument('--tolerance', type=float, default=0.1,
+                            help='Leave shards alone once their loads differ by at most this fraction '
+                                 'of the mean load (default 0.1)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Print the planned moves without migrating or moving anything')
+
+    def handle(self, *args, no_rebalance, tolerance, dry_run, verbosity, **options):
+        aliases = shard_aliases()
+        databases = [DEFAULT_DB_ALIAS, *aliases]
+        if not dry_run:
+            call_command('migrate', database=DEFAULT_DB_ALIAS, verbosity=max(verbosity - 1, 0), interactive=False)
+        dropped = list(TenantShard.objects.filter(shard__gte=len(aliases)).values_list('user_id', flat=True))
+        if dropped:
+            raise CommandError(
+                f'Users {dropped} are assigned to shards beyond EQUIPMENT_SHARD_COUNT={len(aliases)}; '
+                f'the shard count can be raised but not lowered'
+            )
+        if not dry_run:
+            for alias in aliases:
+                call_command('migrate', database=alias, verbosity=max(verbosity - 1, 0), interactive=False)
+
+        stored = tenant_rows(databases)
+        rows = {}
+        for (_, user_id), count in stored.items():
+            rows[user_id] = rows.get(user_id, 0) + count
+        assigned = dict(TenantShard.objects.filter(user_id__in=rows).values_list('user_id', 'shard'))
+        # Users with rows but no assignment yet are saved with theirs below, not
+        # assigned here, so a dry run writes nothing
+        assignments = {user_id: assigned.get(user_id, default_shard(user_id)) for user_id in rows}
+        moves = {} if no_rebalance else plan_rebalance(rows, assignments, len(aliases), tolerance)
+        if verbosity:
+            for user_id, shard in sorted(moves.items()):
+                self.stdout.write(f'User {user_id} ({rows[user_id]} rows): shard {assignments[user_id]} -> {shard}')
+        if dry_run:
+            return
+
+        with transaction.atomic():
+            for user_id, shard in moves.items():
+                TenantShard.objects.filter(user_id=user_id).update(shard=shard)
+            TenantShard.objects.bulk_create([
+                TenantShard(user_id=user_id, shard=moves.get(user_id, shard))
+                for user_id, shard in assignments.items() if user_id not in assigned
+            ])
+        shard_map.clear()
+
+        moved = move_misplaced_datasets(databases, self.stdout.write if verbosity > 1 else None)
+        if verbosity:
+            loads = {alias: 0 for alias in aliases}
+            for (alias, _), count in tenant_rows(aliases).items():
+                loads[alias] += count
+            self.stdout.write(f'{len(moves)} users reassigned, {moved} datasets moved')
+            for alias, load in loads.items():
+                self.stdout.write(f'{alias}: {load} rows ({settings.DATABASES[alias]["NAME"]})')
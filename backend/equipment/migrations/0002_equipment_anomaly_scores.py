@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:18
+
+import numpy as np
+import pandas as pd
+from django.db import migrations, models
+
+# Frozen copy of equipment.anomalies as of this migration, so later changes
+# to the live scoring don't change what this migration does
+ANOMALY_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+
+
+def score_anomalies(types, values):
+    """Per-type robust z-scores of the rows, and whether each is above ANOMALY_THRESHOLD"""
+    frame = pd.DataFrame(np.asarray(values, dtype=np.float64))
+    groups = pd.factorize(pd.Series(types))[0]
+    deviations = (frame - frame.groupby(groups).transform('median')).abs()
+    by_type = deviations.groupby(groups)
+    mad = by_type.transform('median').to_numpy()
+    mean_ad = by_type.transform('mean').to_numpy()
+    scale = np.where(mad > 0, mad / MAD_SCALE, mean_ad * MEAN_AD_SCALE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, deviations.to_numpy() / scale, 0.0)
+    scores = z.max(axis=1)
+    return scores, scores > ANOMALY_THRESHOLD
+
+
+def backfill_anomaly_scores(apps, schema_editor):
+    """Score the rows uploaded before scores were computed at ingest"""
+    Dataset = apps.get_model('equipment', 'Dataset')
+    Equipment = apps.get_model('equipment', 'Equipment')
+    for dataset_id in Dataset.objects.values_list('id', flat=True):
+        rows = list(Equipment.objects.filter(dataset_id=dataset_id).values_list(
+            'id', 'equipment_type', 'flowrate', 'pressure', 'temperature'
+        ))
+        if not rows:
+            continue
+        ids, types, *columns = zip(*rows)
+        scores, flags = score_anomalies(types, np.column_stack(columns))
+        Equipment.objects.bulk_update(
+            [Equipment(id=pk, anomaly_score=float(score), is_anomaly=bool(flag))
+             for pk, score, flag in zip(ids, scores, flags)],
+            ['anomaly_score', 'is_anomaly'], batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='anomaly_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='is_anomaly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['dataset', 'is_anomaly', '-anomaly_score'], name='equipment_dataset_anomaly_idx'),
+        ),
+        migrations.RunPython(backfill_anomaly_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def encode_types(apps, schema_editor):
+    """Replace each row's type name with the key of its EquipmentType"""
+    EquipmentType = apps.get_model('equipment', 'EquipmentType')
+    Equipment = apps.get_model('equipment', 'Equipment')
+    names = Equipment.objects.order_by().values_list('equipment_type', flat=True).distinct()
+    for name in list(names):
+        equipment_type = EquipmentType.objects.create(name=name)
+        Equipment.objects.filter(equipment_type=name).update(type=equipment_type)
+
+
+def decode_types(apps, schema_editor):
+    EquipmentType = apps.get_model('equipment', 'EquipmentType')
+    Equipment = apps.get_model('equipment', 'Equipment')
+    for equipment_type in EquipmentType.objects.all():
+        Equipment.objects.filter(type=equipment_type).update(equipment_type=equipment_type.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0002_equipment_anomaly_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='type',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='equipment.equipmenttype'),
+        ),
+        # Nullable while both exist, so that the migration can be reversed
+        migrations.AlterField(
+            model_name='equipment',
+            name='equipment_type',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.RunPython(encode_types, decode_types),
+        migrations.RemoveField(
+            model_name='equipment',
+            name='equipment_type',
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='equipment.equipmenttype'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['dataset', 'type'], name='equipment_dataset_type_idx'),
+        ),
+    ]
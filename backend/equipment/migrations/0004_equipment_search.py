@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0003_equipmenttype'),
+    ]
+
+    operations = [
+        # Word-prefix index over equipment names; rowid is the Equipment id and
+        # owner the dataset's user as a u<id> token (see equipment.search)
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE equipment_search USING fts5(equipment_name, owner, prefix='2 3')",
+            'DROP TABLE equipment_search',
+        ),
+        migrations.RunSQL(
+            "INSERT INTO equipment_search (rowid, equipment_name, owner) "
+            "SELECT e.id, e.equipment_name, 'u' || d.user_id "
+            "FROM equipment_equipment e JOIN equipment_dataset d ON d.id = e.dataset_id",
+            migrations.RunSQL.noop,
+        ),
+    ]
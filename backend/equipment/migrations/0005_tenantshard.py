@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('equipment', '0004_equipment_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='equipment_shard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('shard', models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='datasets', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
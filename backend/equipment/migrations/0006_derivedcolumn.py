@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('equipment', '0005_tenantshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DerivedColumn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40)),
+                ('expression', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derived_columns', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='derivedcolumn',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='derived_column_user_name_unique'),
+        ),
+    ]
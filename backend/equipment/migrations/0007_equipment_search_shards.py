@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Create the search index of 0004 on the shards.
+
+    SQL and data migrations before this one only run in the main database
+    (see shards.ShardRouter.allow_migrate), where the datasets from before
+    sharding are; shards start empty, so the index needs no backfill there.
+    """
+
+    dependencies = [
+        ('equipment', '0006_derivedcolumn'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS equipment_search USING fts5(equipment_name, owner, prefix='2 3')",
+            'DROP TABLE IF EXISTS equipment_search',
+            # Literal rather than shards.SHARDS_ONLY_HINT: migrations don't import the app
+            hints={'shards_only': True},
+        ),
+    ]
@@ -1,11 +1,46 @@
+import hashlib
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
+class TenantShard(models.Model):
+    """The shard holding a user's datasets; kept in the main database, see equipment.shards"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='equipment_shard')
+    shard = models.PositiveSmallIntegerField()
+    
+    def __str__(self):
+        return f"{self.user_id} -> shard {self.shard}"
+
+
+class DerivedColumn(models.Model):
+    """A user's named arithmetic expression over the numeric columns; see equipment.expressions"""
+    # Like TenantShard, kept in the main database next to the user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='derived_columns')
+    name = models.CharField(max_length=40)
+    # Stored normalized, so equal expressions share cached values
+    expression = models.CharField(max_length=200)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='derived_column_user_name_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} = {self.expression}"
+
+
 class Dataset(models.Model):
     """Store uploaded datasets with metadata"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='datasets')
+    # Datasets live in the owner's shard and users in the main database, so
+    # there is no foreign key constraint; deleting a user deletes its datasets
+    # in a pre_delete handler instead of by cascade
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='datasets'
+    )
     filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(default=timezone.now)
     total_records = models.IntegerField(default=0)
@@ -18,19 +53,62 @@ class Dataset(models.Model):
     
     def __str__(self):
         return f"{self.filename} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    def fingerprint(self):
+        """Short digest of the fields shown in summaries and reports, used in cache keys"""
+        raw = '|'.join(str(value) for value in (
+            self.pk, self.filename, self.uploaded_at.isoformat(), self.total_records,
+            self.avg_flowrate, self.avg_pressure, self.avg_temperature,
+        ))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class EquipmentTypeManager(models.Manager):
+    def ids_for(self, names):
+        """Ids of the types called ``names``, in the same order, creating the missing ones"""
+        names = [str(name) for name in names]
+        ids = dict(self.filter(name__in=names).values_list('name', 'id'))
+        missing = [name for name in names if name not in ids]
+        if missing:
+            # Another upload may add the same types concurrently
+            self.bulk_create([self.model(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(self.filter(name__in=missing).values_list('name', 'id'))
+        return [ids[name] for name in names]
+
+
+class EquipmentType(models.Model):
+    """Distinct equipment type names, shared by every dataset"""
+    name = models.CharField(max_length=100, unique=True)
+    
+    objects = EquipmentTypeManager()
+    
+    def __str__(self):
+        return self.name
 
 
 class Equipment(models.Model):
     """Store individual equipment records"""
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='equipment')
     equipment_name = models.CharField(max_length=255)
-    equipment_type = models.CharField(max_length=100)
+    # A small integer key per row instead of the repeated name; the API still
+    # calls it equipment_type. Types are never deleted, so the
+    # (dataset, type) index below is the only one needed.
+    type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='equipment', db_index=False)
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
+    # Robust per-type z-score computed at upload; see anomalies.score_anomalies
+    anomaly_score = models.FloatField(default=0.0)
+    is_anomaly = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['equipment_name']
+        indexes = [
+            # Top-K outliers of a dataset, and their count, are read straight off this index
+            models.Index(fields=['dataset', 'is_anomaly', '-anomaly_score'], name='equipment_dataset_anomaly_idx'),
+            # Type distributions group a dataset's rows by type from this index alone
+            models.Index(fields=['dataset', 'type'], name='equipment_dataset_type_idx'),
+        ]
     
     def __str__(self):
         return self.equipment_name
\ No newline at end of file
@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import span
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its time as the 'render' span of the request"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
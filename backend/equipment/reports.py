@@ -0,0 +1,231 @@
+"""PDF report rendering, the on-disk report cache and bulk zip export"""
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import Image, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+
+from .analytics import type_distribution
+from .charts import CHART_SIZE, ensure_chart_files, report_charts
+from .events import publish
+from .instrumentation import span
+from .workers import setup_django
+
+logger = logging.getLogger(__name__)
+
+# Part of the cache key; bump it when the report layout changes
+REPORT_VERSION = 2
+CHART_WIDTH = 6.5 * inch
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+
+def report_filename(dataset_id):
+    return f'equipment_report_{dataset_id}.pdf'
+
+
+def report_cache_path(dataset):
+    """Location of the cached report for the dataset's current contents"""
+    return Path(settings.REPORT_CACHE_DIR) / f'equipment_report_{dataset.id}_{dataset.fingerprint()}_v{REPORT_VERSION}.pdf'
+
+
+def purge_cached_reports(dataset_id, keep=None):
+    """Remove cached reports of a dataset, except the one at ``keep``"""
+    cache_dir = Path(settings.REPORT_CACHE_DIR)
+    if not cache_dir.is_dir():
+        return
+    for path in cache_dir.glob(f'equipment_report_{dataset_id}_*.pdf'):
+        if keep is None or path != keep:
+            path.unlink(missing_ok=True)
+
+
+def report_context(dataset):
+    """Collect everything a report shows as plain data, so rendering needs no ORM access"""
+    return {
+        'id': dataset.id,
+        'filename': dataset.filename,
+        'uploaded_at': dataset.uploaded_at.strftime('%Y-%m-%d %H:%M'),
+        'total_records': dataset.total_records,
+        'avg_flowrate': dataset.avg_flowrate,
+        'avg_pressure': dataset.avg_pressure,
+        'avg_temperature': dataset.avg_temperature,
+        'type_distribution': type_distribution(dataset.equipment.all()),
+        'charts': report_charts(dataset),
+    }
+
+
+def render_report(context, output):
+    """Build the PDF report described by ``context`` into a path or file-like object"""
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#1a5490'),
+        spaceAfter=30,
+    )
+    elements.append(Paragraph("Chemical Equipment Report", title_style))
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Dataset Info
+    info_style = styles['Normal']
+    elements.append(Paragraph(f"<b>Filename:</b> {context['filename']}", info_style))
+    elements.append(Paragraph(f"<b>Upload Date:</b> {context['uploaded_at']}", info_style))
+    elements.append(Paragraph(f"<b>Total Records:</b> {context['total_records']}", info_style))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Summary Statistics
+    elements.append(Paragraph("<b>Summary Statistics</b>", styles['Heading2']))
+    elements.append(Spacer(1, 0.1*inch))
+
+    summary_data = [
+        ['Parameter', 'Average Value'],
+        ['Flowrate', f"{context['avg_flowrate']:.2f}"],
+        ['Pressure', f"{context['avg_pressure']:.2f}"],
+        ['Temperature', f"{context['avg_temperature']:.2f}"],
+    ]
+
+    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TABLE_STYLE)
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Equipment Type Distribution
+    if context['type_distribution']:
+        elements.append(Paragraph("<b>Equipment Type Distribution</b>", styles['Heading2']))
+        elements.append(Spacer(1, 0.1*inch))
+
+        dist_data = [['Equipment Type', 'Count']]
+        for equipment_type, count in context['type_distribution']:
+            dist_data.append([equipment_type, str(count)])
+
+        dist_table = Table(dist_data, colWidths=[3*inch, 2*inch])
+        dist_table.setStyle(TABLE_STYLE)
+        elements.append(dist_table)
+
+    # Charts, shared with the chart endpoint through the chart cache
+    chart_paths = ensure_chart_files(context['charts'])
+    if chart_paths:
+        elements.append(Spacer(1, 0.3*inch))
+        elements.append(Paragraph("<b>Charts</b>", styles['Heading2']))
+        chart_height = CHART_WIDTH * CHART_SIZE[1] / CHART_SIZE[0]
+        for path in chart_paths:
+            elements.append(Spacer(1, 0.1*inch))
+            elements.append(Image(path, width=CHART_WIDTH, height=chart_height))
+
+    doc.build(elements)
+
+
+def render_report_file(context, path):
+    """Render a report into the cache; runs in worker processes during bulk export"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename, so readers never see a partial PDF
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        render_report(context, str(tmp_path))
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return str(path)
+
+
+def get_or_render_report(dataset):
+    """Return the path of the dataset's report, rendering it only on a cache miss"""
+    path = report_cache_path(dataset)
+    if not path.exists():
+        with span('render_pdf'):
+            render_report_file(report_context(dataset), path)
+        publish(dataset.user_id, 'report.ready', {'dataset': dataset.id})
+    return path
+
+
+class _ZipStreamBuffer:
+    """Write-only, unseekable sink that lets ``zipfile`` emit an archive incrementally"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_reports_zip(datasets):
+    """
+    Return an iterator over a zip archive holding the report of each dataset.
+
+    Cached reports go out first; missing ones are rendered in a process pool and
+    added to the archive as each one finishes. All database access happens
+    before this returns, so the iterator can be consumed by a streaming response.
+    """
+    cached, jobs = [], []
+    for dataset in datasets:
+        path = report_cache_path(dataset)
+        if path.exists():
+            cached.append((dataset.id, path))
+        else:
+            jobs.append((dataset.id, report_context(dataset), path))
+    return _stream_zip(cached, jobs)
+
+
+def _stream_zip(cached, jobs):
+    buffer = _ZipStreamBuffer()
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for dataset_id, path in cached:
+            archive.write(path, arcname=report_filename(dataset_id))
+            yield buffer.drain()
+
+        if jobs:
+            max_workers = min(len(jobs), settings.REPORT_WORKERS or os.cpu_count() or 1)
+            # Spawn rather than fork: the server process may be running other threads.
+            # Spawned workers start blank, so each sets Django up before its first task.
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=setup_django,
+                                     initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),)) as pool:
+                futures = {
+                    pool.submit(render_report_file, context, str(path)): dataset_id
+                    for dataset_id, context, path in jobs
+                }
+                for future in as_completed(futures):
+                    dataset_id = futures[future]
+                    try:
+                        path = future.result()
+                    except Exception as e:
+                        logger.exception('Rendering report for dataset %s failed', dataset_id)
+                        archive.writestr(f'equipment_report_{dataset_id}_error.txt', str(e))
+                    else:
+                        archive.write(path, arcname=report_filename(dataset_id))
+                    yield buffer.drain()
+    yield buffer.drain()
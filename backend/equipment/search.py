@@ -0,0 +1,80 @@
+"""
+Equipment name search across a user's datasets, backed by an SQLite FTS5 index.
+
+``equipment_search`` (created in migration 0004) holds one entry per
+equipment row, keyed by the row's id: its name, and the owner's user id as
+a ``u<id>`` token so that matches are restricted to one user inside the
+index. Entries are added per dataset after its rows are inserted and
+removed before the dataset is deleted, rather than by per-row triggers.
+Every shard has its own index, next to the rows it covers.
+"""
+import re
+
+from django.db import connections
+from django.db.models import F
+
+from .analytics import EQUIPMENT_FIELDS, equipment_rows
+from .models import Equipment
+
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+# Terms beyond this are ignored; each one narrows the match anyway
+MAX_SEARCH_TERMS = 8
+
+
+def index_dataset(dataset):
+    """Add a dataset's equipment to the search index of its database"""
+    with connections[dataset._state.db].cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO equipment_search (rowid, equipment_name, owner) "
+            "SELECT id, equipment_name, %s FROM equipment_equipment WHERE dataset_id = %s",
+            [f'u{dataset.user_id}', dataset.id]
+        )
+
+
+def unindex_dataset(dataset_id, using):
+    """Remove a dataset's equipment from the search index; call before its rows are deleted"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM equipment_search WHERE rowid IN "
+            "(SELECT id FROM equipment_equipment WHERE dataset_id = %s)",
+            [dataset_id]
+        )
+
+
+def match_expression(user_id, query):
+    """
+    FTS5 query for names containing every word of ``query`` as a word prefix.
+
+    "Pump-B2" becomes pump* AND b2*, matching Pump-B2 and Pump-B21 but not
+    Pump-C2. Words are quoted, so user input can't inject query syntax.
+    Returns None when ``query`` has no words.
+    """
+    terms = re.findall(r'[^\W_]+', query.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    names = ' AND '.join(f'"{term}"*' for term in terms)
+    return f'owner:u{int(user_id)} AND equipment_name:({names})'
+
+
+def search_equipment(user_id, query, using, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Best matching equipment rows of the user's datasets, each with its dataset
+    id and filename; ``using`` is the user's shard.
+    """
+    expression = match_expression(user_id, query)
+    if expression is None:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM equipment_search WHERE equipment_search MATCH %s "
+            "ORDER BY rank LIMIT %s",
+            [expression, limit]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    rows = equipment_rows(Equipment.objects.using(using).filter(id__in=ids)).annotate(
+        dataset_filename=F('dataset__filename')
+    ).values(*EQUIPMENT_FIELDS, 'dataset_id', 'dataset_filename')
+    by_id = {row['id']: row for row in rows}
+    # Rows deleted since they were indexed simply drop out
+    return [by_id[row_id] for row_id in ids if row_id in by_id]
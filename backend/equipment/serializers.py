@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Dataset, Equipment
+from .analytics import type_distribution
+from .expressions import ExpressionError, normalize_expression, validate_derived_name
+from .models import Dataset, DerivedColumn, Equipment
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,6 +12,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class EquipmentSerializer(serializers.ModelSerializer):
+    equipment_type = serializers.CharField(source='type.name', read_only=True)
+    
     class Meta:
         model = Equipment
         fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
@@ -27,11 +31,24 @@ class DatasetSerializer(serializers.ModelSerializer):
         ]
     
     def get_equipment_count(self, obj):
+        # Querysets annotated with equipment_count avoid a COUNT per dataset
+        if hasattr(obj, 'equipment_count'):
+            return obj.equipment_count
         return obj.equipment.count()
 
 
-class DatasetDetailSerializer(serializers.ModelSerializer):
-    equipment = EquipmentSerializer(many=True, read_only=True)
+class DatasetInfoSerializer(serializers.ModelSerializer):
+    """Dataset metadata without related rows, so it needs no queries (safe in async views)"""
+    class Meta:
+        model = Dataset
+        fields = [
+            'id', 'filename', 'uploaded_at', 'total_records',
+            'avg_flowrate', 'avg_pressure', 'avg_temperature'
+        ]
+
+
+class DatasetOverviewSerializer(serializers.ModelSerializer):
+    """Dataset summary without the equipment rows, for datasets too large to send at once"""
     type_distribution = serializers.SerializerMethodField()
     
     class Meta:
@@ -39,12 +56,50 @@ class DatasetDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'filename', 'uploaded_at', 'total_records',
             'avg_flowrate', 'avg_pressure', 'avg_temperature',
-            'equipment', 'type_distribution'
+            'type_distribution'
         ]
     
     def get_type_distribution(self, obj):
-        from django.db.models import Count
-        distribution = obj.equipment.values('equipment_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        return {item['equipment_type']: item['count'] for item in distribution}
\ No newline at end of file
+        return dict(type_distribution(obj.equipment.all()))
+
+
+class DatasetDetailSerializer(DatasetOverviewSerializer):
+    equipment = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Dataset
+        fields = [
+            'id', 'filename', 'uploaded_at', 'total_records',
+            'avg_flowrate', 'avg_pressure', 'avg_temperature',
+            'equipment', 'type_distribution'
+        ]
+    
+    def get_equipment(self, obj):
+        # Type names joined in the same query, rather than fetched row by row
+        return EquipmentSerializer(obj.equipment.select_related('type'), many=True).data
+
+
+class DerivedColumnSerializer(serializers.ModelSerializer):
+    """A derived column of the requesting user; the expression is saved normalized"""
+    class Meta:
+        model = DerivedColumn
+        fields = ['id', 'name', 'expression', 'created_at']
+        read_only_fields = ['created_at']
+    
+    def validate_name(self, value):
+        try:
+            validate_derived_name(value)
+        except ExpressionError as e:
+            raise serializers.ValidationError(str(e))
+        others = DerivedColumn.objects.filter(user=self.context['request'].user, name=value)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError('You already have a derived column with this name')
+        return value
+    
+    def validate_expression(self, value):
+        try:
+            return normalize_expression(value)
+        except ExpressionError as e:
+            raise serializers.ValidationError(str(e))
@@ -0,0 +1,275 @@
+"""
+Per-tenant SQLite shards for datasets, equipment rows and equipment types.
+
+Every user is assigned one of the ``shard_<n>`` databases (settings
+EQUIPMENT_SHARD_COUNT); their datasets and rows live only there, so one
+user's large upload locks just the users sharing that file. Users, tokens
+and the TenantShard assignments stay in the main database. Django opens a
+shard's connection on the first query routed to it and keeps it per thread.
+
+Sharded querysets need a database: start them from user_datasets() or with
+``.using(shard_for(user_id))``. Related managers of a dataset, such as
+``dataset.equipment``, follow the dataset's shard by themselves.
+"""
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Sum
+
+from .models import Dataset, Equipment, EquipmentType, TenantShard
+from .search import index_dataset
+
+SHARD_PREFIX = 'shard_'
+SHARDED_MODELS = frozenset({'equipment.dataset', 'equipment.equipment', 'equipment.equipmenttype'})
+# Each database numbers its rows from its own range (the main database keeps
+# 0..SHARD_ID_SPACE for datasets uploaded before sharding), so dataset and
+# equipment ids stay unique across shards; cache files and clients key on them
+SHARD_ID_SPACE = 2 ** 40
+SEQUENCED_TABLES = ('equipment_dataset', 'equipment_equipment')
+# Hint of SQL migrations that run on the shards (and only there), e.g. to create
+# tables the earlier migrations created in the main database alone
+SHARDS_ONLY_HINT = 'shards_only'
+COPY_BATCH = 5000
+
+
+def shard_alias(index):
+    return f'{SHARD_PREFIX}{index}'
+
+
+def shard_aliases():
+    return [shard_alias(index) for index in range(settings.EQUIPMENT_SHARD_COUNT)]
+
+
+def is_shard(alias):
+    return alias.startswith(SHARD_PREFIX)
+
+
+def shard_index(alias):
+    return int(alias[len(SHARD_PREFIX):])
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+class ShardRouter:
+    """
+    Routes sharded models to the database of the instance they are reached
+    from, and everything else to the main database.
+
+    Sharded queries without ``.using()`` or an instance fall through to the
+    main database, which only holds datasets uploaded before sharding.
+    """
+
+    def _route(self, model, hints):
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)):
+            return instance._state.db
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Datasets point at their owner in the main database
+        if is_sharded(type(obj1)) != is_sharded(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not is_shard(db):
+            # The main database keeps the equipment tables too, so datasets
+            # from before sharding can be read and moved by `manage.py shards`
+            return False if hints.get(SHARDS_ONLY_HINT) else None
+        if app_label != 'equipment':
+            return False
+        if model_name is None:
+            # SQL and data migrations (no model name) only run on shards when
+            # marked for them: shards start empty, so there is nothing to convert
+            return bool(hints.get(SHARDS_ONLY_HINT))
+        return f'{app_label}.{model_name}' in SHARDED_MODELS
+
+
+class ShardMap:
+    """In-process cache of user id -> shard alias, filled from TenantShard"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aliases = {}
+
+    def get(self, user_id):
+        with self._lock:
+            return self._aliases.get(user_id)
+
+    def set(self, user_id, shard):
+        with self._lock:
+            self._aliases[user_id] = shard_alias(shard)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._aliases.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._aliases.clear()
+
+
+shard_map = ShardMap()
+
+
+def default_shard(user_id):
+    """Shard of a user seen for the first time; `manage.py shards` evens out the load later"""
+    return user_id % settings.EQUIPMENT_SHARD_COUNT
+
+
+def shard_for(user_id):
+    """Alias of the database holding the user's datasets, assigning one on first use"""
+    alias = shard_map.get(user_id)
+    if alias is None:
+        assignment, _ = TenantShard.objects.get_or_create(
+            user_id=user_id, defaults={'shard': default_shard(user_id)}
+        )
+        shard_map.set(user_id, assignment.shard)
+        alias = shard_alias(assignment.shard)
+    return alias
+
+
+async def ashard_for(user_id):
+    """Async counterpart of shard_for()"""
+    alias = shard_map.get(user_id)
+    if alias is None:
+        assignment, _ = await TenantShard.objects.aget_or_create(
+            user_id=user_id, defaults={'shard': default_shard(user_id)}
+        )
+        shard_map.set(user_id, assignment.shard)
+        alias = shard_alias(assignment.shard)
+    return alias
+
+
+def user_datasets(user):
+    """The user's datasets, queried on their shard"""
+    return Dataset.objects.using(shard_for(user.id)).filter(user=user)
+
+
+async def auser_datasets(user):
+    """Async counterpart of user_datasets()"""
+    return Dataset.objects.using(await ashard_for(user.id)).filter(user=user)
+
+
+def reserve_id_range(alias):
+    """Start the shard's dataset and equipment ids at its own range, unless already past it"""
+    base = (shard_index(alias) + 1) * SHARD_ID_SPACE
+    with connections[alias].cursor() as cursor:
+        for table in SEQUENCED_TABLES:
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s",
+                           [base, table, base])
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+                [table, base, table]
+            )
+
+
+def _copied_fields(model, *excluded):
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in excluded
+    ]
+
+
+def copy_dataset(dataset, target):
+    """
+    Copy a dataset with its rows to the ``target`` database and index them for search.
+
+    The copy gets new ids from the target's range, and type ids are mapped
+    by name onto the target's own equipment types.
+    """
+    equipment_fields = _copied_fields(Equipment, 'dataset', 'type')
+    with transaction.atomic(using=target):
+        copy = Dataset.objects.using(target).create(**{
+            field: getattr(dataset, field) for field in _copied_fields(Dataset)
+        })
+        names = list(dataset.equipment.order_by().values_list('type__name', flat=True).distinct())
+        type_ids = dict(zip(names, EquipmentType.objects.db_manager(target).ids_for(names)))
+        rows = dataset.equipment.order_by('id').values_list('type__name', *equipment_fields)
+        batch = []
+        for type_name, *values in rows.iterator(chunk_size=COPY_BATCH):
+            batch.append(Equipment(dataset=copy, type_id=type_ids[type_name], **dict(zip(equipment_fields, values))))
+            if len(batch) == COPY_BATCH:
+                Equipment.objects.using(target).bulk_create(batch)
+                batch = []
+        Equipment.objects.using(target).bulk_create(batch)
+        index_dataset(copy)
+    return copy
+
+
+def move_misplaced_datasets(aliases, log=None):
+    """
+    Move every dataset found outside its owner's shard into it; returns how many moved.
+
+    Each dataset is copied, then deleted from where it was. Both can't be
+    in one transaction, so an interrupted run may leave one duplicate dataset.
+    """
+    moved = 0
+    for source in aliases:
+        for dataset in Dataset.objects.using(source).order_by('uploaded_at'):
+            target = shard_for(dataset.user_id)
+            if target == source:
+                continue
+            copy = copy_dataset(dataset, target)
+            if log:
+                log(f'Moved dataset {dataset.id} of user {dataset.user_id} from {source} to {target} as {copy.id}')
+            dataset.delete()
+            moved += 1
+    return moved
+
+
+def tenant_rows(aliases):
+    """{(alias, user id): rows stored} over the given databases"""
+    rows = {}
+    for alias in aliases:
+        per_user = Dataset.objects.using(alias).order_by().values('user_id').annotate(rows=Sum('total_records'))
+        for row in per_user:
+            rows[(alias, row['user_id'])] = row['rows'] or 0
+    return rows
+
+
+def plan_rebalance(rows, assignments, shard_count, tolerance):
+    """
+    New shard of every user that should move, as {user id: shard}.
+
+    ``rows`` maps user ids to rows stored and ``assignments`` user ids to
+    their current shard. While the most and least loaded shards differ by
+    more than ``tolerance`` times the mean load, the largest user whose move
+    narrows that gap moves between them. Users are never split, so one very
+    large user can keep the shards apart.
+    """
+    shards = dict(assignments)
+    loads = [0] * shard_count
+    for user_id, shard in shards.items():
+        loads[shard] += rows.get(user_id, 0)
+
+    slack = tolerance * sum(loads) / shard_count
+    while True:
+        source = loads.index(max(loads))
+        target = loads.index(min(loads))
+        gap = loads[source] - loads[target]
+        if gap <= slack:
+            break
+        # Moving r rows with 0 < r < gap lowers the sum of squared loads, so this ends
+        candidates = [user_id for user_id, shard in shards.items()
+                      if shard == source and 0 < rows.get(user_id, 0) < gap]
+        if not candidates:
+            break
+        user_id = max(candidates, key=lambda user_id: rows.get(user_id, 0))
+        shards[user_id] = target
+        loads[source] -= rows[user_id]
+        loads[target] += rows[user_id]
+
+    return {user_id: shard for user_id, shard in shards.items() if shard != assignments.get(user_id)}
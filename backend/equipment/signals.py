@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .instrumentation import query_timer
+from .charts import purge_cached_charts
+from .events import publish
+from .expressions import derived_cache
+from .models import Dataset, TenantShard
+from .reports import purge_cached_reports, report_cache_path
+from .search import unindex_dataset
+from .shards import is_shard, reserve_id_range, shard_aliases, shard_map
+
+
+@receiver(post_save, sender=Dataset)
+def drop_stale_reports(sender, instance, created, **kwargs):
+    """Editing a dataset changes its fingerprint, orphaning older cached reports and charts"""
+    if not created:
+        purge_cached_reports(instance.id, keep=report_cache_path(instance))
+        purge_cached_charts(instance.id, keep_fingerprint=instance.fingerprint())
+
+
+@receiver(pre_delete, sender=Dataset)
+def unindex_deleted_dataset(sender, instance, using, **kwargs):
+    """Drop search entries while the dataset's rows, which say what to drop, still exist"""
+    unindex_dataset(instance.id, using)
+
+
+@receiver(post_delete, sender=Dataset)
+def drop_deleted_reports(sender, instance, **kwargs):
+    """Remove cached reports, charts and derived values of deleted or pruned datasets, and tell the owner's clients"""
+    purge_cached_reports(instance.id)
+    purge_cached_charts(instance.id)
+    derived_cache.forget_dataset(instance.id)
+    publish(instance.user_id, 'dataset.deleted', {'id': instance.id})
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_datasets(sender, instance, **kwargs):
+    """Datasets are in the shards, out of reach of the main database's cascades"""
+    for alias in ['default', *shard_aliases()]:
+        Dataset.objects.using(alias).filter(user=instance).delete()
+
+
+@receiver(post_save, sender=TenantShard)
+@receiver(post_delete, sender=TenantShard)
+def evict_changed_assignment(sender, instance, **kwargs):
+    shard_map.forget(instance.user_id)
+
+
+@receiver(post_migrate)
+def reserve_shard_ids(sender, using, **kwargs):
+    if sender.name == 'equipment' and is_shard(using):
+        reserve_id_range(using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_changed_user(sender, instance, **kwargs):
+    """Cached entries hold the user object, so any change (e.g. deactivation) drops them"""
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Count every query per request, including those run by async views in worker threads"""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
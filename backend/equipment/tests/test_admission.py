@@ -0,0 +1,145 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from equipment.admission import AdmissionRejected, IngestionBudget, estimate_cost, ingestion_budget
+
+CONTENT = b'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,10,2,90\n'
+
+
+@override_settings(INGEST_MEMORY_BUDGET=100, INGEST_MAX_QUEUED=2, INGEST_QUEUE_TIMEOUT=5, INGEST_RETRY_AFTER=7)
+class IngestionBudgetTests(SimpleTestCase):
+    def acquire_in_thread(self, budget, cost, admitted, errors):
+        queued = threading.Event()
+
+        def run():
+            try:
+                budget.acquire(cost, on_queued=queued.set)
+                admitted.append(cost)
+            except AdmissionRejected as e:
+                errors.append(e)
+                queued.set()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.assertTrue(queued.wait(5))
+        self.addCleanup(thread.join, 5)
+        return thread
+
+    def test_admits_while_the_budget_fits(self):
+        budget = IngestionBudget()
+        budget.acquire(60)
+        budget.acquire(40)
+
+        self.assertEqual(budget.stats()['in_use'], 100)
+        budget.release(60)
+        budget.release(40)
+        self.assertEqual(budget.stats()['in_use'], 0)
+        self.assertEqual(budget.stats()['active'], 0)
+
+    def test_waiters_are_admitted_in_arrival_order(self):
+        budget = IngestionBudget()
+        budget.acquire(60)
+        admitted, errors = [], []
+        large = self.acquire_in_thread(budget, 60, admitted, errors)
+        # Would fit next to the first upload, but must not overtake the large one
+        small = self.acquire_in_thread(budget, 10, admitted, errors)
+        self.assertEqual(admitted, [])
+
+        budget.release(60)
+        large.join(5)
+        small.join(5)
+
+        self.assertEqual(admitted, [60, 10])
+        self.assertEqual(errors, [])
+        self.assertEqual(budget.stats()['in_use'], 70)
+
+    @override_settings(INGEST_MAX_QUEUED=0)
+    def test_full_queue_is_rejected_at_once(self):
+        budget = IngestionBudget()
+        budget.acquire(100)
+
+        with self.assertRaises(AdmissionRejected) as raised:
+            budget.acquire(1)
+
+        self.assertEqual(raised.exception.retry_after, 7)
+        self.assertEqual(budget.stats()['rejected'], 1)
+
+    @override_settings(INGEST_QUEUE_TIMEOUT=0.05)
+    def test_wait_times_out_and_leaves_the_line(self):
+        budget = IngestionBudget()
+        budget.acquire(100)
+        queued = mock.Mock()
+
+        with self.assertRaises(AdmissionRejected):
+            budget.acquire(1, on_queued=queued)
+
+        queued.assert_called_once_with()
+        self.assertEqual(budget.stats()['waiting'], 0)
+        budget.release(100)
+        budget.acquire(1)
+
+    @override_settings(INGEST_MEMORY_BUDGET=estimate_cost(1000))
+    def test_files_over_the_budget_take_all_of_it(self):
+        budget = IngestionBudget()
+
+        self.assertEqual(budget.cost_of(999), estimate_cost(999))
+        self.assertEqual(budget.cost_of(1000), estimate_cost(1000))
+        self.assertEqual(budget.cost_of(10 ** 9), estimate_cost(1000))
+
+
+class UploadAdmissionTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('admitted', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self):
+        return self.client.post(
+            '/api/datasets/upload/',
+            {'file': SimpleUploadedFile('data.csv', CONTENT, content_type='text/csv')},
+            format='multipart',
+        )
+
+    def test_exhausted_budget_gets_503_with_retry_after(self):
+        settings = override_settings(
+            INGEST_MEMORY_BUDGET=estimate_cost(1024), INGEST_MAX_QUEUED=0, INGEST_RETRY_AFTER=7
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Leaves only the fixed cost free, too little for any file
+        held = estimate_cost(1024) - estimate_cost(0)
+        ingestion_budget.acquire(held)
+        self.addCleanup(ingestion_budget.release, held)
+
+        with mock.patch('equipment.views.publish'):
+            response = self.upload()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+
+    def test_files_up_to_the_size_limit_are_accepted(self):
+        for limit, expected in ((len(CONTENT), 201), (len(CONTENT) - 1, 413)):
+            with self.subTest(limit=limit), override_settings(INGEST_MAX_FILE_SIZE=limit):
+                with mock.patch('equipment.views.publish'):
+                    response = self.upload()
+
+                self.assertEqual(response.status_code, expected)
+        self.assertEqual(ingestion_budget.stats()['in_use'], 0)
+
+    def test_files_estimated_over_the_budget_run_alone(self):
+        settings = override_settings(INGEST_MEMORY_BUDGET=estimate_cost(0), INGEST_MAX_QUEUED=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        with mock.patch('equipment.views.publish'):
+            self.assertEqual(self.upload().status_code, 201)
+            ingestion_budget.acquire(1)
+            self.addCleanup(ingestion_budget.release, 1)
+            self.assertEqual(self.upload().status_code, 503)
@@ -0,0 +1,84 @@
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from equipment.anomalies import ANOMALY_THRESHOLD, score_anomalies
+from equipment.models import Equipment
+from equipment.shards import user_datasets
+
+from .utils import create_dataset
+
+PUMPS = [(f'Pump-{i}', 'Pump', flowrate, 2.0, 100.0) for i, flowrate in enumerate([10, 11, 10.5, 9.8, 10.2])]
+
+
+class ScoreAnomaliesTests(SimpleTestCase):
+    def test_outlier_scores_against_its_own_type(self):
+        types = ['Pump'] * 5 + ['Valve'] * 3
+        values = [[10, 2], [11, 2], [10.5, 2], [9.8, 2], [500, 2], [500, 1], [510, 1], [490, 1]]
+
+        scores, flags = score_anomalies(types, values)
+
+        self.assertGreater(scores[4], ANOMALY_THRESHOLD)
+        # 500 is ordinary for a valve
+        self.assertTrue(np.all(scores[[0, 1, 2, 3, 5, 6, 7]] <= ANOMALY_THRESHOLD))
+        self.assertEqual(flags.tolist(), [False] * 4 + [True] + [False] * 3)
+
+    def test_constant_columns_score_zero(self):
+        scores, flags = score_anomalies(['Pump'] * 3, [[1, 1], [1, 1], [1, 1]])
+
+        self.assertEqual(scores.tolist(), [0.0, 0.0, 0.0])
+        self.assertFalse(flags.any())
+
+
+class AnomaliesEndpointTests(TestCase):
+    databases = '__all__'
+
+    def test_rows_above_threshold_highest_first(self):
+        user = User.objects.create_user('analyst', password='secret')
+        dataset = create_dataset(user, rows=PUMPS + [('Pump-big', 'Pump', 500.0, 2.0, 100.0),
+                                                     ('Pump-bigger', 'Pump', 900.0, 2.0, 100.0)])
+        equipment = Equipment.objects.using(dataset._state.db).filter(dataset=dataset).order_by('id')
+        scores, flags = score_anomalies(
+            ['Pump'] * 7, list(equipment.values_list('flowrate', 'pressure', 'temperature'))
+        )
+        for row, score, flag in zip(equipment, scores, flags):
+            row.anomaly_score = score
+            row.is_anomaly = flag
+            row.save(update_fields=['anomaly_score', 'is_anomaly'])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get(f'/api/datasets/{dataset.id}/anomalies/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([row['equipment_name'] for row in response.data['results']], ['Pump-bigger', 'Pump-big'])
+
+    def test_upload_stores_scores_and_flags(self):
+        user = User.objects.create_user('uploader', password='secret')
+        client = APIClient()
+        client.force_authenticate(user)
+        lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        lines += [f'{name},{kind},{flowrate},{pressure},{temperature}'
+                  for name, kind, flowrate, pressure, temperature in PUMPS]
+        lines.append('Pump-big,Pump,500,2,100')
+        content = ('\n'.join(lines) + '\n').encode('utf-8')
+
+        with mock.patch('equipment.views.publish'):
+            response = client.post(
+                '/api/datasets/upload/',
+                {'file': SimpleUploadedFile('pumps.csv', content, content_type='text/csv')},
+                format='multipart',
+            )
+
+        self.assertEqual(response.status_code, 201)
+        dataset = user_datasets(user).get()
+        flagged = dataset.equipment.filter(is_anomaly=True)
+        self.assertEqual(list(flagged.values_list('equipment_name', flat=True)), ['Pump-big'])
+        self.assertGreater(flagged.get().anomaly_score, ANOMALY_THRESHOLD)
+        response = client.get(f'/api/datasets/{dataset.id}/anomalies/')
+        self.assertEqual([row['equipment_name'] for row in response.data['results']], ['Pump-big'])
@@ -0,0 +1,113 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .utils import SAMPLE_ROWS, create_dataset
+
+
+@async_to_sync
+async def read_stream(response):
+    """The chunks of a streaming response whose content is an async iterator"""
+    return [chunk async for chunk in response.streaming_content]
+
+
+class AsyncViewTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('awaiter', password='secret')
+        self.client = APIClient()
+        # The async views authenticate the Token header themselves
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.dataset = create_dataset(self.user)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return json.loads(b''.join(read_stream(response)))
+        return response.json()
+
+    def assert_same_payload(self, path, **params):
+        self.assertEqual(
+            self.get_json(f'/api/async/datasets/{path}', **params),
+            self.get_json(f'/api/datasets/{path}', **params),
+        )
+
+    def test_summary_streams_every_row_in_chunks(self):
+        # Smaller than the dataset, so rows span several chunks
+        with mock.patch('equipment.async_views.SUMMARY_CHUNK_SIZE', 3):
+            response = self.client.get(f'/api/async/datasets/{self.dataset.id}/summary/')
+            self.assertTrue(response.streaming)
+            chunks = read_stream(response)
+
+        summary = json.loads(b''.join(chunks))
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertCountEqual([row['equipment_name'] for row in summary['equipment']],
+                              [row[0] for row in SAMPLE_ROWS])
+        self.assertEqual(summary['type_distribution'], {'Pump': 2, 'Valve': 1, 'Reactor': 1})
+
+    def test_summary_of_an_empty_dataset_is_valid_json(self):
+        empty = create_dataset(self.user, rows=SAMPLE_ROWS[:1])
+        empty.equipment.all().delete()
+
+        summary = self.get_json(f'/api/async/datasets/{empty.id}/summary/')
+
+        self.assertEqual(summary['equipment'], [])
+
+    def test_payloads_match_the_sync_views(self):
+        self.assert_same_payload(f'{self.dataset.id}/summary/')
+        self.assert_same_payload(f'{self.dataset.id}/summary/', equipment='false')
+        self.assert_same_payload(f'{self.dataset.id}/aggregates/', bins=4)
+        self.assert_same_payload(f'{self.dataset.id}/equipment/', limit=2)
+        self.assertEqual(
+            [dataset['id'] for dataset in self.get_json('/api/async/datasets/')],
+            [dataset['id'] for dataset in self.get_json('/api/datasets/')],
+        )
+
+    def test_overview_is_not_streamed_and_has_its_own_etag(self):
+        url = f'/api/async/datasets/{self.dataset.id}/summary/'
+        full = self.client.get(url)
+        overview = self.client.get(url, {'equipment': 'false'})
+
+        self.assertFalse(overview.streaming)
+        self.assertNotIn('equipment', overview.json())
+        self.assertNotEqual(full['ETag'], overview['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, {'equipment': 'false'}, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 200
+        )
+
+    def test_other_users_datasets_are_not_found(self):
+        other = create_dataset(User.objects.create_user('stranger', password='secret'))
+
+        response = self.client.get(f'/api/async/datasets/{other.id}/summary/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_requests_need_a_valid_token(self):
+        url = f'/api/async/datasets/{self.dataset.id}/summary/'
+
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        anonymous = APIClient()
+        anonymous.credentials(HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(anonymous.get(url).status_code, 401)
+
+    def test_only_get_is_allowed(self):
+        response = self.client.post(f'/api/async/datasets/{self.dataset.id}/summary/')
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_bad_parameters_are_rejected(self):
+        self.assertEqual(
+            self.client.get(f'/api/async/datasets/{self.dataset.id}/aggregates/', {'bins': 'x'}).status_code, 400
+        )
+        self.assertEqual(
+            self.client.get(f'/api/async/datasets/{self.dataset.id}/equipment/', {'after': 'x'}).status_code, 400
+        )
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from equipment.authentication import TokenCache, token_cache
+
+
+class TokenCacheTests(SimpleTestCase):
+    def test_entries_expire(self):
+        cache = TokenCache(max_entries=10, ttl=60)
+        user = User(pk=1)
+        with mock.patch('equipment.authentication.time.monotonic', return_value=1000.0):
+            cache.set('key', 'token', user)
+        with mock.patch('equipment.authentication.time.monotonic', return_value=1059.0):
+            self.assertEqual(cache.get('key'), ('token', user))
+        with mock.patch('equipment.authentication.time.monotonic', return_value=1060.0):
+            self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_least_recently_used_entries_go_first(self):
+        cache = TokenCache(max_entries=2, ttl=60)
+        cache.set('a', 'A', User(pk=1))
+        cache.set('b', 'B', User(pk=2))
+        cache.get('a')
+        cache.set('c', 'C', User(pk=3))
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate_user_drops_all_their_tokens(self):
+        cache = TokenCache(max_entries=10, ttl=60)
+        cache.set('a', 'A', User(pk=1))
+        cache.set('b', 'B', User(pk=1))
+        cache.set('c', 'C', User(pk=2))
+
+        cache.invalidate_user(1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user('tokened', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get('/api/datasets/').status_code, 200)
+        hits = token_cache.stats()['hits']
+
+        self.assertEqual(self.client.get('/api/datasets/').status_code, 200)
+        self.assertEqual(token_cache.stats()['hits'], hits + 1)
+
+    def test_deleted_tokens_stop_working_at_once(self):
+        self.assertEqual(self.client.get('/api/datasets/').status_code, 200)
+
+        self.token.delete()
+
+        self.assertEqual(self.client.get('/api/datasets/').status_code, 401)
+
+    def test_deactivated_users_stop_working_at_once(self):
+        self.assertEqual(self.client.get('/api/datasets/').status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/api/datasets/').status_code, 401)
@@ -0,0 +1,50 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from equipment.models import DerivedColumn
+
+from .utils import create_dataset
+
+
+class ChartEndpointTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        caches = override_settings(CHART_CACHE_DIR=Path(tmp.name))
+        caches.enable()
+        self.addCleanup(caches.disable)
+        self.user = User.objects.create_user('charter', password='secret')
+        self.dataset = create_dataset(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_chart(self, **params):
+        return self.client.get(f'/api/datasets/{self.dataset.id}/chart/', params)
+
+    def test_charts_of_dataset_columns_skip_derived_lookup(self):
+        with mock.patch('equipment.views.derived_columns') as lookup:
+            for params in ({'kind': 'averages'}, {'kind': 'distribution'},
+                           {'kind': 'histogram', 'column': 'pressure'}, {'kind': 'histogram'}):
+                self.get_chart(**params)
+        lookup.assert_not_called()
+
+    def test_histogram_of_derived_column(self):
+        DerivedColumn.objects.create(user=self.user, name='power', expression='pressure * flowrate')
+
+        response = self.get_chart(kind='histogram', column='power')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_unknown_histogram_column(self):
+        response = self.get_chart(kind='histogram', column='power')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('derived column', response.data['error'])
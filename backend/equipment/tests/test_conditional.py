@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from equipment.shards import user_datasets
+
+from .utils import create_dataset
+
+
+class ConditionalGetTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('revalidator', password='secret')
+        self.client = APIClient()
+        # Token rather than force_authenticate, so the plain Django async views authenticate too
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.dataset = create_dataset(self.user)
+
+    def assert_revalidates(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+        return etag
+
+    def test_unchanged_datasets_answer_304(self):
+        for prefix in ('/api/datasets', '/api/async/datasets'):
+            with self.subTest(prefix=prefix):
+                self.assert_revalidates(f'{prefix}/{self.dataset.id}/summary/')
+                self.assert_revalidates(f'{prefix}/{self.dataset.id}/aggregates/')
+
+    def test_sync_and_async_views_share_etags(self):
+        sync = self.client.get(f'/api/datasets/{self.dataset.id}/aggregates/', {'bins': 5})
+        async_ = self.client.get(f'/api/async/datasets/{self.dataset.id}/aggregates/', {'bins': 5})
+
+        self.assertEqual(sync['ETag'], async_['ETag'])
+
+    def test_etag_varies_with_options(self):
+        url = f'/api/datasets/{self.dataset.id}/'
+        etags = {
+            self.assert_revalidates(url + 'summary/'),
+            self.assert_revalidates(url + 'summary/', equipment='false'),
+            self.assert_revalidates(url + 'aggregates/', bins=5),
+            self.assert_revalidates(url + 'aggregates/', bins=10),
+        }
+
+        self.assertEqual(len(etags), 4)
+
+    def test_changed_dataset_is_sent_again(self):
+        url = f'/api/datasets/{self.dataset.id}/summary/'
+        etag = self.assert_revalidates(url)
+        user_datasets(self.user).filter(pk=self.dataset.pk).update(filename='renamed.csv')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['filename'], 'renamed.csv')
+
+    def test_wildcard_and_lists_match(self):
+        url = f'/api/datasets/{self.dataset.id}/summary/'
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"stale", {etag}').status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
@@ -0,0 +1,143 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+
+from chemical_equipment_api.asgi import application
+from equipment.asgi import DisconnectListener
+from equipment.events import EVENT_HISTORY, EventBroker, broker, format_event
+
+
+class EventBrokerTests(SimpleTestCase):
+    async def test_subscribers_receive_their_users_events(self):
+        events = EventBroker()
+        subscription, backlog, position = events.subscribe(1)
+        events.publish(2, 'dataset.created', {'id': 9})
+        published = events.publish(1, 'dataset.created', {'id': 7})
+
+        received = await asyncio.wait_for(subscription.get(), 1)
+
+        self.assertEqual((backlog, position), ([], 0))
+        self.assertEqual(received, published)
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_reconnecting_clients_get_what_they_missed(self):
+        events = EventBroker()
+        events.publish(1, 'dataset.created', {'id': 1})
+        events.publish(1, 'upload.progress', {'stage': 'parsing'}, transient=True)
+        events.publish(1, 'dataset.deleted', {'id': 1})
+
+        _, backlog, position = events.subscribe(1, last_event_id=1)
+
+        # Transient events are not replayed
+        self.assertEqual(backlog, [(3, 'dataset.deleted', {'id': 1})])
+        self.assertEqual(position, 3)
+
+    async def test_clients_too_far_behind_resync(self):
+        events = EventBroker()
+        for index in range(EVENT_HISTORY + 5):
+            events.publish(1, 'dataset.created', {'id': index})
+
+        _, lost, _ = events.subscribe(1, last_event_id=2)
+        _, unknown, _ = events.subscribe(1, last_event_id=10 ** 6)
+
+        self.assertEqual(lost, [(EVENT_HISTORY + 5, 'resync', {})])
+        self.assertEqual(unknown, [(EVENT_HISTORY + 5, 'resync', {})])
+
+    async def test_unsubscribed_streams_get_nothing(self):
+        events = EventBroker()
+        subscription, _, _ = events.subscribe(1)
+
+        events.unsubscribe(1, subscription)
+        events.publish(1, 'dataset.created', {})
+        await asyncio.sleep(0)
+
+        self.assertEqual(events.subscriber_count(), 0)
+        self.assertTrue(subscription.queue.empty())
+
+    def test_format(self):
+        self.assertEqual(
+            format_event((4, 'dataset.deleted', {'id': 2})), 'id: 4\nevent: dataset.deleted\ndata: {"id": 2}\n\n'
+        )
+
+
+class DisconnectListenerTests(SimpleTestCase):
+    async def test_sets_disconnected_and_passes_messages_on(self):
+        client = asyncio.Queue()
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(await receive())
+            await scope['disconnected'].wait()
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        client.put_nowait({'type': 'http.request', 'body': b'x', 'more_body': False})
+        task = asyncio.ensure_future(DisconnectListener(app)({'type': 'http'}, client.get, send))
+        await asyncio.sleep(0.01)
+        self.assertFalse(task.done())
+
+        client.put_nowait({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+
+        self.assertEqual(seen, [{'type': 'http.request', 'body': b'x', 'more_body': False}])
+        self.assertEqual(sent[0]['status'], 200)
+
+
+class EventStreamTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('listener', password='secret')
+        self.token = Token.objects.create(user=self.user).key
+        # As the test clients do: closing connections per request would end the test's transaction
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    async def test_stream_delivers_events_and_unsubscribes_on_disconnect(self):
+        # As served by uvicorn: the project's ASGI application, fed by a fake client
+        client, sent = asyncio.Queue(), asyncio.Queue()
+        client.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': '/api/async/events/', 'raw_path': b'/api/async/events/', 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Token {self.token}'.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        before = broker.subscriber_count()
+        task = asyncio.ensure_future(application(scope, client.get, sent.put))
+
+        async def next_message():
+            return await asyncio.wait_for(sent.get(), 5)
+
+        start = await next_message()
+        first = await next_message()
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'Content-Type', b'text/event-stream'), start['headers'])
+        self.assertIn(b'retry:', first['body'])
+        self.assertEqual(broker.subscriber_count(), before + 1)
+
+        await sync_to_async(broker.publish)(self.user.id, 'dataset.created', {'id': 5})
+        event = await next_message()
+        self.assertIn(b'event: dataset.created\ndata: {"id": 5}', event['body'])
+
+        client.put_nowait({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 5)
+
+        self.assertEqual(broker.subscriber_count(), before)
+
+    async def test_wsgi_requests_are_told_to_use_asgi(self):
+        response = await sync_to_async(self.client.get)(
+            '/api/async/events/', HTTP_AUTHORIZATION=f'Token {self.token}'
+        )
+
+        self.assertEqual(response.status_code, 503)
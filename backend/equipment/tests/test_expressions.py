@@ -0,0 +1,196 @@
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from equipment.expressions import (
+    MAX_EXPRESSION_LENGTH, DerivedCache, ExpressionError, derived_cache, evaluate, normalize_expression,
+    parse_expression, validate_derived_name,
+)
+
+from .utils import create_dataset
+
+COLUMNS = {
+    'flowrate': np.array([1.0, 2.0, 0.0]),
+    'pressure': np.array([2.0, 0.0, 3.0]),
+    'temperature': np.array([10.0, 20.0, 30.0]),
+}
+
+
+class ParseExpressionTests(SimpleTestCase):
+    def test_arithmetic_over_columns_is_accepted(self):
+        for text in ('pressure * flowrate', 'temperature + 273.15', '(temperature - 32) * 5 / 9',
+                     '-flowrate ** 2', 'sqrt(abs(pressure))', 'max(pressure, 2)', 'log10(1e3)'):
+            with self.subTest(text=text):
+                parse_expression(text)
+
+    def test_anything_else_is_rejected(self):
+        rejected = (
+            '__import__("os").system("true")',
+            'flowrate.__class__',
+            'pressure.real',
+            'open("/etc/passwd")',
+            'eval("1")',
+            '(lambda: 1)()',
+            '[flowrate]',
+            'flowrate if pressure else temperature',
+            'pressure < 2',
+            'pressure and flowrate',
+            'flowrate // 2',
+            'flowrate % 2',
+            'flowrate[0]',
+            'x + 1',
+            'np.sqrt(flowrate)',
+            'sqrt(x=flowrate)',
+            'log(flowrate, 2)',
+            'min(flowrate)',
+            '"text"',
+            'True',
+            '1j',
+            'flowrate; pressure',
+            'pressure := 1',
+            '',
+            '   ',
+            None,
+        )
+        for text in rejected:
+            with self.subTest(text=text):
+                with self.assertRaises(ExpressionError):
+                    parse_expression(text)
+
+    def test_length_and_nesting_are_bounded(self):
+        with self.assertRaises(ExpressionError):
+            parse_expression('1+' * MAX_EXPRESSION_LENGTH + '1')
+        with self.assertRaises(ExpressionError):
+            parse_expression('9' * 400)
+        # Deep but short nesting parses fine
+        parse_expression('-' * 150 + 'flowrate')
+
+    def test_normalized_spelling(self):
+        self.assertEqual(normalize_expression('((pressure*flowrate))'), 'pressure * flowrate')
+        self.assertEqual(normalize_expression(' temperature+273.15 '), 'temperature + 273.15')
+
+    def test_reserved_and_malformed_names(self):
+        validate_derived_name('power_kw2')
+        for name in ('pressure', 'sqrt', 'Power', '2power', 'power-kw', '', 'a' * 41, None):
+            with self.subTest(name=name):
+                with self.assertRaises(ExpressionError):
+                    validate_derived_name(name)
+
+
+class EvaluateTests(SimpleTestCase):
+    def test_vectorized_over_columns(self):
+        values = evaluate('pressure * flowrate + 1', COLUMNS, 3)
+
+        self.assertEqual(values.tolist(), [3.0, 1.0, 1.0])
+
+    def test_undefined_values_become_nan(self):
+        values = evaluate('pressure / flowrate', COLUMNS, 3)
+
+        self.assertEqual(values[:2].tolist(), [2.0, 0.0])
+        self.assertTrue(np.isnan(values[2]))
+        self.assertTrue(np.isnan(evaluate('log(pressure - 2)', COLUMNS, 3)[0:2]).all())
+
+    def test_huge_powers_overflow_instead_of_hanging(self):
+        self.assertTrue(np.isnan(evaluate('10 ** 10 ** 10', COLUMNS, 3)).all())
+
+    def test_constants_fill_every_row(self):
+        self.assertEqual(evaluate('7', COLUMNS, 3).tolist(), [7.0, 7.0, 7.0])
+
+    def test_invalid_expressions_are_not_evaluated(self):
+        with self.assertRaises(ExpressionError):
+            evaluate('__import__("os")', COLUMNS, 3)
+
+
+class DerivedCacheTests(SimpleTestCase):
+    def test_least_recently_used_entries_go_first(self):
+        cache = DerivedCache(max_bytes=100)
+        cache.set('a', 'A', 40)
+        cache.set('b', 'B', 40)
+        cache.get('a')
+        cache.set('c', 'C', 40)
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['bytes'], 80)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_larger_than_the_cache_are_not_kept(self):
+        cache = DerivedCache(max_bytes=100)
+        cache.set('a', 'A', 101)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_forget_dataset(self):
+        cache = DerivedCache(max_bytes=100)
+        cache.set((1, 'f', 'x'), 'one', 10)
+        cache.set((2, 'f', 'x'), 'two', 10)
+        cache.forget_dataset(1)
+
+        self.assertIsNone(cache.get((1, 'f', 'x')))
+        self.assertEqual(cache.get((2, 'f', 'x')), 'two')
+        self.assertEqual(cache.stats()['bytes'], 10)
+
+
+class DerivedColumnApiTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        derived_cache.clear()
+        self.user = User.objects.create_user('deriver', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def define(self, name, expression):
+        return self.client.post('/api/derived-columns/', {'name': name, 'expression': expression}, format='json')
+
+    def test_unsafe_expressions_are_not_saved(self):
+        response = self.define('evil', '__import__("os").system("true")')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expression', response.data)
+
+    def test_names_are_unique_per_user(self):
+        self.assertEqual(self.define('power', 'pressure*flowrate').status_code, 201)
+        self.assertEqual(self.define('power', 'pressure').status_code, 400)
+        other = User.objects.create_user('other', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.define('power', 'pressure').status_code, 201)
+
+    def test_aggregates_include_derived_columns(self):
+        dataset = create_dataset(self.user)
+        response = self.define('power', 'pressure*flowrate')
+        self.assertEqual(response.data['expression'], 'pressure * flowrate')
+
+        response = self.client.get(f'/api/datasets/{dataset.id}/aggregates/', {'derived': 'power', 'bins': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['derived'], {'power': 'pressure * flowrate'})
+        self.assertAlmostEqual(response.data['columns']['power']['max'], 150.0 * 6.3)
+        self.assertAlmostEqual(response.data['by_type']['Pump']['avg_power'], (120.0 * 5.2 + 115.0 * 5.0) / 2)
+        self.assertEqual(sum(response.data['histograms']['power']['counts']), 4)
+
+    def test_redefining_a_column_changes_the_etag(self):
+        dataset = create_dataset(self.user)
+        column_id = self.define('power', 'pressure*flowrate').data['id']
+        url = f'/api/datasets/{dataset.id}/aggregates/'
+        etag = self.client.get(url, {'derived': 'power'})['ETag']
+
+        self.assertEqual(self.client.get(url, {'derived': 'power'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.patch(f'/api/derived-columns/{column_id}/', {'expression': 'pressure'}, format='json')
+        response = self.client.get(url, {'derived': 'power'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['columns']['power']['max'], 6.3)
+
+    def test_unknown_or_foreign_columns_are_rejected(self):
+        dataset = create_dataset(self.user)
+        other = User.objects.create_user('other', password='secret')
+        self.client.force_authenticate(other)
+        self.define('theirs', 'pressure')
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(f'/api/datasets/{dataset.id}/aggregates/', {'derived': 'theirs'})
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,115 @@
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from equipment.instrumentation import Counter, Histogram, span
+
+from .utils import create_dataset
+
+SERVER_TIMING_ENTRY = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+def server_timing(response):
+    """{name: (milliseconds, queries or None)} of a Server-Timing header"""
+    return {
+        name: (float(duration), int(queries) if queries else None)
+        for name, duration, queries in SERVER_TIMING_ENTRY.findall(response['Server-Timing'])
+    }
+
+
+class MetricTypeTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', (0.1, 1.0))
+        labels = (('endpoint', 'list'),)
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(labels, value)
+
+        self.assertEqual(histogram.render(), [
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{endpoint="list",le="0.1"} 1',
+            'latency_seconds_bucket{endpoint="list",le="1.0"} 2',
+            'latency_seconds_bucket{endpoint="list",le="+Inf"} 3',
+            'latency_seconds_sum{endpoint="list"} 5.55',
+            'latency_seconds_count{endpoint="list"} 3',
+        ])
+
+    def test_label_values_are_escaped(self):
+        counter = Counter('queries_total', 'Queries.')
+        counter.inc((('endpoint', 'a"b\\c'),), 2)
+
+        self.assertEqual(counter.render()[-1], 'queries_total{endpoint="a\\"b\\\\c"} 2')
+
+    def test_span_outside_a_request_is_a_no_op(self):
+        with span('idle'):
+            pass
+
+
+class PerformanceMiddlewareTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('timed', password='secret')
+        self.token = Token.objects.create(user=self.user).key
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.dataset = create_dataset(self.user)
+
+    def test_server_timing_reports_total_db_and_spans(self):
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/aggregates/', {'derived': ''})
+
+        timings = server_timing(response)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(timings['total'][0], 0)
+        self.assertGreaterEqual(timings['total'][0], timings['db'][0])
+        self.assertGreater(timings['db'][1], 0)
+
+    def test_upload_spans_are_reported(self):
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,10,2,90\n'
+        with mock.patch('equipment.views.publish'):
+            response = self.client.post(
+                '/api/datasets/upload/?equipment=false',
+                {'file': SimpleUploadedFile('timed.csv', csv, content_type='text/csv')},
+                format='multipart',
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue({'admission', 'parse', 'validate', 'aggregate', 'anomalies', 'insert', 'prune'}
+                        <= set(server_timing(response)))
+
+    def test_metrics_count_requests_per_endpoint(self):
+        series = 'http_request_duration_seconds_count{endpoint="dataset-list",method="GET",status="200"}'
+
+        def scrape():
+            response = self.client.get('/metrics')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+            text = response.content.decode()
+            match = re.search(re.escape(series) + r' (\d+)', text)
+            return text, int(match.group(1)) if match else 0
+
+        _, before = scrape()
+        self.client.get('/api/datasets/')
+        self.client.get('/api/datasets/')
+        text, after = scrape()
+
+        self.assertEqual(after, before + 2)
+        self.assertIn('http_request_db_queries_total{endpoint="dataset-list",method="GET"}', text)
+        self.assertIn('http_response_size_bytes_bucket{endpoint="dataset-list",method="GET",le="1024"}', text)
+        for gauge in ('token_auth_cache_hit_rate', 'event_stream_subscribers', 'ingest_memory_in_use_bytes',
+                      'derived_cache_bytes'):
+            self.assertRegex(text, rf'# TYPE {gauge} gauge\n{gauge} [\d.]+\n')
+
+    async def test_async_views_are_timed_too(self):
+        response = await self.async_client.get(
+            '/api/async/datasets/', headers={'Authorization': f'Token {self.token}'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total', server_timing(response))
+        self.assertGreater(server_timing(response)['db'][1], 0)
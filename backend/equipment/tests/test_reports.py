@@ -0,0 +1,53 @@
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from equipment.reports import iter_reports_zip, report_cache_path, report_filename
+
+from .utils import create_dataset
+
+
+class BulkReportTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+        caches = override_settings(
+            REPORT_CACHE_DIR=self.cache_dir / 'reports',
+            CHART_CACHE_DIR=self.cache_dir / 'charts',
+            REPORT_WORKERS=2,
+        )
+        caches.enable()
+        self.addCleanup(caches.disable)
+        self.user = User.objects.create_user('reporter', password='secret')
+
+    def read_zip(self, datasets):
+        return zipfile.ZipFile(io.BytesIO(b''.join(iter_reports_zip(datasets))))
+
+    def test_cold_cache_reports_render_in_spawned_workers(self):
+        datasets = [create_dataset(self.user, filename=f'set{i}.csv') for i in range(2)]
+
+        archive = self.read_zip(datasets)
+
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(report_filename(dataset.id) for dataset in datasets),
+        )
+        for dataset in datasets:
+            self.assertTrue(archive.read(report_filename(dataset.id)).startswith(b'%PDF'))
+            self.assertTrue(report_cache_path(dataset).exists())
+
+    def test_warm_cache_reports_are_served_from_disk(self):
+        dataset = create_dataset(self.user)
+        self.read_zip([dataset])
+        cached = report_cache_path(dataset).read_bytes()
+
+        archive = self.read_zip([dataset])
+
+        self.assertEqual(archive.read(report_filename(dataset.id)), cached)
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from equipment.search import MAX_SEARCH_TERMS, match_expression
+from equipment.shards import shard_for, user_datasets
+
+CSV_HEADER = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+
+
+class MatchExpressionTests(SimpleTestCase):
+    def test_words_become_quoted_prefixes(self):
+        self.assertEqual(match_expression(7, 'Pump-B2'), 'owner:u7 AND equipment_name:("pump"* AND "b2"*)')
+
+    def test_query_syntax_is_not_passed_through(self):
+        for query in ('pump OR valve', 'owner:u2', '"pump', 'NEAR(pump valve)', 'pump*', '(pump', '-pump', '^pump'):
+            with self.subTest(query=query):
+                expression = match_expression(7, query)
+
+                self.assertTrue(expression.startswith('owner:u7 AND equipment_name:('))
+                names = expression[len('owner:u7 AND equipment_name:('):-1]
+                for term in names.split(' AND '):
+                    self.assertRegex(term, r'^"[^\W_]+"\*$')
+
+    def test_queries_without_words(self):
+        for query in ('', '   ', '--', '"*"', '___'):
+            with self.subTest(query=query):
+                self.assertIsNone(match_expression(7, query))
+
+    def test_terms_are_capped(self):
+        expression = match_expression(7, ' '.join(f'w{i}' for i in range(20)))
+
+        self.assertEqual(expression.count('*'), MAX_SEARCH_TERMS)
+
+
+class SearchTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('searcher', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('equipment.views.publish')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, names, filename='data.csv', client=None):
+        content = CSV_HEADER + ''.join(f'{name},Pump,10,2,100\n' for name in names)
+        response = (client or self.client).post(
+            '/api/datasets/upload/?equipment=false',
+            {'file': SimpleUploadedFile(filename, content.encode('utf-8'), content_type='text/csv')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def search(self, query, client=None):
+        response = (client or self.client).get('/api/datasets/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['equipment_name'] for row in response.data['results']]
+
+    def index_size(self, user=None):
+        with connections[shard_for((user or self.user).id)].cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM equipment_search")
+            return cursor.fetchone()[0]
+
+    def test_uploaded_rows_are_found_by_word_prefix(self):
+        dataset_id = self.upload(['Pump-B2', 'Pump-B21', 'Pump-C2', 'Valve-B2'])
+
+        self.assertCountEqual(self.search('pump b2'), ['Pump-B2', 'Pump-B21'])
+        response = self.client.get('/api/datasets/search/', {'q': 'valve'})
+        self.assertEqual(response.data['results'][0]['dataset_id'], dataset_id)
+        self.assertEqual(response.data['results'][0]['dataset_filename'], 'data.csv')
+
+    def test_deleted_datasets_leave_the_index(self):
+        dataset_id = self.upload(['Pump-A1', 'Pump-A2'])
+        self.upload(['Pump-A3'], filename='other.csv')
+        self.assertEqual(self.index_size(), 3)
+
+        self.assertEqual(self.client.delete(f'/api/datasets/{dataset_id}/').status_code, 204)
+
+        self.assertEqual(self.search('pump'), ['Pump-A3'])
+        self.assertEqual(self.index_size(), 1)
+
+    def test_pruned_datasets_leave_the_index(self):
+        for index in range(6):
+            self.upload([f'Unit-{index}'], filename=f'data{index}.csv')
+
+        self.assertEqual(user_datasets(self.user).count(), 5)
+        self.assertNotIn('Unit-0', self.search('unit'))
+        self.assertEqual(self.index_size(), 5)
+
+    def test_results_stay_within_the_user(self):
+        other = User.objects.create_user('other', password='secret')
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        self.upload(['Secret-1'], client=other_client)
+        self.upload(['Pump-1'])
+
+        self.assertEqual(self.search('secret'), [])
+        self.assertEqual(self.search(f'owner:u{other.id} secret'), [])
+        self.assertEqual(self.search('secret', client=other_client), ['Secret-1'])
+
+    def test_hostile_queries_are_answered(self):
+        self.upload(['Pump-1'])
+
+        # Punctuation only separates words, and every word must match
+        for query, expected in (('pump"', ['Pump-1']), ('(pump*)', ['Pump-1']), ('pump OR', []),
+                                ('NEAR(pump', []), ("pump'; DROP TABLE equipment_search; --", [])):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+        self.assertEqual(self.index_size(), 1)
+        self.assertEqual(self.client.get('/api/datasets/search/', {'q': '**'}).status_code, 400)
@@ -0,0 +1,187 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from equipment.models import Dataset, DerivedColumn, Equipment, TenantShard
+from equipment.shards import (
+    SHARD_ID_SPACE, ShardRouter, copy_dataset, move_misplaced_datasets, plan_rebalance, shard_alias, shard_for,
+    shard_index, shard_map, user_datasets,
+)
+
+from .utils import SAMPLE_ROWS, create_dataset
+
+
+class ShardRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ShardRouter()
+
+    def test_sharded_models_follow_their_instance(self):
+        dataset = Dataset()
+        dataset._state.db = 'shard_2'
+
+        self.assertEqual(self.router.db_for_read(Equipment, instance=dataset), 'shard_2')
+        self.assertEqual(self.router.db_for_write(Dataset, instance=dataset), 'shard_2')
+        self.assertIsNone(self.router.db_for_read(Dataset))
+
+    def test_other_models_stay_in_the_main_database(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(TenantShard), 'default')
+        self.assertEqual(self.router.db_for_read(DerivedColumn), 'default')
+
+    def test_shards_only_get_the_sharded_tables(self):
+        self.assertTrue(self.router.allow_migrate('shard_0', 'equipment', 'equipment'))
+        self.assertFalse(self.router.allow_migrate('shard_0', 'equipment'))
+        self.assertTrue(self.router.allow_migrate('shard_0', 'equipment', shards_only=True))
+        self.assertFalse(self.router.allow_migrate('default', 'equipment', shards_only=True))
+        self.assertFalse(self.router.allow_migrate('shard_0', 'equipment', 'tenantshard'))
+        self.assertFalse(self.router.allow_migrate('shard_0', 'equipment', 'derivedcolumn'))
+        self.assertFalse(self.router.allow_migrate('shard_0', 'auth', 'user'))
+        self.assertIsNone(self.router.allow_migrate('default', 'equipment', 'equipment'))
+
+
+class PlanRebalanceTests(SimpleTestCase):
+    def test_moves_users_off_the_loaded_shard(self):
+        rows = {1: 100, 2: 60, 3: 40, 4: 10}
+        assignments = {1: 0, 2: 0, 3: 0, 4: 1}
+
+        moves = plan_rebalance(rows, assignments, 2, tolerance=0.1)
+
+        loads = [0, 0]
+        for user_id, shard in {**assignments, **moves}.items():
+            loads[shard] += rows[user_id]
+        self.assertLessEqual(abs(loads[0] - loads[1]), 0.1 * sum(rows.values()) / 2)
+        self.assertNotIn(4, moves)
+
+    def test_balanced_shards_are_left_alone(self):
+        self.assertEqual(plan_rebalance({1: 50, 2: 52}, {1: 0, 2: 1}, 2, tolerance=0.1), {})
+
+    def test_users_are_never_split(self):
+        self.assertEqual(plan_rebalance({1: 1000, 2: 1}, {1: 0, 2: 1}, 2, tolerance=0.1), {})
+
+
+class ShardStorageTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        shard_map.clear()
+        self.addCleanup(shard_map.clear)
+
+    def user_on(self, username, shard):
+        user = User.objects.create_user(username, password='secret')
+        TenantShard.objects.create(user=user, shard=shard)
+        return user
+
+    def test_datasets_land_in_the_shard_id_range(self):
+        user = self.user_on('ranged', 2)
+
+        dataset = create_dataset(user)
+
+        self.assertEqual(dataset._state.db, 'shard_2')
+        base = 3 * SHARD_ID_SPACE
+        self.assertTrue(base < dataset.id < base + SHARD_ID_SPACE)
+        for row_id in dataset.equipment.values_list('id', flat=True):
+            self.assertTrue(base < row_id < base + SHARD_ID_SPACE)
+
+    def test_users_only_reach_their_own_datasets(self):
+        alice = self.user_on('alice', 1)
+        bob = self.user_on('bob', 1)
+        carol = self.user_on('carol', 3)
+        create_dataset(alice, filename='alice.csv')
+        create_dataset(carol, filename='carol.csv')
+
+        self.assertEqual(list(user_datasets(alice).values_list('filename', flat=True)), ['alice.csv'])
+        self.assertFalse(user_datasets(bob).exists())
+        self.assertFalse(Dataset.objects.using('shard_1').filter(user=carol).exists())
+
+        client = APIClient()
+        client.force_authenticate(bob)
+        dataset = user_datasets(alice).get()
+        self.assertEqual(client.get(f'/api/datasets/{dataset.id}/summary/').status_code, 404)
+        client.force_authenticate(alice)
+        self.assertEqual(client.get(f'/api/datasets/{dataset.id}/summary/').status_code, 200)
+
+    def test_assignment_changes_reach_the_cache(self):
+        user = self.user_on('moving', 0)
+        self.assertEqual(shard_for(user.id), 'shard_0')
+
+        # Bulk updates send no signals; `manage.py shards` clears the cache itself after them
+        TenantShard.objects.filter(user=user).update(shard=1)
+        self.assertEqual(shard_for(user.id), 'shard_0')
+        assignment = TenantShard.objects.get(user=user)
+        assignment.shard = 1
+        assignment.save()
+
+        self.assertEqual(shard_for(user.id), 'shard_1')
+
+    def test_copy_keeps_rows_and_maps_types(self):
+        user = self.user_on('copied', 0)
+        dataset = create_dataset(user)
+
+        copy = copy_dataset(dataset, 'shard_3')
+
+        self.assertEqual(copy._state.db, 'shard_3')
+        self.assertGreater(copy.id, 4 * SHARD_ID_SPACE)
+        self.assertEqual(copy.filename, dataset.filename)
+        self.assertEqual(
+            sorted(copy.equipment.values_list('equipment_name', 'type__name', 'flowrate', 'pressure', 'temperature')),
+            sorted(SAMPLE_ROWS),
+        )
+
+    def test_misplaced_datasets_move_to_their_owners_shard(self):
+        user = self.user_on('misplaced', 0)
+        create_dataset(user)
+        assignment = TenantShard.objects.get(user=user)
+        assignment.shard = 2
+        assignment.save()
+
+        moved = move_misplaced_datasets(['shard_0', 'shard_2'])
+
+        self.assertEqual(moved, 1)
+        self.assertFalse(Dataset.objects.using('shard_0').exists())
+        self.assertFalse(Equipment.objects.using('shard_0').exists())
+        self.assertEqual(user_datasets(user).get().equipment.count(), len(SAMPLE_ROWS))
+        self.assertEqual(move_misplaced_datasets(['shard_0', 'shard_2']), 0)
+
+    def test_deleting_a_user_deletes_their_datasets(self):
+        user = self.user_on('leaving', 1)
+        create_dataset(user)
+
+        user.delete()
+
+        self.assertFalse(Dataset.objects.using('shard_1').exists())
+        self.assertFalse(Equipment.objects.using('shard_1').exists())
+
+    def test_new_users_are_assigned_once(self):
+        user = User.objects.create_user('fresh', password='secret')
+
+        alias = shard_for(user.id)
+
+        self.assertEqual(shard_alias(TenantShard.objects.get(user=user).shard), alias)
+        shard_map.clear()
+        self.assertEqual(shard_for(user.id), alias)
+        self.assertEqual(TenantShard.objects.filter(user=user).count(), 1)
+        self.assertIn(shard_index(alias), range(4))
+
+    def test_shards_have_the_search_index(self):
+        for alias in ('shard_0', 'shard_3'):
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'equipment_search'")
+                self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_dry_run_assigns_no_shards(self):
+        # A dataset from before sharding, whose owner has no shard yet
+        user = User.objects.create_user('legacy', password='secret')
+        Dataset.objects.using('default').create(
+            user=user, filename='old.csv', total_records=10, avg_flowrate=1, avg_pressure=1, avg_temperature=1
+        )
+        self.user_on('assigned', 0)
+        output = StringIO()
+
+        call_command('shards', dry_run=True, stdout=output)
+
+        self.assertEqual(TenantShard.objects.count(), 1)
+        self.assertFalse(TenantShard.objects.filter(user=user).exists())
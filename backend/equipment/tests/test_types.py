@@ -0,0 +1,103 @@
+import csv
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from equipment.models import EquipmentType
+from equipment.shards import shard_for
+
+# Names that must come back exactly as uploaded, not as numbers or trimmed
+TYPE_NAMES = ['Heat Exchanger', '42', 'Réacteur', 'Pump']
+
+CSV = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + ''.join(
+    f'Unit-{i},"{name}",{10.0 * (i + 1)},2,{100 + i}\n'
+    for i, name in enumerate(TYPE_NAMES + ['Pump'])
+)
+
+
+class EquipmentTypeIdsTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        user = User.objects.create_user('namer', password='secret')
+        self.types = EquipmentType.objects.db_manager(shard_for(user.id))
+
+    def test_ids_follow_the_names_order(self):
+        ids = self.types.ids_for(['Pump', 'Valve', 'Pump'])
+
+        self.assertEqual(ids[0], ids[2])
+        self.assertNotEqual(ids[0], ids[1])
+        names = dict(self.types.values_list('id', 'name'))
+        self.assertEqual([names[i] for i in ids], ['Pump', 'Valve', 'Pump'])
+
+    def test_existing_types_are_reused(self):
+        pump = self.types.ids_for(['Pump'])[0]
+
+        ids = self.types.ids_for(['Valve', 'Pump'])
+
+        self.assertEqual(ids[1], pump)
+        self.assertEqual(self.types.count(), 2)
+
+    def test_names_are_stored_as_text(self):
+        ids = self.types.ids_for([42])
+
+        self.assertEqual(self.types.get(id=ids[0]).name, '42')
+
+
+class TypeEncodingTests(TestCase):
+    """Types are stored as integer keys; every response still carries the names"""
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('encoder', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dataset_id = self.upload()
+
+    def upload(self):
+        with mock.patch('equipment.views.publish'):
+            response = self.client.post(
+                '/api/datasets/upload/',
+                {'file': SimpleUploadedFile('types.csv', CSV.encode('utf-8'), content_type='text/csv')},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_rows_carry_their_type_names(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/summary/')
+
+        self.assertEqual(
+            {row['equipment_name']: row['equipment_type'] for row in response.data['equipment']},
+            {f'Unit-{i}': name for i, name in enumerate(TYPE_NAMES + ['Pump'])},
+        )
+        self.assertEqual(response.data['type_distribution'],
+                         {'Pump': 2, 'Heat Exchanger': 1, '42': 1, 'Réacteur': 1})
+
+    def test_aggregates_group_by_type_name(self):
+        by_type = self.client.get(f'/api/datasets/{self.dataset_id}/aggregates/').data['by_type']
+
+        self.assertEqual(set(by_type), set(TYPE_NAMES))
+        self.assertEqual(by_type['Pump']['count'], 2)
+        self.assertEqual(by_type['Pump']['avg_flowrate'], 45.0)
+        self.assertEqual(by_type['42']['avg_flowrate'], 20.0)
+
+    def test_export_writes_type_names(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/')
+        content = b''.join(response.streaming_content).decode('utf-8')
+
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual([row[1] for row in rows[1:]], TYPE_NAMES + ['Pump'])
+
+    def test_uploads_share_type_rows(self):
+        types = EquipmentType.objects.using(shard_for(self.user.id))
+        count = types.count()
+
+        self.upload()
+
+        self.assertEqual(types.count(), count)
+        self.assertEqual(count, len(TYPE_NAMES))
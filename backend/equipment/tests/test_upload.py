@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from equipment.admission import ingestion_budget
+
+
+class UploadTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('uploader', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='data.csv'):
+        return self.client.post(
+            '/api/datasets/upload/?upload_id=u1',
+            {'file': SimpleUploadedFile(name, content.encode('utf-8'), content_type='text/csv')},
+            format='multipart',
+        )
+
+    def progress_stages(self, publish):
+        return [call.args[2]['stage'] for call in publish.call_args_list if call.args[1] == 'upload.progress']
+
+    def test_missing_columns_publish_failure(self):
+        with mock.patch('equipment.views.publish') as publish:
+            response = self.upload('Equipment Name,Type,Flowrate\nPump-1,Pump,10\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Pressure', response.data['error'])
+        self.assertEqual(self.progress_stages(publish)[-1], 'failed')
+        self.assertEqual(ingestion_budget.stats()['in_use'], 0)
+
+    def test_upload_creates_dataset(self):
+        with mock.patch('equipment.views.publish') as publish:
+            response = self.upload(
+                'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+                'Pump-1,Pump,10,2,100\nValve-1,Valve,20,3,110\n'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_records'], 2)
+        self.assertEqual(self.progress_stages(publish)[0], 'parsing')
+        self.assertEqual(ingestion_budget.stats()['in_use'], 0)
+
+    def test_rows_with_any_gap_are_dropped(self):
+        with mock.patch('equipment.views.publish'):
+            response = self.upload(
+                'Equipment Name,Type,Flowrate,Pressure,Temperature,Notes\n'
+                'Pump-1,Pump,10,2,100,checked\n'
+                'Pump-2,Pump,,2,100,checked\n'
+                'Valve-1,Valve,20,3,110,\n'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        # A gap in an extra column drops the row too
+        self.assertEqual(response.data['total_records'], 1)
+        self.assertEqual(response.data['avg_flowrate'], 10.0)
@@ -0,0 +1,32 @@
+from django.db import transaction
+
+from equipment.models import Dataset, Equipment, EquipmentType
+from equipment.shards import shard_for
+
+SAMPLE_ROWS = [
+    ('Pump-1', 'Pump', 120.0, 5.2, 110.0),
+    ('Pump-2', 'Pump', 115.0, 5.0, 108.0),
+    ('Valve-1', 'Valve', 60.0, 4.1, 105.0),
+    ('Reactor-1', 'Reactor', 150.0, 6.3, 140.0),
+]
+
+
+def create_dataset(user, rows=SAMPLE_ROWS, filename='sample.csv'):
+    """A dataset on the user's shard holding ``rows`` of (name, type, flowrate, pressure, temperature)"""
+    db = shard_for(user.id)
+    with transaction.atomic(using=db):
+        dataset = Dataset.objects.using(db).create(
+            user=user,
+            filename=filename,
+            total_records=len(rows),
+            avg_flowrate=sum(row[2] for row in rows) / len(rows),
+            avg_pressure=sum(row[3] for row in rows) / len(rows),
+            avg_temperature=sum(row[4] for row in rows) / len(rows),
+        )
+        type_ids = EquipmentType.objects.db_manager(db).ids_for([row[1] for row in rows])
+        Equipment.objects.using(db).bulk_create([
+            Equipment(dataset=dataset, equipment_name=name, type_id=type_id,
+                      flowrate=flowrate, pressure=pressure, temperature=temperature)
+            for (name, _, flowrate, pressure, temperature), type_id in zip(rows, type_ids)
+        ])
+    return dataset
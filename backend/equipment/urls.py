@@ -1,12 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'datasets', views.DatasetViewSet, basename='dataset')
+router.register(r'derived-columns', views.DerivedColumnViewSet, basename='derived-column')
 
 urlpatterns = [
     path('auth/register/', views.register, name='register'),
     path('auth/login/', views.login, name='login'),
+    path('async/datasets/', async_views.dataset_list, name='async-dataset-list'),
+    path('async/datasets/<int:pk>/summary/', async_views.dataset_summary, name='async-dataset-summary'),
+    path('async/datasets/<int:pk>/aggregates/', async_views.dataset_aggregates, name='async-dataset-aggregates'),
+    path('async/datasets/<int:pk>/equipment/', async_views.dataset_equipment, name='async-dataset-equipment'),
+    path('async/events/', async_views.event_stream, name='async-events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,7 +1,8 @@
+import numpy as np
 import pandas as pd
-import io
-from django.http import HttpResponse
-from django.db.models import Avg
+from django.http import FileResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Avg, Count
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
@@ -9,14 +10,32 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 
-from .models import Dataset, Equipment
-from .serializers import DatasetSerializer, DatasetDetailSerializer, UserSerializer
+from .admission import AdmissionRejected, ingestion_budget, max_ingest_size
+from .analytics import (
+    DEFAULT_BINS, DEFAULT_PAGE_SIZE, EQUIPMENT_FIELDS, MAX_BINS, MAX_PAGE_SIZE, NUMERIC_COLUMNS,
+    compute_aggregates, equipment_page, equipment_page_query, equipment_rows,
+    parse_flag_param, parse_int_param,
+)
+from .anomalies import ANOMALY_THRESHOLD, DEFAULT_ANOMALY_LIMIT, MAX_ANOMALY_LIMIT, score_anomalies
+from .charts import CHART_FORMATS, chart_name, chart_spec, get_or_render_chart
+from .conditional import dataset_etag, etag_matches, set_validators
+from .events import publish
+from .exports import XLSX_MAX_ROWS, iter_csv, write_xlsx
+from .expressions import ExpressionError, add_derived_aggregates, derived_columns, derived_digest
+from .instrumentation import span
+from .models import Dataset, DerivedColumn, Equipment, EquipmentType
+from .reports import get_or_render_report, iter_reports_zip, report_filename
+from .search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, index_dataset, match_expression, search_equipment
+from .serializers import (
+    DatasetSerializer, DatasetDetailSerializer, DatasetOverviewSerializer, DerivedColumnSerializer, UserSerializer,
+)
+from .shards import shard_for, user_datasets
+
+# Equipment rows per INSERT batch; upload progress is published between batches
+UPLOAD_INSERT_BATCH = 5000
+# Room for the multipart headers around the file when judging a request body by its length
+MULTIPART_OVERHEAD = 64 * 1024
 
 
 @api_view(['POST'])
@@ -76,8 +95,12 @@ class DatasetViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        # Return only user's datasets, limit to last 5
-        return Dataset.objects.filter(user=self.request.user)[:5]
+        # Return only user's datasets, limit to last 5 when listing.
+        # Detail routes filter by pk, which a sliced queryset can't do.
+        queryset = user_datasets(self.request.user)
+        if self.action == 'list':
+            return queryset.annotate(equipment_count=Count('equipment'))[:5]
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -86,8 +109,29 @@ class DatasetViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def upload(self, request):
-        """Upload and process CSV file"""
+        """
+        Upload and process CSV file; ?equipment=false leaves the rows out of the response.
+        
+        Progress is published on the event stream as upload.progress events,
+        tagged with the client's ?upload_id= so it can tell its uploads apart.
+        Uploads wait for memory budget (see admission); when it stays
+        exhausted they get a 503 with Retry-After.
+        """
+        # Turn away a body too large to ever process before receiving it
+        try:
+            declared_size = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            declared_size = 0
+        if declared_size > max_ingest_size() + MULTIPART_OVERHEAD:
+            return self._too_large()
+        
         csv_file = request.FILES.get('file')
+        upload_id = request.query_params.get('upload_id', '')[:64]
+        
+        def progress(stage, **extra):
+            publish(request.user.id, 'upload.progress', {
+                'upload_id': upload_id, 'filename': csv_file.name, 'stage': stage, **extra
+            }, transient=True)
         
         if not csv_file:
             return Response(
@@ -101,161 +145,381 @@ class DatasetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if csv_file.size > max_ingest_size():
+            return self._too_large()
+        cost = ingestion_budget.cost_of(csv_file.size)
+        try:
+            with span('admission'):
+                ingestion_budget.acquire(cost, on_queued=lambda: progress('queued'))
+        except AdmissionRejected as e:
+            progress('failed', error=str(e))
+            response = Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        
         try:
+            progress('parsing')
             # Read CSV
-            df = pd.read_csv(io.StringIO(csv_file.read().decode('utf-8')))
+            with span('parse'):
+                # Straight from the upload (a temporary file when large), without a decoded copy in memory
+                df = pd.read_csv(csv_file, encoding='utf-8')
             
             # Validate required columns
-            required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            with span('validate'):
+                required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+                missing_columns = [col for col in required_columns if col not in df.columns]
             
             if missing_columns:
+                error = f'Missing columns: {", ".join(missing_columns)}'
+                # Clients following the progress events would otherwise wait on it forever
+                progress('failed', error=error)
                 return Response(
-                    {'error': f'Missing columns: {", ".join(missing_columns)}'},
+                    {'error': error},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Clean data
-            df = df.dropna()
+            with span('aggregate'):
+                # Clean data
+                df = df.dropna()
+                
+                # Calculate statistics
+                total_records = len(df)
+                avg_flowrate = df['Flowrate'].mean()
+                avg_pressure = df['Pressure'].mean()
+                avg_temperature = df['Temperature'].mean()
             
-            # Calculate statistics
-            total_records = len(df)
-            avg_flowrate = df['Flowrate'].mean()
-            avg_pressure = df['Pressure'].mean()
-            avg_temperature = df['Temperature'].mean()
-            
-            # Create dataset
-            dataset = Dataset.objects.create(
-                user=request.user,
-                filename=csv_file.name,
-                total_records=total_records,
-                avg_flowrate=avg_flowrate,
-                avg_pressure=avg_pressure,
-                avg_temperature=avg_temperature
-            )
+            with span('anomalies'):
+                scores, flags = score_anomalies(
+                    df['Type'].to_numpy(), df[['Flowrate', 'Pressure', 'Temperature']].to_numpy()
+                )
             
-            # Create equipment records
-            equipment_objects = []
-            for _, row in df.iterrows():
-                equipment_objects.append(Equipment(
-                    dataset=dataset,
-                    equipment_name=row['Equipment Name'],
-                    equipment_type=row['Type'],
-                    flowrate=float(row['Flowrate']),
-                    pressure=float(row['Pressure']),
-                    temperature=float(row['Temperature'])
-                ))
+            with span('insert'):
+                # Create dataset, on the user's shard
+                db = shard_for(request.user.id)
+                dataset = Dataset.objects.using(db).create(
+                    user=request.user,
+                    filename=csv_file.name,
+                    total_records=total_records,
+                    avg_flowrate=avg_flowrate,
+                    avg_pressure=avg_pressure,
+                    avg_temperature=avg_temperature
+                )
+                
+                # Dictionary-encode the types: one lookup row per distinct name
+                types = df['Type'].astype('category').cat
+                type_ids = EquipmentType.objects.db_manager(db).ids_for(types.categories)
+                
+                names = df['Equipment Name'].to_numpy()
+                row_type_ids = np.asarray(type_ids)[types.codes]
+                values = df[['Flowrate', 'Pressure', 'Temperature']].to_numpy(dtype=float)
+                
+                progress('inserting', done=0, total=total_records)
+                with transaction.atomic(using=db):
+                    for start in range(0, total_records, UPLOAD_INSERT_BATCH):
+                        # Create equipment records one batch at a time, so only a
+                        # batch of model instances is ever held in memory
+                        end = min(start + UPLOAD_INSERT_BATCH, total_records)
+                        batch = zip(names[start:end], row_type_ids[start:end].tolist(), values[start:end].tolist(),
+                                    scores[start:end].tolist(), flags[start:end].tolist())
+                        Equipment.objects.using(db).bulk_create([
+                            Equipment(
+                                dataset=dataset,
+                                equipment_name=name,
+                                type_id=type_id,
+                                flowrate=flowrate,
+                                pressure=pressure,
+                                temperature=temperature,
+                                anomaly_score=score,
+                                is_anomaly=flag
+                            )
+                            for name, type_id, (flowrate, pressure, temperature), score, flag in batch
+                        ])
+                        progress('inserting', done=end, total=total_records)
+                    index_dataset(dataset)
             
-            Equipment.objects.bulk_create(equipment_objects)
+            publish(request.user.id, 'dataset.created', {
+                'upload_id': upload_id, 'dataset': DatasetSerializer(dataset).data
+            })
             
             # Keep only last 5 datasets
-            old_datasets = Dataset.objects.filter(user=request.user).order_by('-uploaded_at')[5:]
-            for old_dataset in old_datasets:
-                old_dataset.delete()
+            with span('prune'):
+                old_datasets = user_datasets(request.user).order_by('-uploaded_at')[5:]
+                for old_dataset in old_datasets:
+                    old_dataset.delete()
             
-            return Response(
-                DatasetDetailSerializer(dataset).data,
-                status=status.HTTP_201_CREATED
-            )
+            include_equipment = parse_flag_param(request.query_params.get('equipment'), True)
+            serializer_class = DatasetDetailSerializer if include_equipment else DatasetOverviewSerializer
+            with span('serialize'):
+                data = serializer_class(dataset).data
+            return Response(data, status=status.HTTP_201_CREATED)
             
         except Exception as e:
+            progress('failed', error=str(e))
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        finally:
+            ingestion_budget.release(cost)
+    
+    def _too_large(self):
+        return Response(
+            {'error': f'File too large to process; the limit is {max_ingest_size() // (1024 * 1024)} MB'},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
     
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
-        """Get summary statistics for a dataset"""
+        """Get summary statistics for a dataset; ?equipment=false leaves out the rows"""
         dataset = self.get_object()
-        serializer = DatasetDetailSerializer(dataset)
-        return Response(serializer.data)
+        include_equipment = parse_flag_param(request.query_params.get('equipment'), True)
+        etag = dataset_etag(dataset) if include_equipment else dataset_etag(dataset, 'overview')
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        serializer_class = DatasetDetailSerializer if include_equipment else DatasetOverviewSerializer
+        with span('serialize'):
+            data = serializer_class(dataset).data
+        return set_validators(Response(data), etag)
+    
+    @action(detail=True, methods=['get'])
+    def aggregates(self, request, pk=None):
+        """
+        Per-column statistics, per-type averages and histograms for a dataset;
+        ?derived=name,... adds those of the user's derived columns
+        """
+        dataset = self.get_object()
+        try:
+            bins = parse_int_param(request.query_params.get('bins'), DEFAULT_BINS, 1, MAX_BINS)
+        except ValueError:
+            return Response(
+                {'error': 'bins must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            derived = derived_columns(request.user, request.query_params.get('derived'))
+        except ExpressionError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        etag = dataset_etag(dataset, bins, *([derived_digest(derived)] if derived else []))
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        data = compute_aggregates(dataset.equipment.all(), bins)
+        add_derived_aggregates(data, dataset, derived, bins)
+        data['dataset'] = dataset.id
+        return set_validators(Response(data), etag)
+    
+    @action(detail=True, methods=['get'])
+    def equipment(self, request, pk=None):
+        """Page through a dataset's equipment rows; pass the returned 'next' as 'after'"""
+        dataset = self.get_object()
+        try:
+            after = parse_int_param(request.query_params.get('after'), 0, 0, 2**63 - 1)
+            limit = parse_int_param(request.query_params.get('limit'), DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {'error': 'after and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = list(equipment_page_query(dataset.equipment.all(), after, limit))
+        return Response(equipment_page(rows, dataset.total_records, limit))
+    
+    @action(detail=True, methods=['get'])
+    def anomalies(self, request, pk=None):
+        """Rows flagged as outliers for their type, highest score first"""
+        dataset = self.get_object()
+        try:
+            limit = parse_int_param(
+                request.query_params.get('limit'), DEFAULT_ANOMALY_LIMIT, 1, MAX_ANOMALY_LIMIT
+            )
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        etag = dataset_etag(dataset, 'anomalies', limit)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        # Both read the (dataset, is_anomaly, -anomaly_score) index; no pass over the table
+        flagged = dataset.equipment.filter(is_anomaly=True)
+        results = list(
+            equipment_rows(flagged).order_by('-anomaly_score').values(*EQUIPMENT_FIELDS, 'anomaly_score')[:limit]
+        )
+        return set_validators(Response({
+            'count': flagged.count(),
+            'threshold': ANOMALY_THRESHOLD,
+            'results': results,
+        }), etag)
     
     @action(detail=True, methods=['get'])
     def generate_pdf(self, request, pk=None):
         """Generate PDF report for a dataset"""
         dataset = self.get_object()
-        
-        # Create PDF
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="equipment_report_{dataset.id}.pdf"'
-        
-        doc = SimpleDocTemplate(response, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a5490'),
-            spaceAfter=30,
+        path = get_or_render_report(dataset)
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=report_filename(dataset.id),
+            content_type='application/pdf'
         )
-        title = Paragraph(f"Chemical Equipment Report", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 0.2*inch))
-        
-        # Dataset Info
-        info_style = styles['Normal']
-        elements.append(Paragraph(f"<b>Filename:</b> {dataset.filename}", info_style))
-        elements.append(Paragraph(f"<b>Upload Date:</b> {dataset.uploaded_at.strftime('%Y-%m-%d %H:%M')}", info_style))
-        elements.append(Paragraph(f"<b>Total Records:</b> {dataset.total_records}", info_style))
-        elements.append(Spacer(1, 0.3*inch))
+    
+    @action(detail=True, methods=['get'])
+    def chart(self, request, pk=None):
+        """
+        Chart image of a dataset: ?kind=averages|distribution|histogram&column=&bins=&file_format=png|svg;
+        histograms can show a derived column by name
+        """
+        dataset = self.get_object()
+        file_format = request.query_params.get('file_format', 'png').lower()
+        if file_format not in CHART_FORMATS:
+            return Response(
+                {'error': 'file_format must be png or svg'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            bins = parse_int_param(request.query_params.get('bins'), DEFAULT_BINS, 1, MAX_BINS)
+        except ValueError:
+            return Response(
+                {'error': 'bins must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        kind = request.query_params.get('kind')
+        column = request.query_params.get('column')
+        derived = {}
+        # Only a histogram of something other than a dataset column needs the user's definitions
+        if kind == 'histogram' and column and column not in NUMERIC_COLUMNS:
+            try:
+                derived = derived_columns(request.user, column)
+            except ExpressionError:
+                pass  # chart_spec() reports the unknown column
+        try:
+            spec = chart_spec(kind, column, bins, derived)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        etag = dataset_etag(dataset, 'chart', chart_name(spec), file_format)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        path = get_or_render_chart(dataset, spec, file_format)
+        return set_validators(FileResponse(open(path, 'rb'), content_type=CHART_FORMATS[file_format]), etag)
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Stream the dataset's equipment rows as CSV or XLSX; ?derived=name,... appends derived columns"""
+        dataset = self.get_object()
+        # Not "format": DRF reserves that query parameter for renderer selection
+        file_format = request.query_params.get('file_format', 'csv').lower()
+        basename = dataset.filename.rsplit('.', 1)[0]
+        try:
+            derived = derived_columns(request.user, request.query_params.get('derived'))
+        except ExpressionError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Summary Statistics
-        summary_title = Paragraph("<b>Summary Statistics</b>", styles['Heading2'])
-        elements.append(summary_title)
-        elements.append(Spacer(1, 0.1*inch))
+        if file_format == 'csv':
+            response = StreamingHttpResponse(iter_csv(dataset, derived), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{basename}_export.csv"'
+            return response
         
-        summary_data = [
-            ['Parameter', 'Average Value'],
-            ['Flowrate', f'{dataset.avg_flowrate:.2f}'],
-            ['Pressure', f'{dataset.avg_pressure:.2f}'],
-            ['Temperature', f'{dataset.avg_temperature:.2f}'],
-        ]
+        if file_format == 'xlsx':
+            if dataset.total_records > XLSX_MAX_ROWS:
+                return Response(
+                    {'error': f'XLSX supports at most {XLSX_MAX_ROWS} rows, export as CSV instead'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            output = write_xlsx(dataset, derived)
+            if output is None:
+                return Response(
+                    {'error': 'XLSX export requires openpyxl to be installed'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return FileResponse(
+                output,
+                as_attachment=True,
+                filename=f'{basename}_export.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
         
-        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(summary_table)
-        elements.append(Spacer(1, 0.3*inch))
+        return Response(
+            {'error': 'file_format must be csv or xlsx'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    @action(detail=False, methods=['post'])
+    def bulk_reports(self, request):
+        """Download the PDF reports of several datasets as one zip archive"""
+        ids = request.data.get('ids', 'all')
+        datasets = user_datasets(request.user)
         
-        # Equipment Type Distribution
-        from django.db.models import Count
-        type_dist = dataset.equipment.values('equipment_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
+        if ids == 'all':
+            datasets = datasets[:5]
+        else:
+            if not isinstance(ids, list):
+                return Response(
+                    {'error': 'ids must be a list of dataset ids or "all"'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                ids = [int(dataset_id) for dataset_id in ids]
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'ids must be a list of dataset ids or "all"'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            datasets = datasets.filter(id__in=ids)
         
-        if type_dist:
-            dist_title = Paragraph("<b>Equipment Type Distribution</b>", styles['Heading2'])
-            elements.append(dist_title)
-            elements.append(Spacer(1, 0.1*inch))
-            
-            dist_data = [['Equipment Type', 'Count']]
-            for item in type_dist:
-                dist_data.append([item['equipment_type'], str(item['count'])])
-            
-            dist_table = Table(dist_data, colWidths=[3*inch, 2*inch])
-            dist_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(dist_table)
+        datasets = list(datasets)
+        if not datasets:
+            return Response(
+                {'error': 'No datasets found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        doc.build(elements)
-        return response
\ No newline at end of file
+        response = StreamingHttpResponse(
+            iter_reports_zip(datasets),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="equipment_reports.zip"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Equipment whose names contain every word of ?q= as a word prefix, across the user's datasets"""
+        query = request.query_params.get('q', '')
+        if match_expression(request.user.id, query) is None:
+            return Response(
+                {'error': 'q must contain at least one letter or digit'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = parse_int_param(
+                request.query_params.get('limit'), DEFAULT_SEARCH_LIMIT, 1, MAX_SEARCH_LIMIT
+            )
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with span('search'):
+            results = search_equipment(request.user.id, query, shard_for(request.user.id), limit)
+        return Response({'query': query, 'results': results})
+
+
+class DerivedColumnViewSet(viewsets.ModelViewSet):
+    """
+    The user's derived columns: named expressions such as pressure * flowrate,
+    usable as ?derived= in aggregates and exports, and as a chart histogram column
+    """
+    serializer_class = DerivedColumnSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return DerivedColumn.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
@@ -0,0 +1,15 @@
+"""
+Entry points of worker processes.
+
+Spawned workers unpickle these before anything else runs in them, so this
+module must import nothing that needs Django to be set up.
+"""
+import os
+
+
+def setup_django(settings_module=None):
+    """Pool initializer: set up Django, so the task code may import models like the server does"""
+    if settings_module:
+        os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    import django
+    django.setup()
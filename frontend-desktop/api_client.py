@@ -0,0 +1,181 @@
+"""Shared HTTP session and thread-pool request executor for the desktop app"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class ApiError(Exception):
+    """Non-2xx API response, carrying the server's error message"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ApiClient:
+    """One keep-alive requests.Session, with a connection pool shared by every request"""
+
+    def __init__(self, base_url, pool_size=8, timeout=60):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # requests is imported on first use, keeping it off the startup path
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def set_token(self, token):
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+        else:
+            self.session.headers.pop('Authorization', None)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, f'{self.base_url}{path}', **kwargs)
+
+    def json(self, method, path, **kwargs):
+        """Send a request and return the decoded JSON body, raising ApiError on failure"""
+        response = self.request(method, path, **kwargs)
+        if response.status_code not in (200, 201):
+            raise ApiError(error_message(response, 'Operation failed'), response.status_code)
+        return response.json()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+def error_message(response, default):
+    try:
+        body = response.json()
+    except ValueError:
+        return f'{default} (HTTP {response.status_code})'
+    if isinstance(body, dict):
+        return body.get('error') or body.get('detail') or default
+    return default
+
+
+class RequestSignals(QObject):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    # (done, total) in bytes, 64-bit so multi-GB transfers fit
+    progress = pyqtSignal('qint64', 'qint64')
+    # Always emitted last, also for cancelled tasks
+    done = pyqtSignal()
+
+
+class RequestTask(QRunnable):
+    """
+    Runs ``fn(client, task)`` on the thread pool and reports through ``signals``.
+
+    Cancelled tasks are taken off the queue if they haven't started; running
+    ones finish their current call but never emit finished or error. Long
+    running functions should poll ``task.cancelled`` between steps.
+    """
+
+    def __init__(self, client, fn):
+        super().__init__()
+        self.client = client
+        self.fn = fn
+        self.signals = RequestSignals()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            result = self.fn(self.client, self)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.error.emit(str(e))
+        else:
+            if not self.cancelled:
+                self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+class RequestExecutor(QObject):
+    """Bounded QThreadPool of reusable workers running API calls off the GUI thread"""
+
+    def __init__(self, client, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._active = {}
+
+    def submit(self, method, path, on_finished=None, on_error=None, group=None, exclusive=False, **kwargs):
+        """Queue an API call whose decoded JSON response goes to ``on_finished``"""
+        def call(client, task):
+            return client.json(method, path, **kwargs)
+        return self.submit_call(call, on_finished, on_error, group, exclusive)
+
+    def submit_call(self, fn, on_finished=None, on_error=None, group=None, exclusive=False,
+                    on_progress=None, on_done=None):
+        """
+        Queue ``fn(client, task)``. With ``exclusive`` any earlier task in the same
+        group is cancelled first, e.g. when the user switches datasets quickly.
+        ``on_progress`` receives what ``fn`` emits on ``task.signals.progress``;
+        ``on_done`` is called once the task has run, successfully or not.
+        """
+        if exclusive and group is not None:
+            self.cancel(group)
+        task = RequestTask(self.client, fn)
+        if on_finished:
+            task.signals.finished.connect(on_finished)
+        if on_error:
+            task.signals.error.connect(on_error)
+        if on_progress:
+            task.signals.progress.connect(on_progress)
+        if on_done:
+            task.signals.done.connect(on_done)
+        task.signals.done.connect(lambda: self._active.pop(task, None))
+        self._active[task] = group
+        self.pool.start(task)
+        return task
+
+    def cancel(self, group=None):
+        """Cancel the tasks of ``group``, or every task when no group is given"""
+        for task, task_group in list(self._active.items()):
+            if group is None or task_group == group:
+                task.cancel()
+                try:
+                    taken = self.pool.tryTake(task)
+                except RuntimeError:
+                    # Already run and auto-deleted by Qt; its done signal is still queued
+                    continue
+                if taken:
+                    # Never started, so it won't emit done on its own
+                    self._active.pop(task, None)
+
+    def shutdown(self, timeout_ms=2000, close_client=True):
+        self.cancel()
+        self.pool.waitForDone(timeout_ms)
+        if close_client:
+            self.client.close()
@@ -0,0 +1,168 @@
+"""Matplotlib charts for the desktop app, built once and updated in place"""
+import math
+
+from PyQt5.QtWidgets import QComboBox, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle, Wedge
+
+BAR_COLORS = ['#36A2EB', '#FF6384', '#FFCE56']
+PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF']
+HISTOGRAM_COLOR = '#667eea'
+HISTOGRAM_COLUMNS = [('Flowrate', 'flowrate'), ('Pressure', 'pressure'), ('Temperature', 'temperature')]
+
+
+class ChartWidget(QWidget):
+    """
+    Widget for displaying matplotlib charts.
+
+    Subclasses create their artists once and change only their data when
+    updated, then schedule a repaint with draw_idle instead of clearing and
+    redrawing the figure.
+    """
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.figure = Figure(figsize=(8, 4))
+        self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_title(title, fontsize=14, fontweight='bold')
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas)
+        self.setLayout(layout)
+
+    def refresh(self):
+        self.canvas.draw_idle()
+
+
+class BarChart(ChartWidget):
+    """Fixed set of labelled bars whose heights change"""
+    def __init__(self, labels, title, parent=None):
+        super().__init__(title, parent)
+        self.bars = self.ax.bar(labels, [0] * len(labels), color=BAR_COLORS)
+        self.ax.set_ylabel('Value')
+        self.ax.grid(axis='y', alpha=0.3)
+
+    def update_data(self, values):
+        for bar, value in zip(self.bars, values):
+            bar.set_height(value)
+        low, high = min(0, *values), max(0, *values)
+        margin = (high - low) * 0.1 or 1
+        self.ax.set_ylim(low - margin if low < 0 else 0, high + margin)
+        self.refresh()
+
+
+class PieChart(ChartWidget):
+    """Pie whose wedges and labels are reused, grown on demand and hidden when unused"""
+    def __init__(self, title, parent=None):
+        super().__init__(title, parent)
+        self.ax.set_aspect('equal')
+        self.ax.set_xlim(-1.5, 1.5)
+        self.ax.set_ylim(-1.25, 1.25)
+        self.ax.axis('off')
+        self.slices = []
+
+    def _slice(self, i):
+        while len(self.slices) <= i:
+            color = PIE_COLORS[len(self.slices) % len(PIE_COLORS)]
+            wedge = Wedge((0, 0), 1, 0, 0, facecolor=color)
+            self.ax.add_patch(wedge)
+            label = self.ax.text(0, 0, '', va='center')
+            percent = self.ax.text(0, 0, '', ha='center', va='center')
+            self.slices.append((wedge, label, percent))
+        return self.slices[i]
+
+    def update_data(self, labels, values):
+        total = float(sum(values))
+        for i in range(len(values)):
+            self._slice(i)
+        angle = 90.0
+        for i, (wedge, label, percent) in enumerate(self.slices):
+            visible = i < len(values) and total > 0
+            wedge.set_visible(visible)
+            label.set_visible(visible)
+            percent.set_visible(visible)
+            if not visible:
+                continue
+            sweep = 360.0 * values[i] / total
+            wedge.set_theta1(angle)
+            wedge.set_theta2(angle + sweep)
+            middle = math.radians(angle + sweep / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x >= 0 else 'right')
+            label.set_text(labels[i])
+            percent.set_position((0.6 * x, 0.6 * y))
+            percent.set_text(f'{100.0 * values[i] / total:.1f}%')
+            angle += sweep
+        self.refresh()
+
+
+class HistogramChart(ChartWidget):
+    """Histogram drawn from server-side bin edges and counts, reusing its rectangles"""
+    def __init__(self, title, parent=None):
+        super().__init__(title, parent)
+        self.ax.set_ylabel('Count')
+        self.ax.grid(axis='y', alpha=0.3)
+        self.rects = []
+
+    def update_data(self, edges, counts):
+        if len(edges) == 2 and edges[0] == edges[1]:
+            # Every row holds the same value: give the single bin a visible width
+            edges = [edges[0] - 0.5, edges[0] + 0.5]
+        while len(self.rects) < len(counts):
+            rect = Rectangle((0, 0), 0, 0, facecolor=HISTOGRAM_COLOR, edgecolor='white')
+            self.ax.add_patch(rect)
+            self.rects.append(rect)
+        for i, rect in enumerate(self.rects):
+            rect.set_visible(i < len(counts))
+            if i < len(counts):
+                rect.set_bounds(edges[i], 0, edges[i + 1] - edges[i], counts[i])
+        if counts:
+            self.ax.set_xlim(edges[0], edges[-1])
+            self.ax.set_ylim(0, max(counts) * 1.1 or 1)
+        self.refresh()
+
+
+class ChartPanel(QWidget):
+    """The dataset charts, created once and kept while the user switches datasets"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        row = QHBoxLayout()
+        self.avg_chart = BarChart(['Flowrate', 'Pressure', 'Temperature'], 'Average Parameter Values')
+        row.addWidget(self.avg_chart)
+        self.type_chart = PieChart('Equipment Type Distribution')
+        row.addWidget(self.type_chart)
+        layout.addLayout(row)
+
+        histogram_header = QHBoxLayout()
+        histogram_header.addWidget(QLabel('Distribution of'))
+        self.column_combo = QComboBox()
+        for label, column in HISTOGRAM_COLUMNS:
+            self.column_combo.addItem(label, column)
+        self.column_combo.currentIndexChanged.connect(self.update_histogram)
+        histogram_header.addWidget(self.column_combo)
+        histogram_header.addStretch(1)
+        layout.addLayout(histogram_header)
+        self.histogram_chart = HistogramChart('Value Distribution')
+        layout.addWidget(self.histogram_chart)
+
+        self.setLayout(layout)
+        self.histograms = {}
+
+    def show_summary(self, data):
+        self.avg_chart.update_data([data['avg_flowrate'], data['avg_pressure'], data['avg_temperature']])
+        distribution = data.get('type_distribution') or {}
+        self.type_chart.setVisible(bool(distribution))
+        self.type_chart.update_data(list(distribution.keys()), list(distribution.values()))
+
+    def show_histograms(self, histograms):
+        """Show pre-binned histograms from the aggregates endpoint; None clears them"""
+        self.histograms = histograms or {}
+        self.update_histogram()
+
+    def update_histogram(self):
+        histogram = self.histograms.get(self.column_combo.currentData(), {'edges': [], 'counts': []})
+        self.histogram_chart.update_data(histogram['edges'], histogram['counts'])
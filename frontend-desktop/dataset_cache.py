@@ -0,0 +1,96 @@
+"""On-disk, ETag-validated cache of API responses for the desktop app"""
+import json
+import os
+import threading
+from pathlib import Path
+
+from api_client import ApiError, error_message
+
+
+class DatasetCache:
+    """
+    JSON responses stored one file per key, with the ETag they were served with.
+
+    The total size is capped; least recently used entries (by file mtime,
+    refreshed on every read) are evicted first. Safe to use from worker threads.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / f'{key}.json'
+
+    def get(self, key):
+        """Return (etag, data) for ``key``, or None when it isn't cached"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry.get('etag'), entry.get('data')
+
+    def put(self, key, etag, data):
+        path = self._path(key)
+        tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'etag': etag, 'data': data}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for path in self.directory.glob('*.json'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+def fetch_cached(client, cache, path, key):
+    """
+    Conditional GET of ``path`` validated against the cache entry ``key``.
+
+    Returns (state, data) where state is 'fresh' (new data, now cached),
+    'not_modified' (the cached copy is current) or 'offline' (the backend is
+    unreachable or doesn't answer in time, and the cached copy is returned as-is). Without a cached
+    copy, errors propagate.
+    """
+    import requests
+
+    cached = cache.get(key)
+    headers = {'If-None-Match': cached[0]} if cached and cached[0] else {}
+    try:
+        response = client.request('GET', path, headers=headers)
+    except (requests.ConnectionError, requests.Timeout):
+        if cached is None:
+            raise
+        return 'offline', cached[1]
+
+    if response.status_code == 304 and cached is not None:
+        return 'not_modified', cached[1]
+    if response.status_code != 200:
+        raise ApiError(error_message(response, 'Operation failed'), response.status_code)
+
+    data = response.json()
+    cache.put(key, response.headers.get('ETag'), data)
+    return 'fresh', data
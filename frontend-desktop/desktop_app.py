@@ -1,112 +1,50 @@
+import time
+_STARTED = time.perf_counter()
+
+import hashlib
+import multiprocessing
+import os
 import sys
-import requests
+import uuid
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
-                             QFileDialog, QTableWidget, QTableWidgetItem, 
+                             QFileDialog, QTableView, QHeaderView,
                              QListWidget, QMessageBox, QStackedWidget, QFormLayout,
-                             QGroupBox, QScrollArea)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                             QGroupBox, QScrollArea, QProgressBar, QListWidgetItem)
+from PyQt5.QtCore import Qt, QStandardPaths, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-
-
-API_URL = 'http://localhost:8000/api'
 
+from api_client import ApiClient, RequestExecutor
+from dataset_cache import DatasetCache, fetch_cached
+from downloads import DownloadQueue
+from events import EventStream
+from local_analysis import LocalStore, analyze_files
+from prefetch import PrefetchScheduler
+from startup import StartupMonitor
+from uploads import upload_csv
 
-class AuthWorker(QThread):
-    """Worker thread for authentication"""
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
-    
-    def __init__(self, endpoint, data):
-        super().__init__()
-        self.endpoint = endpoint
-        self.data = data
-    
-    def run(self):
-        try:
-            response = requests.post(f"{API_URL}{self.endpoint}", json=self.data)
-            if response.status_code in [200, 201]:
-                self.finished.emit(response.json())
-            else:
-                self.error.emit(response.json().get('error', 'Authentication failed'))
-        except Exception as e:
-            self.error.emit(str(e))
 
+API_URL = 'http://localhost:8000/api'
 
-class DataWorker(QThread):
-    """Worker thread for data operations"""
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
-    
-    def __init__(self, method, url, headers, data=None, files=None):
-        super().__init__()
-        self.method = method
-        self.url = url
-        self.headers = headers
-        self.data = data
-        self.files = files
-    
-    def run(self):
-        try:
-            if self.method == 'GET':
-                response = requests.get(self.url, headers=self.headers)
-            elif self.method == 'POST':
-                response = requests.post(self.url, headers=self.headers, 
-                                       data=self.data, files=self.files)
-            
-            if response.status_code in [200, 201]:
-                self.finished.emit(response.json())
-            else:
-                self.error.emit(response.json().get('error', 'Operation failed'))
-        except Exception as e:
-            self.error.emit(str(e))
+# Disk space for cached dataset summaries, least recently viewed evicted first
+CACHE_MAX_BYTES = 256 * 1024 * 1024
 
+# Larger datasets are summarized without rows; the table then pages them in
+INLINE_EQUIPMENT_LIMIT = 5000
 
-class ChartWidget(QWidget):
-    """Widget for displaying matplotlib charts"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.figure = Figure(figsize=(8, 4))
-        self.canvas = FigureCanvas(self.figure)
-        layout = QVBoxLayout()
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
-    
-    def plot_bar_chart(self, labels, values, title):
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.bar(labels, values, color=['#36A2EB', '#FF6384', '#FFCE56'])
-        ax.set_title(title, fontsize=14, fontweight='bold')
-        ax.set_ylabel('Value')
-        ax.grid(axis='y', alpha=0.3)
-        self.canvas.draw()
-    
-    def plot_pie_chart(self, labels, values, title):
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF']
-        ax.pie(values, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
-        ax.set_title(title, fontsize=14, fontweight='bold')
-        self.canvas.draw()
+# How often the dataset list is reloaded when the server can't push changes
+DATASET_POLL_INTERVAL_MS = 60 * 1000
 
 
 class LoginWidget(QWidget):
     """Login/Register widget"""
     login_success = pyqtSignal(str)
+    work_offline = pyqtSignal()
     
-    def __init__(self):
+    def __init__(self, executor):
         super().__init__()
-        self.worker = None
+        self.executor = executor
         self.init_ui()
-
-    def __del__(self):
-        """Cleanup when widget is destroyed"""
-        if self.worker and self.worker.isRunning():
-            self.worker.quit()
-            self.worker.wait(1000)
     
     def init_ui(self):
         layout = QVBoxLayout()
@@ -177,6 +115,11 @@ class LoginWidget(QWidget):
         self.status_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.status_label)
         
+        offline_btn = QPushButton('Work Offline (local analysis only)')
+        offline_btn.setFlat(True)
+        offline_btn.clicked.connect(self.work_offline.emit)
+        layout.addWidget(offline_btn)
+        
         self.setLayout(layout)
     
     def handle_login(self):
@@ -190,20 +133,13 @@ class LoginWidget(QWidget):
         self.login_btn.setEnabled(False)
         self.register_btn.setEnabled(False)
         self.status_label.setText('Logging in...')
-
-        if self.worker:
-            self.worker.quit()
-            self.worker.wait()
-        
-        self.worker = AuthWorker('/auth/login/', {
-            'username': username,
-            'password': password
-        })
-        self.worker.finished.connect(self.on_auth_success)
-        self.worker.error.connect(self.on_auth_error)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.error.connect(self.worker.deleteLater)
-        self.worker.start()
+        
+        self.executor.submit(
+            'POST', '/auth/login/',
+            on_finished=self.on_auth_success, on_error=self.on_auth_error,
+            group='auth', exclusive=True,
+            json={'username': username, 'password': password}
+        )
     
     def handle_register(self):
         username = self.username_input.text()
@@ -218,28 +154,12 @@ class LoginWidget(QWidget):
         self.register_btn.setEnabled(False)
         self.status_label.setText('Registering...')
         
-        if self.worker:
-            self.worker.quit()
-            self.worker.wait()
-        
-        self.worker = AuthWorker('/auth/register/', {
-            'username': username,
-            'password': password,
-            'email': email
-        })
-        self.worker.finished.connect(self.on_auth_success)
-        self.worker.error.connect(self.on_auth_error)
-        # Clean up after thread finishes
-        self.worker.finished.connect(lambda: self.cleanup_worker())
-        self.worker.error.connect(lambda: self.cleanup_worker())
-        self.worker.start()
-    
-    def cleanup_worker(self):
-        """Safely cleanup worker thread"""
-        if self.worker:
-            self.worker.quit()
-            self.worker.wait()
-            self.worker = None
+        self.executor.submit(
+            'POST', '/auth/register/',
+            on_finished=self.on_auth_success, on_error=self.on_auth_error,
+            group='auth', exclusive=True,
+            json={'username': username, 'password': password, 'email': email}
+        )
     
     def on_auth_success(self, data):
         token = data.get('token')
@@ -265,15 +185,47 @@ class MainWidget(QWidget):
     """Main application widget"""
     logout = pyqtSignal()
     
-    def __init__(self, token):
+    def __init__(self, client, executor, cache, download_executor, local_store, offline=False):
         super().__init__()
-        self.token = token
-        self.headers = {'Authorization': f'Token {token}'}
+        self.client = client
+        self.executor = executor
+        self.cache = cache
+        self.download_executor = download_executor
+        self.local_store = local_store
+        self.offline = offline
         self.selected_dataset = None
+        self.current_dataset_id = None
+        self.local_results = {}
+        self.prefetcher = PrefetchScheduler(executor, cache, parent=self)
+        self.logout.connect(self.prefetcher.clear)
+        # Pushed dataset changes and upload progress, instead of reloading the list
+        self.events = EventStream(client, parent=self)
+        self.events.received.connect(self.on_server_event)
+        self.events.unavailable.connect(self.on_events_unavailable)
+        self.logout.connect(self.events.stop)
+        # Polls the dataset list instead, when the server can't stream events (e.g. under WSGI)
+        self.events_note = ''
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(DATASET_POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(lambda: self.load_datasets(quiet=True))
+        self.logout.connect(self.poll_timer.stop)
+        self.upload_id = None
         self.init_ui()
-        self.load_datasets()
+        self.load_local_results()
+        if offline:
+            # No session: only local analysis is available
+            self.upload_group.hide()
+            self.history_group.hide()
+            self.status_label.setText('Offline - local analysis only')
+        else:
+            self.load_datasets()
+            self.events.start()
     
     def init_ui(self):
+        # matplotlib and numpy load here, after login, unless already preloaded
+        from charts import ChartPanel
+        from table_model import EquipmentTableModel
+        
         main_layout = QHBoxLayout()
         
         # Left sidebar
@@ -282,7 +234,7 @@ class MainWidget(QWidget):
         sidebar.setMaximumWidth(300)
         
         # Upload section
-        upload_group = QGroupBox('Upload CSV')
+        upload_group = self.upload_group = QGroupBox('Upload CSV')
         upload_layout = QVBoxLayout()
         
         self.upload_btn = QPushButton('Select File')
@@ -298,20 +250,65 @@ class MainWidget(QWidget):
         self.upload_submit_btn.setEnabled(False)
         upload_layout.addWidget(self.upload_submit_btn)
         
+        # QProgressBar holds an int, so progress is tracked in permille
+        self.upload_progress = QProgressBar()
+        self.upload_progress.setRange(0, 1000)
+        self.upload_progress.hide()
+        upload_layout.addWidget(self.upload_progress)
+        
+        self.upload_status_label = QLabel('')
+        self.upload_status_label.setWordWrap(True)
+        upload_layout.addWidget(self.upload_status_label)
+        
+        self.upload_cancel_btn = QPushButton('Cancel Upload')
+        self.upload_cancel_btn.clicked.connect(self.cancel_upload)
+        self.upload_cancel_btn.hide()
+        upload_layout.addWidget(self.upload_cancel_btn)
+        
         upload_group.setLayout(upload_layout)
         sidebar_layout.addWidget(upload_group)
         
         # Dataset history
-        history_group = QGroupBox('Recent Datasets (Last 5)')
+        history_group = self.history_group = QGroupBox('Recent Datasets (Last 5)')
         history_layout = QVBoxLayout()
         
         self.dataset_list = QListWidget()
         self.dataset_list.itemClicked.connect(self.on_dataset_selected)
+        # Hovering or moving the selection to an entry fetches it ahead of the others
+        self.dataset_list.setMouseTracking(True)
+        self.dataset_list.itemEntered.connect(self.on_dataset_hovered)
+        self.dataset_list.currentItemChanged.connect(self.on_dataset_hovered)
         history_layout.addWidget(self.dataset_list)
         
         history_group.setLayout(history_layout)
         sidebar_layout.addWidget(history_group)
         
+        # Local analysis: files analyzed on this machine, pending sync to the server
+        local_group = QGroupBox('Local Analysis')
+        local_layout = QVBoxLayout()
+        
+        self.analyze_btn = QPushButton('Analyze Files Locally')
+        self.analyze_btn.clicked.connect(self.analyze_local_files)
+        local_layout.addWidget(self.analyze_btn)
+        
+        self.local_status_label = QLabel('')
+        self.local_status_label.setWordWrap(True)
+        local_layout.addWidget(self.local_status_label)
+        
+        self.local_list = QListWidget()
+        self.local_list.itemClicked.connect(self.on_local_selected)
+        local_layout.addWidget(self.local_list)
+        
+        self.sync_btn = QPushButton('Sync to Server')
+        self.sync_btn.clicked.connect(self.sync_local_results)
+        local_layout.addWidget(self.sync_btn)
+        
+        local_group.setLayout(local_layout)
+        sidebar_layout.addWidget(local_group)
+        
+        self.downloads = DownloadQueue(self.download_executor)
+        sidebar_layout.addWidget(self.downloads)
+        
         # Logout button
         logout_btn = QPushButton('Logout')
         logout_btn.clicked.connect(self.logout.emit)
@@ -343,6 +340,10 @@ class MainWidget(QWidget):
         self.title_label.setFont(QFont('Arial', 16, QFont.Bold))
         header_layout.addWidget(self.title_label)
         
+        self.status_label = QLabel('')
+        self.status_label.setStyleSheet('color: #856404;')
+        header_layout.addWidget(self.status_label)
+        
         self.pdf_btn = QPushButton('Download PDF Report')
         self.pdf_btn.clicked.connect(self.download_pdf)
         self.pdf_btn.hide()
@@ -353,30 +354,160 @@ class MainWidget(QWidget):
         # Scroll area for content
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
-        scroll_content = QWidget()
+        self.dataset_view = QWidget()
         self.scroll_layout = QVBoxLayout()
-        scroll_content.setLayout(self.scroll_layout)
-        scroll.setWidget(scroll_content)
+        self.dataset_view.setLayout(self.scroll_layout)
+        self.dataset_view.hide()
+        scroll.setWidget(self.dataset_view)
         content_layout.addWidget(scroll)
         
         content.setLayout(content_layout)
         main_layout.addWidget(content, 1)
         
+        # The dataset view is built once; display_dataset only updates its contents
+        stats_widget = QWidget()
+        stats_layout = QHBoxLayout()
+        self.stat_values = []
+        
+        for label in ('Total Records', 'Avg Flowrate', 'Avg Pressure', 'Avg Temperature'):
+            stat_widget = QWidget()
+            stat_layout = QVBoxLayout()
+            
+            label_widget = QLabel(label)
+            label_widget.setFont(QFont('Arial', 10))
+            value_widget = QLabel('')
+            value_widget.setFont(QFont('Arial', 16, QFont.Bold))
+            self.stat_values.append(value_widget)
+            
+            stat_layout.addWidget(label_widget)
+            stat_layout.addWidget(value_widget)
+            stat_widget.setLayout(stat_layout)
+            stat_widget.setStyleSheet("""
+                QWidget {
+                    background-color: #667eea;
+                    color: white;
+                    border-radius: 5px;
+                    padding: 10px;
+                }
+            """)
+            stats_layout.addWidget(stat_widget)
+        
+        stats_widget.setLayout(stats_layout)
+        self.scroll_layout.addWidget(stats_widget)
+        
+        self.chart_panel = ChartPanel()
+        self.scroll_layout.addWidget(self.chart_panel)
+        
+        # Equipment table
+        self.table_panel = QWidget()
+        table_layout = QVBoxLayout()
+        table_layout.setContentsMargins(0, 0, 0, 0)
+        
+        table_header = QHBoxLayout()
+        table_label = QLabel('Equipment Details')
+        table_label.setFont(QFont('Arial', 14, QFont.Bold))
+        table_header.addWidget(table_label)
+        self.table_count_label = QLabel('')
+        table_header.addWidget(self.table_count_label, 1)
+        self.table_filter = QLineEdit()
+        self.table_filter.setPlaceholderText('Filter by name or type')
+        self.table_filter.textChanged.connect(self.on_table_filter_changed)
+        table_header.addWidget(self.table_filter)
+        table_layout.addLayout(table_header)
+        
+        self.table_model = EquipmentTableModel(self.executor, self)
+        self.table_model.rowsInserted.connect(self.update_table_count)
+        self.table_model.modelReset.connect(self.update_table_count)
+        self.table_model.layoutChanged.connect(self.update_table_count)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.sortByColumn(-1, Qt.AscendingOrder)
+        self.table_view.setMinimumHeight(400)
+        # Fixed row heights keep scrolling independent of the row count
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(24)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.setColumnWidth(0, 200)
+        table_layout.addWidget(self.table_view)
+        self.table_panel.setLayout(table_layout)
+        self.scroll_layout.addWidget(self.table_panel)
+        
         self.setLayout(main_layout)
         self.selected_file = None
+        self.upload_started = 0.0
     
-    def load_datasets(self):
-        worker = DataWorker('GET', f'{API_URL}/datasets/', self.headers)
-        worker.finished.connect(self.on_datasets_loaded)
-        worker.error.connect(self.show_error)
-        worker.start()
+    def load_datasets(self, quiet=False):
+        """Reload the dataset list; ``quiet`` leaves errors unreported, for background refreshes"""
+        cache = self.cache
+        self.executor.submit_call(
+            lambda client, task: fetch_cached(client, cache, '/datasets/', 'datasets'),
+            self.on_datasets_fetched, (lambda error: None) if quiet else self.show_error,
+            group='datasets', exclusive=True
+        )
+    
+    def on_datasets_fetched(self, result):
+        state, data = result
+        self.set_offline(state == 'offline')
+        self.on_datasets_loaded(data)
+        if state != 'offline':
+            self.prefetcher.schedule([
+                (ds['id'], [self.summary_request(ds['id'], ds['total_records']),
+                            self.aggregates_request(ds['id'])])
+                for ds in data
+            ])
+    
+    def set_offline(self, offline):
+        self.status_label.setText('Offline - showing cached data' if offline else self.events_note)
+    
+    def on_events_unavailable(self, message):
+        self.events_note = f'Live updates off ({message}) - refreshing every minute'
+        if not self.status_label.text():
+            self.status_label.setText(self.events_note)
+        self.poll_timer.start()
     
     def on_datasets_loaded(self, data):
         self.dataset_list.clear()
         for ds in data:
-            item_text = f"{ds['filename']}\n{ds['uploaded_at'][:16]}\n{ds['total_records']} records"
-            self.dataset_list.addItem(item_text)
-            self.dataset_list.item(self.dataset_list.count() - 1).setData(Qt.UserRole, ds['id'])
+            self.dataset_list.addItem(self.dataset_item(ds))
+    
+    def dataset_item(self, ds):
+        item = QListWidgetItem(f"{ds['filename']}\n{ds['uploaded_at'][:16]}\n{ds['total_records']} records")
+        item.setData(Qt.UserRole, ds['id'])
+        item.setData(Qt.UserRole + 1, ds['total_records'])
+        return item
+    
+    def find_dataset_row(self, dataset_id):
+        for row in range(self.dataset_list.count()):
+            if self.dataset_list.item(row).data(Qt.UserRole) == dataset_id:
+                return row
+        return None
+    
+    def on_server_event(self, name, data):
+        if name == 'dataset.created':
+            # Uploaded from here or from another session of this account
+            ds = data['dataset']
+            if self.find_dataset_row(ds['id']) is None:
+                self.dataset_list.insertItem(0, self.dataset_item(ds))
+        elif name == 'dataset.deleted':
+            row = self.find_dataset_row(data['id'])
+            if row is not None:
+                self.prefetcher.discard(data['id'])
+                self.dataset_list.takeItem(row)
+        elif name == 'upload.progress':
+            if self.upload_id and data['upload_id'] == self.upload_id:
+                self.on_server_upload_progress(data)
+        elif name == 'resync':
+            # Events were missed, e.g. across a server restart
+            self.load_datasets()
+    
+    def on_server_upload_progress(self, data):
+        if data['stage'] == 'queued':
+            self.upload_status_label.setText('Waiting for other uploads to finish on the server...')
+        elif data['stage'] == 'parsing':
+            self.upload_status_label.setText('Parsing on server...')
+        elif data['stage'] == 'inserting':
+            self.upload_status_label.setText(f"Saving on server: {data['done']:,} of {data['total']:,} rows")
     
     def select_file(self):
         filename, _ = QFileDialog.getOpenFileName(self, 'Select CSV File', '', 'CSV Files (*.csv)')
@@ -391,131 +522,282 @@ class MainWidget(QWidget):
         
         self.upload_btn.setEnabled(False)
         self.upload_submit_btn.setEnabled(False)
-        
-        with open(self.selected_file, 'rb') as f:
-            files = {'file': f}
-            worker = DataWorker('POST', f'{API_URL}/datasets/upload/', 
-                              self.headers, files=files)
-            worker.finished.connect(self.on_upload_success)
-            worker.error.connect(self.on_upload_error)
-            worker.start()
+        self.upload_progress.setValue(0)
+        self.upload_progress.show()
+        self.upload_status_label.setText('Starting upload...')
+        self.upload_cancel_btn.show()
+        self.upload_started = time.monotonic()
+        
+        path = self.selected_file
+        # Matches this upload's progress events on the event stream
+        self.upload_id = uuid.uuid4().hex
+        params = {'equipment': 'false', 'upload_id': self.upload_id}
+        
+        # The file is streamed from disk by the worker; rows come back through the table
+        self.executor.submit_call(
+            lambda client, task: upload_csv(client, task, path, params=params),
+            self.on_upload_success, self.on_upload_error,
+            group='upload', on_progress=self.on_upload_progress
+        )
+    
+    def on_upload_progress(self, sent, total):
+        self.upload_progress.setValue(sent * 1000 // total if total else 0)
+        if sent >= total:
+            self.upload_status_label.setText('Processing on server...')
+            return
+        elapsed = time.monotonic() - self.upload_started
+        rate = sent / elapsed if elapsed > 0 else 0
+        self.upload_status_label.setText(
+            f'{sent / 1e6:,.1f} of {total / 1e6:,.1f} MB ({rate / 1e6:,.1f} MB/s)'
+        )
+    
+    def cancel_upload(self):
+        self.executor.cancel('upload')
+        self.reset_upload_controls()
+        self.upload_submit_btn.setEnabled(self.selected_file is not None)
+        self.upload_status_label.setText('Upload cancelled')
+    
+    def reset_upload_controls(self):
+        self.upload_btn.setEnabled(True)
+        self.upload_submit_btn.setEnabled(False)
+        self.upload_progress.hide()
+        self.upload_cancel_btn.hide()
+        self.upload_status_label.setText('')
+        self.upload_id = None
     
     def on_upload_success(self, data):
         self.selected_dataset = data
+        self.current_dataset_id = data['id']
         self.display_dataset(data)
-        self.load_datasets()
+        self.load_aggregates(data['id'])
+        if not self.events.connected:
+            # Otherwise the dataset.created event updates the list
+            self.load_datasets()
         self.file_label.setText('No file selected')
         self.selected_file = None
-        self.upload_btn.setEnabled(True)
-        self.upload_submit_btn.setEnabled(False)
+        self.reset_upload_controls()
         QMessageBox.information(self, 'Success', 'File uploaded successfully!')
     
     def on_upload_error(self, error):
+        self.reset_upload_controls()
         self.show_error(error)
-        self.upload_btn.setEnabled(True)
-        self.upload_submit_btn.setEnabled(False)
+    
+    def summary_request(self, dataset_id, total_records):
+        """(path, cache key) of a dataset's summary; large ones come without rows"""
+        path = f'/datasets/{dataset_id}/summary/'
+        if (total_records or 0) > INLINE_EQUIPMENT_LIMIT:
+            path += '?equipment=false'
+        return path, f'summary-{dataset_id}'
+    
+    def aggregates_request(self, dataset_id):
+        return f'/datasets/{dataset_id}/aggregates/', f'aggregates-{dataset_id}'
+    
+    def on_dataset_hovered(self, item, previous=None):
+        if item is not None:
+            self.prefetcher.prioritize(item.data(Qt.UserRole))
     
     def on_dataset_selected(self, item):
         dataset_id = item.data(Qt.UserRole)
-        worker = DataWorker('GET', f'{API_URL}/datasets/{dataset_id}/summary/', 
-                          self.headers)
-        worker.finished.connect(self.display_dataset)
-        worker.error.connect(self.show_error)
-        worker.start()
+        self.current_dataset_id = dataset_id
+        path, key = self.summary_request(dataset_id, item.data(Qt.UserRole + 1))
+        # Fetched right here, so the prefetcher can skip it
+        self.prefetcher.discard(dataset_id)
+        
+        # Render the cached copy right away, then revalidate it with the server
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.display_dataset(cached[1])
+        
+        cache = self.cache
+        # Only the latest selection matters; drop any summary still in flight
+        self.executor.submit_call(
+            lambda client, task: fetch_cached(client, cache, path, key),
+            lambda result: self.on_summary_fetched(dataset_id, result, cached is not None),
+            self.show_error,
+            group='dataset', exclusive=True
+        )
+        self.load_aggregates(dataset_id)
+    
+    def load_aggregates(self, dataset_id):
+        """Fetch the pre-binned histograms for the chart panel, cached like summaries"""
+        path, key = self.aggregates_request(dataset_id)
+        cached = self.cache.get(key)
+        self.chart_panel.show_histograms(cached[1]['histograms'] if cached else None)
+        
+        cache = self.cache
+        self.executor.submit_call(
+            lambda client, task: fetch_cached(client, cache, path, key),
+            lambda result: self.on_aggregates_fetched(dataset_id, result),
+            group='aggregates', exclusive=True
+        )
+    
+    def on_aggregates_fetched(self, dataset_id, result):
+        state, data = result
+        if dataset_id == self.current_dataset_id and state == 'fresh':
+            self.chart_panel.show_histograms(data['histograms'])
+    
+    def on_summary_fetched(self, dataset_id, result, shown_from_cache):
+        state, data = result
+        if dataset_id != self.current_dataset_id:
+            return
+        self.set_offline(state == 'offline')
+        if state == 'fresh' or not shown_from_cache:
+            self.display_dataset(data)
+    
+    def load_local_results(self):
+        self.local_list.clear()
+        self.local_results = {result['id']: result for result in self.local_store.load_all()}
+        for result in self.local_results.values():
+            item_text = f"{result['filename']}\n{result['uploaded_at'][:16]}\n{result['total_records']} records, not synced"
+            self.local_list.addItem(item_text)
+            self.local_list.item(self.local_list.count() - 1).setData(Qt.UserRole, result['id'])
+        self.sync_btn.setEnabled(bool(self.local_results) and not self.offline)
+    
+    def analyze_local_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, 'Select CSV Files', '', 'CSV Files (*.csv)')
+        if not paths:
+            return
+        
+        self.analyze_btn.setEnabled(False)
+        self.local_status_label.setText(f'Analyzing {len(paths)} file(s)...')
+        store = self.local_store
+        
+        def analyze(client, task):
+            # Files are parsed in parallel worker processes; this thread only collects
+            results, errors = [], []
+            for done, (path, result, error) in enumerate(analyze_files(paths), 1):
+                if task.cancelled:
+                    break
+                if error:
+                    errors.append(f'{os.path.basename(path)}: {error}')
+                else:
+                    store.save(result)
+                    results.append(result)
+                task.signals.progress.emit(done, len(paths))
+            return results, errors
+        
+        self.executor.submit_call(
+            analyze, self.on_local_analysis_finished, self.on_local_analysis_error,
+            group='analysis', on_progress=self.on_local_analysis_progress
+        )
+    
+    def on_local_analysis_progress(self, done, total):
+        self.local_status_label.setText(f'Analyzed {done} of {total} file(s)...')
+    
+    def on_local_analysis_finished(self, outcome):
+        results, errors = outcome
+        self.analyze_btn.setEnabled(True)
+        self.local_status_label.setText(f'Analyzed {len(results)} file(s)')
+        self.load_local_results()
+        if results:
+            self.show_local_result(results[0])
+        if errors:
+            self.show_error('Some files could not be analyzed:\n' + '\n'.join(errors))
+    
+    def on_local_analysis_error(self, error):
+        self.analyze_btn.setEnabled(True)
+        self.local_status_label.setText('')
+        self.show_error(error)
+    
+    def on_local_selected(self, item):
+        result = self.local_results.get(item.data(Qt.UserRole))
+        if result is not None:
+            self.show_local_result(result)
+    
+    def show_local_result(self, result):
+        self.current_dataset_id = result['id']
+        self.display_dataset(result)
+        self.chart_panel.show_histograms(result['aggregates']['histograms'])
+    
+    def sync_local_results(self):
+        """Upload the analyzed files, so the server holds the same datasets"""
+        pending = list(self.local_results.values())
+        if not pending:
+            return
+        
+        self.sync_btn.setEnabled(False)
+        self.analyze_btn.setEnabled(False)
+        self.local_status_label.setText('Syncing...')
+        store = self.local_store
+        
+        def sync(client, task):
+            synced, errors = [], []
+            for result in pending:
+                if task.cancelled:
+                    break
+                if not os.path.exists(result['path']):
+                    errors.append(f"{result['filename']}: {result['path']} no longer exists")
+                    continue
+                try:
+                    upload_csv(client, task, result['path'], params={'equipment': 'false'})
+                except Exception as e:
+                    errors.append(f"{result['filename']}: {e}")
+                    continue
+                store.remove(result['id'])
+                synced.append(result['id'])
+            return synced, errors
+        
+        self.executor.submit_call(
+            sync, self.on_sync_finished, self.on_sync_error, group='upload',
+            on_progress=lambda sent, total: self.local_status_label.setText(
+                f'Syncing: {sent / 1e6:,.1f} of {total / 1e6:,.1f} MB'
+            )
+        )
+    
+    def on_sync_finished(self, outcome):
+        synced, errors = outcome
+        self.analyze_btn.setEnabled(True)
+        self.local_status_label.setText(f'Synced {len(synced)} file(s)')
+        self.load_local_results()
+        self.load_datasets()
+        if errors:
+            self.show_error('Some files could not be synced:\n' + '\n'.join(errors))
+    
+    def on_sync_error(self, error):
+        self.analyze_btn.setEnabled(True)
+        self.local_status_label.setText('')
+        self.load_local_results()
+        self.show_error(error)
     
     def display_dataset(self, data):
         self.selected_dataset = data
         
-        # Clear existing content
-        while self.scroll_layout.count():
-            child = self.scroll_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        
         self.title_label.setText(data['filename'])
-        self.pdf_btn.show()
+        # Reports are rendered by the server, so local results have none
+        self.pdf_btn.setVisible(not data.get('local'))
+        self.dataset_view.show()
         
         # Stats
-        stats_widget = QWidget()
-        stats_layout = QHBoxLayout()
-        
         stats = [
-            ('Total Records', data['total_records']),
-            ('Avg Flowrate', f"{data['avg_flowrate']:.2f}"),
-            ('Avg Pressure', f"{data['avg_pressure']:.2f}"),
-            ('Avg Temperature', f"{data['avg_temperature']:.2f}")
+            data['total_records'],
+            f"{data['avg_flowrate']:.2f}",
+            f"{data['avg_pressure']:.2f}",
+            f"{data['avg_temperature']:.2f}"
         ]
-        
-        for label, value in stats:
-            stat_widget = QWidget()
-            stat_layout = QVBoxLayout()
-            
-            label_widget = QLabel(label)
-            label_widget.setFont(QFont('Arial', 10))
-            value_widget = QLabel(str(value))
-            value_widget.setFont(QFont('Arial', 16, QFont.Bold))
-            
-            stat_layout.addWidget(label_widget)
-            stat_layout.addWidget(value_widget)
-            stat_widget.setLayout(stat_layout)
-            stat_widget.setStyleSheet("""
-                QWidget {
-                    background-color: #667eea;
-                    color: white;
-                    border-radius: 5px;
-                    padding: 10px;
-                }
-            """)
-            stats_layout.addWidget(stat_widget)
-        
-        stats_widget.setLayout(stats_layout)
-        self.scroll_layout.addWidget(stats_widget)
+        for value_widget, value in zip(self.stat_values, stats):
+            value_widget.setText(str(value))
         
         # Charts
-        chart_widget = QWidget()
-        chart_layout = QHBoxLayout()
-        
-        # Average values chart
-        avg_chart = ChartWidget()
-        avg_chart.plot_bar_chart(
-            ['Flowrate', 'Pressure', 'Temperature'],
-            [data['avg_flowrate'], data['avg_pressure'], data['avg_temperature']],
-            'Average Parameter Values'
-        )
-        chart_layout.addWidget(avg_chart)
-        
-        # Type distribution chart
-        if data.get('type_distribution'):
-            type_chart = ChartWidget()
-            types = list(data['type_distribution'].keys())
-            counts = list(data['type_distribution'].values())
-            type_chart.plot_pie_chart(types, counts, 'Equipment Type Distribution')
-            chart_layout.addWidget(type_chart)
-        
-        chart_widget.setLayout(chart_layout)
-        self.scroll_layout.addWidget(chart_widget)
+        self.chart_panel.show_summary(data)
         
         # Table
-        table_label = QLabel('Equipment Details')
-        table_label.setFont(QFont('Arial', 14, QFont.Bold))
-        self.scroll_layout.addWidget(table_label)
-        
-        table = QTableWidget()
-        table.setColumnCount(5)
-        table.setHorizontalHeaderLabels(['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
-        
-        equipment = data.get('equipment', [])
-        table.setRowCount(len(equipment))
-        
-        for i, eq in enumerate(equipment):
-            table.setItem(i, 0, QTableWidgetItem(eq['equipment_name']))
-            table.setItem(i, 1, QTableWidgetItem(eq['equipment_type']))
-            table.setItem(i, 2, QTableWidgetItem(f"{eq['flowrate']:.2f}"))
-            table.setItem(i, 3, QTableWidgetItem(f"{eq['pressure']:.2f}"))
-            table.setItem(i, 4, QTableWidgetItem(f"{eq['temperature']:.2f}"))
-        
-        table.resizeColumnsToContents()
-        self.scroll_layout.addWidget(table)
+        if 'equipment' in data:
+            self.table_model.set_rows(data['equipment'], data['total_records'])
+        else:
+            self.table_model.load(data['id'], data['total_records'])
+    
+    def on_table_filter_changed(self, text):
+        self.table_model.set_filter(text)
+    
+    def update_table_count(self):
+        model = self.table_model
+        shown, loaded, total = model.rowCount(), model.loaded_rows(), model.total_rows()
+        text = f'{shown:,} shown' if shown != loaded else f'{loaded:,} rows'
+        if loaded < total and model.has_more():
+            text += f' ({loaded:,} of {total:,} loaded, scroll for more)'
+        elif loaded < total:
+            text += f' (first {loaded:,} of {total:,})'
+        self.table_count_label.setText(text)
     
     def download_pdf(self):
         if not self.selected_dataset:
@@ -523,26 +805,13 @@ class MainWidget(QWidget):
         
         dataset_id = self.selected_dataset['id']
         
-        try:
-            response = requests.get(
-                f'{API_URL}/datasets/{dataset_id}/generate_pdf/',
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                filename, _ = QFileDialog.getSaveFileName(
-                    self, 'Save PDF', f'equipment_report_{dataset_id}.pdf',
-                    'PDF Files (*.pdf)'
-                )
-                
-                if filename:
-                    with open(filename, 'wb') as f:
-                        f.write(response.content)
-                    QMessageBox.information(self, 'Success', 'PDF downloaded successfully!')
-            else:
-                self.show_error('Failed to download PDF')
-        except Exception as e:
-            self.show_error(str(e))
+        # Ask first, so the report can stream straight into the chosen file
+        filename, _ = QFileDialog.getSaveFileName(
+            self, 'Save PDF', f'equipment_report_{dataset_id}.pdf',
+            'PDF Files (*.pdf)'
+        )
+        if filename:
+            self.downloads.add(f'/datasets/{dataset_id}/generate_pdf/', filename)
     
     def show_error(self, message):
         QMessageBox.warning(self, 'Error', message)
@@ -558,43 +827,81 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
         
+        # One pooled HTTP session and worker pool shared by every screen
+        self.client = ApiClient(API_URL)
+        self.executor = RequestExecutor(self.client, parent=self)
+        # Downloads queue on their own threads instead of starving API calls
+        self.download_executor = RequestExecutor(self.client, max_threads=2, parent=self)
+        
         # Login widget
-        self.login_widget = LoginWidget()
+        self.login_widget = LoginWidget(self.executor)
         self.login_widget.login_success.connect(self.on_login_success)
+        self.login_widget.work_offline.connect(self.on_work_offline)
         self.stack.addWidget(self.login_widget)
         
         self.main_widget = None
     
     def on_login_success(self, token):
+        self.client.set_token(token)
+        self.show_main_widget(self.open_cache(token), offline=False)
+    
+    def on_work_offline(self):
+        self.show_main_widget(None, offline=True)
+    
+    def show_main_widget(self, cache, offline):
         if self.main_widget:
             self.stack.removeWidget(self.main_widget)
+            self.main_widget.deleteLater()
         
-        self.main_widget = MainWidget(token)
+        self.main_widget = MainWidget(
+            self.client, self.executor, cache, self.download_executor,
+            self.open_local_store(), offline
+        )
         self.main_widget.logout.connect(self.on_logout)
         self.stack.addWidget(self.main_widget)
         self.stack.setCurrentWidget(self.main_widget)
     
+    def open_cache(self, token):
+        """Per server and account cache directory, so accounts never see each other's data"""
+        base = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        namespace = hashlib.sha1(f'{API_URL}|{token}'.encode()).hexdigest()[:16]
+        return DatasetCache(f'{base}/datasets/{namespace}', CACHE_MAX_BYTES)
+    
+    def open_local_store(self):
+        """Local analyses are kept per machine user, whichever account syncs them"""
+        base = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        return LocalStore(f'{base}/local_analyses')
+    
     def on_logout(self):
+        self.executor.cancel()
+        self.download_executor.cancel()
+        self.client.set_token(None)
         self.stack.setCurrentWidget(self.login_widget)
-
-   
+    
+    def closeEvent(self, event):
+        """Stop in-flight requests before the window goes away"""
+        if self.main_widget:
+            self.main_widget.events.stop()
+        self.download_executor.shutdown(close_client=False)
+        self.executor.shutdown()
+        event.accept()
 
 
 if __name__ == '__main__':
+    # Local analysis starts worker processes; needed when frozen with PyInstaller
+    multiprocessing.freeze_support()
+    # --measure-startup prints startup timings to stderr and exits once preloading is done
+    measure_startup = '--measure-startup' in sys.argv
+    monitor = StartupMonitor(_STARTED)
+    monitor.mark('imports')
     app = QApplication(sys.argv)
+    app.setApplicationName('Chemical Equipment Visualizer')
+    monitor.mark('QApplication')
     window = MainWindow()
+    monitor.watch(window.login_widget)
     window.show()
+    monitor.mark('login window shown')
+    monitor.first_painted.connect(monitor.preload)
+    if measure_startup:
+        monitor.preloaded.connect(lambda: (monitor.report(), app.quit()))
     sys.exit(app.exec_())
-
-class MainWindow(QMainWindow):
-    # ... existing code ...
-    
-    def closeEvent(self, event):
-        """Handle window close event"""
-        # Stop any running workers
-        if hasattr(self, 'main_widget') and self.main_widget:
-            if hasattr(self.main_widget, 'worker'):
-                if self.main_widget.worker and self.main_widget.worker.isRunning():
-                    self.main_widget.worker.quit()
-                    self.main_widget.worker.wait(1000)
-        event.accept()
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Queued file downloads, streamed to disk on worker threads"""
+import os
+import time
+
+from PyQt5.QtWidgets import QGroupBox, QHBoxLayout, QLabel, QProgressBar, QPushButton, QVBoxLayout, QWidget
+
+from api_client import ApiError, error_message
+from uploads import PROGRESS_INTERVAL
+
+CHUNK_SIZE = 64 * 1024
+# Reports are rendered on demand, before the first byte is sent
+DOWNLOAD_RESPONSE_TIMEOUT = 15 * 60
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+def download_to_file(client, task, path, target):
+    """
+    Stream GET ``path`` into ``target`` through ``target.part``, emitting task.signals.progress.
+
+    The file only appears under its final name once complete; a cancelled or
+    failed download removes the partial file.
+    """
+    partial = f'{target}.part'
+    response = client.request('GET', path, stream=True, timeout=(client.timeout, DOWNLOAD_RESPONSE_TIMEOUT))
+    with response:
+        if response.status_code != 200:
+            raise ApiError(error_message(response, 'Download failed'), response.status_code)
+        total = int(response.headers.get('Content-Length') or 0)
+        received = 0
+        reported_at = 0.0
+        try:
+            with open(partial, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if task.cancelled:
+                        raise DownloadCancelled()
+                    f.write(chunk)
+                    received += len(chunk)
+                    now = time.monotonic()
+                    if now - reported_at >= PROGRESS_INTERVAL:
+                        reported_at = now
+                        task.signals.progress.emit(received, total)
+            os.replace(partial, target)
+        except BaseException:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            raise
+    task.signals.progress.emit(received, total or received)
+    return target
+
+
+class DownloadRow(QWidget):
+    """One entry of the download queue: name, status, progress bar and cancel button"""
+
+    def __init__(self, name, parent=None):
+        super().__init__(parent)
+        self.finished = False
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.label = QLabel(name)
+        self.label.setWordWrap(True)
+        layout.addWidget(self.label)
+
+        controls = QHBoxLayout()
+        # Indeterminate until the size is known; QProgressBar holds an int, so permille
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        controls.addWidget(self.progress_bar, 1)
+        self.cancel_btn = QPushButton('Cancel')
+        controls.addWidget(self.cancel_btn)
+        layout.addLayout(controls)
+
+        self.status_label = QLabel('Waiting for server...')
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+    def on_progress(self, received, total):
+        if total:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(received * 1000 // total)
+            self.status_label.setText(f'{received / 1e6:,.1f} of {total / 1e6:,.1f} MB')
+        else:
+            self.status_label.setText(f'{received / 1e6:,.1f} MB')
+
+    def on_finished(self, target):
+        self.finish('Saved')
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(1000)
+
+    def on_error(self, error):
+        self.finish(f'Failed: {error}')
+
+    def finish(self, status):
+        self.finished = True
+        self.status_label.setText(status)
+        self.cancel_btn.hide()
+        if self.progress_bar.maximum() == 0:
+            self.progress_bar.setRange(0, 1000)
+
+
+class DownloadQueue(QGroupBox):
+    """
+    Downloads in progress and recently finished.
+
+    They run on their own executor, so at most its thread count are active
+    and the rest wait their turn without blocking other API calls.
+    """
+
+    def __init__(self, executor, parent=None):
+        super().__init__('Downloads', parent)
+        self.executor = executor
+        layout = QVBoxLayout()
+        self.rows_layout = QVBoxLayout()
+        layout.addLayout(self.rows_layout)
+        self.clear_btn = QPushButton('Clear Finished')
+        self.clear_btn.clicked.connect(self.clear_finished)
+        layout.addWidget(self.clear_btn)
+        self.setLayout(layout)
+        self.hide()
+
+    def add(self, path, target):
+        row = DownloadRow(os.path.basename(target))
+        self.executor.submit_call(
+            lambda client, task: download_to_file(client, task, path, target),
+            row.on_finished, row.on_error, group=row, on_progress=row.on_progress
+        )
+        row.cancel_btn.clicked.connect(lambda: self.cancel(row))
+        self.rows_layout.addWidget(row)
+        self.show()
+
+    def cancel(self, row):
+        self.executor.cancel(row)
+        row.finish('Cancelled')
+
+    def clear_finished(self):
+        for i in reversed(range(self.rows_layout.count())):
+            row = self.rows_layout.itemAt(i).widget()
+            if row.finished:
+                self.rows_layout.takeAt(i)
+                row.deleteLater()
+        if not self.rows_layout.count():
+            self.hide()
@@ -0,0 +1,117 @@
+"""The account's server-sent event stream, followed on a background thread"""
+import json
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from api_client import error_message
+
+EVENTS_PATH = '/async/events/'
+# The server sends a keep-alive comment every 15 s, so a longer silence means a dead connection
+READ_TIMEOUT = 45
+RETRY_SECONDS = 3
+MAX_RETRY_SECONDS = 60
+# Statuses meaning the server can't stream events at all, e.g. the WSGI
+# development server answers 503; retrying won't help
+UNAVAILABLE_STATUSES = (401, 403, 404, 405, 501, 503)
+
+
+class EventStream(QObject):
+    """
+    Follows the event stream and emits each event as received(name, data).
+
+    The server ends streams every few minutes; they are resumed with
+    Last-Event-ID, so no event is missed, and dropped connections are retried
+    with backoff. ``connected`` says whether events are arriving right now:
+    while it is False, callers should fall back to reloading what they show.
+    unavailable is emitted, and the stream given up, when the server can't
+    stream events.
+    """
+    received = pyqtSignal(str, object)
+    unavailable = pyqtSignal(str)
+
+    def __init__(self, client, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.connected = False
+        self.last_event_id = None
+        self.retry = RETRY_SECONDS
+        self._stop = threading.Event()
+        self._response = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='events', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            # Wakes the thread up from its blocking read
+            response.close()
+
+    def _run(self):
+        delay = self.retry
+        while not self._stop.is_set():
+            try:
+                ended = self._follow()
+            except Exception:
+                # Unreachable server, dropped connection or stop() closing the response
+                ended = False
+            finally:
+                self._response = None
+                self.connected = False
+            if ended is None:
+                return
+            # A stream the server ended is resumed right away; failures back off
+            delay = self.retry if ended else min(delay * 2, MAX_RETRY_SECONDS)
+            self._stop.wait(delay)
+
+    def _follow(self):
+        """Read one stream until it ends; returns True when it ended cleanly, None to give up"""
+        headers = {'Accept': 'text/event-stream'}
+        if self.last_event_id is not None:
+            headers['Last-Event-ID'] = self.last_event_id
+        response = self.client.request(
+            'GET', EVENTS_PATH, stream=True, headers=headers, timeout=(self.client.timeout, READ_TIMEOUT)
+        )
+        with response:
+            if response.status_code in UNAVAILABLE_STATUSES:
+                self.unavailable.emit(error_message(response, 'Event stream unavailable'))
+                return None
+            if response.status_code != 200:
+                return False
+            self._response = response
+            if self._stop.is_set():
+                return None
+            self.connected = True
+            response.encoding = 'utf-8'
+            self._read(response)
+        return True
+
+    def _read(self, response):
+        name, data, event_id = 'message', [], None
+        for line in response.iter_lines(decode_unicode=True):
+            if self._stop.is_set():
+                return
+            if not line:
+                # A blank line dispatches the event gathered so far
+                if event_id is not None:
+                    self.last_event_id = event_id
+                if data:
+                    self.received.emit(name, json.loads('\n'.join(data)))
+                name, data, event_id = 'message', [], None
+                continue
+            field, _, value = line.partition(':')
+            if value.startswith(' '):
+                value = value[1:]
+            if field == 'event':
+                name = value
+            elif field == 'data':
+                data.append(value)
+            elif field == 'id':
+                event_id = value
+            elif field == 'retry' and value.isdigit():
+                self.retry = int(value) / 1000
@@ -0,0 +1,197 @@
+"""
+Offline analysis of equipment CSVs.
+
+Reads files in the format accepted by the upload endpoint and computes what
+the server would: the dataset summary (averages, type distribution) and the
+/aggregates/ payload (column stats, per-type averages, histograms). Files are
+parsed in chunks, so their size is bounded by disk rather than memory, and
+several files are analyzed in parallel worker processes.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+# CSV column -> field name used by the API
+NUMERIC_COLUMNS = {'Flowrate': 'flowrate', 'Pressure': 'pressure', 'Temperature': 'temperature'}
+DEFAULT_BINS = 10
+CHUNK_ROWS = 200_000
+# Rows kept for the table; the statistics always cover the whole file
+PREVIEW_ROWS = 5000
+
+
+class LocalAnalysisError(Exception):
+    pass
+
+
+def _read_chunks(path, chunk_rows):
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing_columns:
+        raise LocalAnalysisError(f'Missing columns: {", ".join(missing_columns)}')
+    dtypes = {'Equipment Name': str, 'Type': str, **{col: 'float64' for col in NUMERIC_COLUMNS}}
+    try:
+        for chunk in pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows):
+            # Same cleaning as the upload endpoint: rows with a gap in any column,
+            # extra columns included, are dropped
+            yield chunk.dropna()[REQUIRED_COLUMNS]
+    except ValueError as e:
+        raise LocalAnalysisError(str(e)) from e
+
+
+def analyze_csv(path, bins=DEFAULT_BINS, chunk_rows=CHUNK_ROWS):
+    """
+    Summary and aggregates of one CSV, shaped like the summary and /aggregates/ responses.
+
+    Two passes over the file: the first gathers counts, sums and ranges, the
+    second fills histogram buckets, which need each column's range up front.
+    """
+    import numpy as np
+
+    numeric = list(NUMERIC_COLUMNS)
+    count = 0
+    sums = np.zeros(len(numeric))
+    mins = np.full(len(numeric), np.inf)
+    maxs = np.full(len(numeric), -np.inf)
+    by_type = {}
+    preview = []
+
+    for chunk in _read_chunks(path, chunk_rows):
+        if chunk.empty:
+            continue
+        values = chunk[numeric].to_numpy()
+        if len(preview) < PREVIEW_ROWS:
+            for offset, row in enumerate(chunk.head(PREVIEW_ROWS - len(preview)).itertuples(index=False)):
+                preview.append({
+                    'id': count + offset + 1,
+                    'equipment_name': row[0],
+                    'equipment_type': row[1],
+                    **{field: float(row[2 + i]) for i, field in enumerate(NUMERIC_COLUMNS.values())},
+                })
+        count += len(values)
+        sums += values.sum(axis=0)
+        mins = np.minimum(mins, values.min(axis=0))
+        maxs = np.maximum(maxs, values.max(axis=0))
+        grouped = chunk.groupby('Type', sort=False)[numeric]
+        for equipment_type, type_sums in grouped.sum().iterrows():
+            entry = by_type.setdefault(equipment_type, [0, np.zeros(len(numeric))])
+            entry[1] += type_sums.to_numpy()
+        for equipment_type, size in grouped.size().items():
+            by_type[equipment_type][0] += int(size)
+
+    if not count:
+        raise LocalAnalysisError('No complete rows to analyze')
+
+    # Bucketing as the server does it: truncate, with the maximum in the last bucket
+    counts = {col: np.zeros(bins, dtype=np.int64) for col in numeric}
+    for chunk in _read_chunks(path, chunk_rows):
+        for i, col in enumerate(numeric):
+            low, high = mins[i], maxs[i]
+            if low == high or chunk.empty:
+                continue
+            buckets = ((chunk[col].to_numpy() - low) * bins / (high - low)).astype(np.int64)
+            counts[col] += np.bincount(np.minimum(buckets, bins - 1), minlength=bins)
+
+    averages = sums / count
+    histograms = {}
+    for i, (col, field) in enumerate(NUMERIC_COLUMNS.items()):
+        low, high = float(mins[i]), float(maxs[i])
+        if low == high:
+            histograms[field] = {'edges': [low, high], 'counts': [count]}
+        else:
+            width = (high - low) / bins
+            histograms[field] = {
+                'edges': [low + width * b for b in range(bins)] + [high],
+                'counts': counts[col].tolist(),
+            }
+
+    ordered_types = sorted(by_type.items(), key=lambda item: -item[1][0])
+    result = {
+        'id': f'local-{uuid.uuid4().hex[:12]}',
+        'local': True,
+        'path': os.path.abspath(path),
+        'filename': os.path.basename(path),
+        'uploaded_at': datetime.now(timezone.utc).isoformat(),
+        'total_records': count,
+        **{f'avg_{field}': float(averages[i]) for i, field in enumerate(NUMERIC_COLUMNS.values())},
+        'type_distribution': {name: size for name, (size, _) in ordered_types},
+        'equipment': preview,
+    }
+    result['aggregates'] = {
+        'total_records': count,
+        'columns': {
+            field: {'min': float(mins[i]), 'max': float(maxs[i]), 'avg': float(averages[i])}
+            for i, field in enumerate(NUMERIC_COLUMNS.values())
+        },
+        'by_type': {
+            name: {
+                'count': size,
+                **{f'avg_{field}': float(type_sums[i] / size) for i, field in enumerate(NUMERIC_COLUMNS.values())},
+            }
+            for name, (size, type_sums) in ordered_types
+        },
+        'histograms': histograms,
+    }
+    return result
+
+
+def analyze_files(paths, bins=DEFAULT_BINS, max_workers=None):
+    """
+    Analyze several CSVs in worker processes, yielding (path, result, error) as each finishes.
+
+    Workers are spawned rather than forked, since the GUI process has threads.
+    Closing the generator early cancels the files not started yet.
+    """
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = {pool.submit(analyze_csv, path, bins): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LocalStore:
+    """
+    Local analysis results kept on disk until they are synced to the server.
+
+    One JSON file per result; safe to use from worker threads.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def save(self, result):
+        path = self.directory / f'{result["id"]}.json'
+        tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+    def load_all(self):
+        """Stored results, most recently analyzed first"""
+        results = []
+        with self._lock:
+            for path in self.directory.glob('local-*.json'):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        results.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(results, key=lambda result: result['uploaded_at'], reverse=True)
+
+    def remove(self, result_id):
+        (self.directory / f'{result_id}.json').unlink(missing_ok=True)
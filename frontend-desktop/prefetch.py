@@ -0,0 +1,65 @@
+"""Background prefetching of dataset responses into the desktop cache"""
+from PyQt5.QtCore import QObject
+
+from dataset_cache import fetch_cached
+
+
+class PrefetchScheduler(QObject):
+    """
+    Warms the DatasetCache for the listed datasets so opening one needs no round trip.
+
+    Each dataset contributes a few (path, cache key) requests. At most
+    ``max_in_flight`` run at a time, leaving executor threads free for what
+    the user asks for; prioritize() moves a dataset's pending requests to the
+    front of the queue, e.g. when its list entry is hovered. Requests are
+    conditional, so already cached entries cost a 304 at most. Failures are
+    ignored: the user's own request will report them.
+    """
+
+    def __init__(self, executor, cache, max_in_flight=2, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self._queue = []
+        self._in_flight = set()
+
+    def schedule(self, jobs):
+        """Replace the queue with ``jobs``: (dataset_id, [(path, key), ...]) in list order"""
+        self.clear()
+        self._queue = [(dataset_id, path, key) for dataset_id, requests in jobs for path, key in requests]
+        self._start_next()
+
+    def prioritize(self, dataset_id):
+        first = [job for job in self._queue if job[0] == dataset_id]
+        if first:
+            self._queue = first + [job for job in self._queue if job[0] != dataset_id]
+
+    def discard(self, dataset_id):
+        """Drop a dataset's pending requests, e.g. once it is being fetched in the foreground"""
+        self._queue = [job for job in self._queue if job[0] != dataset_id]
+
+    def clear(self):
+        self._queue = []
+        self.executor.cancel('prefetch')
+        self._in_flight.clear()
+
+    def pending(self):
+        return len(self._queue) + len(self._in_flight)
+
+    def _start_next(self):
+        cache = self.cache
+        while self._queue and len(self._in_flight) < self.max_in_flight:
+            _, path, key = self._queue.pop(0)
+            # Unique per submission, so a cancelled run finishing late can't free a slot
+            ticket = object()
+            self._in_flight.add(ticket)
+            self.executor.submit_call(
+                lambda client, task, path=path, key=key: fetch_cached(client, cache, path, key),
+                group='prefetch', on_done=lambda ticket=ticket: self._on_done(ticket)
+            )
+
+    def _on_done(self, ticket):
+        if ticket in self._in_flight:
+            self._in_flight.discard(ticket)
+            self._start_next()
@@ -0,0 +1,69 @@
+"""Startup timing, and background preloading of modules the login screen doesn't need"""
+import importlib
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer, pyqtSignal
+
+# Needed only once the user has logged in; imported on a background thread
+# after the login window has painted, so they are usually ready by then
+PRELOAD_MODULES = (
+    'requests',
+    'numpy',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_qt5agg',
+    'charts',
+    'table_model',
+)
+
+
+class StartupMonitor(QObject):
+    """
+    Records startup milestones relative to ``started`` (a perf_counter value).
+
+    Emits first_painted after the watched widget's first paint has been
+    handled and preloaded once the background imports are done.
+    """
+    first_painted = pyqtSignal()
+    preloaded = pyqtSignal()
+
+    def __init__(self, started, parent=None):
+        super().__init__(parent)
+        self.started = started
+        self.marks = []
+        self.module_times = {}
+        self._painted = False
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.started))
+
+    def watch(self, widget):
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self._painted:
+            self._painted = True
+            self.mark('first paint')
+            obj.removeEventFilter(self)
+            # Let the paint finish before starting anything else
+            QTimer.singleShot(0, self.first_painted.emit)
+        return False
+
+    def preload(self, modules=PRELOAD_MODULES):
+        thread = threading.Thread(target=self._preload, args=(modules,), name='preload', daemon=True)
+        thread.start()
+
+    def _preload(self, modules):
+        for name in modules:
+            start = time.perf_counter()
+            importlib.import_module(name)
+            self.module_times[name] = time.perf_counter() - start
+        self.mark('preload finished')
+        self.preloaded.emit()
+
+    def report(self, stream=sys.stderr):
+        for name, seconds in self.marks:
+            print(f'startup  {name:<36} {seconds * 1000:8.1f} ms', file=stream)
+        for name, seconds in self.module_times.items():
+            print(f'preload  {name:<36} {seconds * 1000:8.1f} ms', file=stream)
@@ -0,0 +1,208 @@
+"""Virtualized equipment table: a NumPy-backed model fetching rows page by page"""
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+HEADERS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+NUMERIC_FIELDS = ('flowrate', 'pressure', 'temperature')
+PAGE_SIZE = 5000
+
+
+class EquipmentTableModel(QAbstractTableModel):
+    """
+    Equipment rows held in column arrays and formatted only when a cell is painted.
+
+    Rows are either set all at once or fetched from the server page by page as
+    the view scrolls (canFetchMore/fetchMore). Sorting and filtering work on
+    the rows loaded so far through an index permutation, never by moving data.
+    """
+
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self._generation = 0
+        # Filter and sort order carry over when another dataset is loaded
+        self._filter = ''
+        self._sort = None
+        self._clear()
+
+    def _clear(self):
+        self._size = 0
+        self._names = np.empty(0, dtype=object)
+        self._types = np.empty(0, dtype=object)
+        self._values = np.empty((0, 3), dtype=np.float64)
+        self._lowered = None
+        self._view = None
+        self._dataset_id = None
+        self._total = 0
+        self._next = None
+        self._loading = False
+
+    # Loading
+
+    def set_rows(self, rows, total=None):
+        """Replace the contents with a list of row dicts, out of ``total`` when it is a preview"""
+        self.executor.cancel('table')
+        self._generation += 1
+        self.beginResetModel()
+        self._clear()
+        self._total = total or 0
+        self._append(rows)
+        self._apply_view()
+        self.endResetModel()
+
+    def load(self, dataset_id, total):
+        """Replace the contents with a dataset whose rows are fetched on demand"""
+        self.executor.cancel('table')
+        self._generation += 1
+        self.beginResetModel()
+        self._clear()
+        self._dataset_id = dataset_id
+        self._total = total
+        self._next = 0
+        self._apply_view()
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._next is not None and not self._loading
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        generation = self._generation
+        self.executor.submit(
+            'GET', f'/datasets/{self._dataset_id}/equipment/',
+            on_finished=lambda page: self._on_page(generation, page),
+            on_error=lambda error: self._on_page_error(generation),
+            group='table',
+            params={'after': self._next, 'limit': PAGE_SIZE}
+        )
+
+    def _on_page(self, generation, page):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._next = page['next']
+        rows = page['results']
+        if not rows:
+            return
+        if self._view is None:
+            self.beginInsertRows(QModelIndex(), self._size, self._size + len(rows) - 1)
+            self._append(rows)
+            self.endInsertRows()
+        else:
+            # Sorted or filtered: new rows can land anywhere in the view
+            self.layoutAboutToBeChanged.emit()
+            self._append(rows)
+            self._apply_view()
+            self.layoutChanged.emit()
+
+    def _on_page_error(self, generation):
+        if generation == self._generation:
+            # Allow the view to retry on its next scroll
+            self._loading = False
+
+    def _append(self, rows):
+        count = len(rows)
+        needed = self._size + count
+        if needed > len(self._names):
+            # Grow geometrically so repeated pages stay amortized O(1) per row
+            capacity = max(needed, 2 * len(self._names), PAGE_SIZE)
+            self._names = _grow(self._names, capacity)
+            self._types = _grow(self._types, capacity)
+            self._values = _grow(self._values, capacity)
+        start, end = self._size, needed
+        self._names[start:end] = [row['equipment_name'] for row in rows]
+        self._types[start:end] = [row['equipment_type'] for row in rows]
+        self._values[start:end] = [[row[field] for field in NUMERIC_FIELDS] for row in rows]
+        self._size = needed
+        self._lowered = None
+
+    # Sorting and filtering
+
+    def set_filter(self, text):
+        self.beginResetModel()
+        self._filter = text.strip().lower()
+        self._apply_view()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        # Column -1 (as QTableView.sortByColumn(-1) passes) restores the server order
+        self._sort = (column, order) if column >= 0 else None
+        self._apply_view()
+        self.layoutChanged.emit()
+
+    def _apply_view(self):
+        if not self._filter and self._sort is None:
+            self._view = None
+            return
+        indices = np.arange(self._size)
+        if self._filter:
+            names, types = self._lowercase_columns()
+            mask = (np.char.find(names, self._filter) >= 0) | (np.char.find(types, self._filter) >= 0)
+            indices = indices[mask]
+        if self._sort is not None:
+            column, order = self._sort
+            if column >= 2:
+                keys = self._values[indices, column - 2]
+            else:
+                keys = self._lowercase_columns()[column][indices]
+            indices = indices[np.argsort(keys, kind='stable')]
+            if order == Qt.DescendingOrder:
+                indices = indices[::-1]
+        self._view = indices
+
+    def _lowercase_columns(self):
+        if self._lowered is None:
+            names = self._names[:self._size].astype(str)
+            types = self._types[:self._size].astype(str)
+            self._lowered = (np.char.lower(names), np.char.lower(types))
+        return self._lowered
+
+    # Model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._size if self._view is None else len(self._view)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row() if self._view is None else int(self._view[index.row()])
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self._names[row]
+            if column == 1:
+                return self._types[row]
+            return f'{self._values[row, column - 2]:.2f}'
+        if role == Qt.TextAlignmentRole and column >= 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def has_more(self):
+        """Whether further pages can still be fetched from the server"""
+        return self._next is not None
+
+    def loaded_rows(self):
+        return self._size
+
+    def total_rows(self):
+        return self._total or self._size
+
+
+def _grow(array, capacity):
+    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
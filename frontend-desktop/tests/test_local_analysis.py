@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_analysis import LocalAnalysisError, analyze_csv  # noqa: E402
+
+CSV = (
+    'Equipment Name,Type,Flowrate,Pressure,Temperature,Notes\n'
+    'Pump-1,Pump,10,2,100,checked\n'
+    'Pump-2,Pump,,2,100,checked\n'
+    'Valve-1,Valve,20,3,110,\n'
+    'Pump-3,Pump,30,4,120,checked\n'
+)
+
+
+class AnalyzeCsvTests(unittest.TestCase):
+    def write(self, content):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as output:
+            output.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_rows_with_any_gap_are_dropped_as_on_upload(self):
+        result = analyze_csv(self.write(CSV))
+
+        self.assertEqual(result['total_records'], 2)
+        self.assertEqual(result['avg_flowrate'], 20.0)
+        self.assertEqual(result['type_distribution'], {'Pump': 2})
+        self.assertEqual([row['equipment_name'] for row in result['equipment']], ['Pump-1', 'Pump-3'])
+
+    def test_statistics_do_not_depend_on_chunking(self):
+        path = self.write(CSV)
+
+        self.assertEqual(
+            analyze_csv(path, chunk_rows=1)['aggregates'], analyze_csv(path, chunk_rows=100)['aggregates']
+        )
+
+    def test_missing_columns(self):
+        with self.assertRaisesRegex(LocalAnalysisError, 'Missing columns: Temperature'):
+            analyze_csv(self.write('Equipment Name,Type,Flowrate,Pressure\nPump-1,Pump,1,2\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
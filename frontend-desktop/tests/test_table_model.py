@@ -0,0 +1,95 @@
+import os
+import sys
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication, QModelIndex, Qt  # noqa: E402
+
+from table_model import EquipmentTableModel  # noqa: E402
+
+ROWS = [
+    {'equipment_name': 'Pump-1', 'equipment_type': 'Pump', 'flowrate': 120.0, 'pressure': 5.2, 'temperature': 110.0},
+    {'equipment_name': 'Valve-1', 'equipment_type': 'Valve', 'flowrate': 60.0, 'pressure': 4.1, 'temperature': 105.0},
+    {'equipment_name': 'Reactor-1', 'equipment_type': 'Reactor', 'flowrate': 150.0, 'pressure': 6.3,
+     'temperature': 140.0},
+]
+
+
+class RecordingExecutor:
+    """Stands in for RequestExecutor: keeps submitted page requests so tests can answer them"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, method, path, on_finished=None, on_error=None, **kwargs):
+        self.submitted.append((path, kwargs.get('params'), on_finished))
+
+    def cancel(self, group=None):
+        pass
+
+
+class EquipmentTableModelTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.executor = RecordingExecutor()
+        self.model = EquipmentTableModel(self.executor)
+
+    def names(self):
+        return [self.model.data(self.model.index(row, 0)) for row in range(self.model.rowCount())]
+
+    def test_rows_keep_server_order_without_a_sort(self):
+        self.model.set_rows(ROWS)
+
+        self.assertEqual(self.names(), ['Pump-1', 'Valve-1', 'Reactor-1'])
+
+    def test_column_minus_one_restores_server_order(self):
+        self.model.set_rows(ROWS)
+        self.model.sort(0, Qt.AscendingOrder)
+        self.assertEqual(self.names(), ['Pump-1', 'Reactor-1', 'Valve-1'])
+
+        self.model.sort(-1, Qt.AscendingOrder)
+
+        self.assertEqual(self.names(), ['Pump-1', 'Valve-1', 'Reactor-1'])
+        self.assertIsNone(self.model._view)
+
+    def test_sorts_numeric_columns_both_ways(self):
+        self.model.set_rows(ROWS)
+
+        self.model.sort(2, Qt.AscendingOrder)
+        self.assertEqual(self.names(), ['Valve-1', 'Pump-1', 'Reactor-1'])
+        self.model.sort(2, Qt.DescendingOrder)
+        self.assertEqual(self.names(), ['Reactor-1', 'Pump-1', 'Valve-1'])
+
+    def test_filter_matches_names_and_types(self):
+        self.model.set_rows(ROWS)
+
+        self.model.set_filter('  VALVE ')
+
+        self.assertEqual(self.names(), ['Valve-1'])
+
+    def test_unsorted_pages_are_appended_without_relayout(self):
+        self.model.sort(-1, Qt.AscendingOrder)
+        self.model.load(7, total=3)
+        layouts = []
+        self.model.layoutChanged.connect(lambda: layouts.append(True))
+
+        path, params, on_finished = self.executor.submitted[-1]
+        on_finished({'results': ROWS[:2], 'next': 2})
+        self.model.fetchMore(QModelIndex())
+        on_finished = self.executor.submitted[-1][2]
+        on_finished({'results': ROWS[2:], 'next': None})
+
+        self.assertEqual(path, '/datasets/7/equipment/')
+        self.assertEqual(self.executor.submitted[-1][1], {'after': 2, 'limit': 5000})
+        self.assertEqual(self.names(), ['Pump-1', 'Valve-1', 'Reactor-1'])
+        self.assertEqual(layouts, [])
+        self.assertFalse(self.model.has_more())
+
+
+if __name__ == '__main__':
+    unittest.main()
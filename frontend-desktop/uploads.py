@@ -0,0 +1,105 @@
+"""Streaming CSV upload: the file is read from disk in chunks while it is sent"""
+import os
+import time
+import uuid
+
+from api_client import ApiError, error_message
+
+# Progress is reported at most this often, in seconds
+PROGRESS_INTERVAL = 0.1
+# The server parses and stores the file only after it has been received
+UPLOAD_RESPONSE_TIMEOUT = 15 * 60
+
+
+class UploadCancelled(Exception):
+    pass
+
+
+class MultipartFileStream:
+    """
+    multipart/form-data body holding one file, produced on demand.
+
+    requests sends any iterable with a length as a streamed body with a
+    Content-Length header, pulling it through read(), so only one chunk of the
+    file is in memory at a time. ``task.cancelled`` is checked before every
+    chunk; raising from read() aborts the request mid-body.
+    """
+
+    def __init__(self, path, field='file', task=None, on_progress=None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        filename = os.path.basename(path).replace('"', '')
+        self._head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n'
+        ).encode()
+        self._tail = f'\r\n--{boundary}--\r\n'.encode()
+        self._file = open(path, 'rb')
+        self._file_size = os.fstat(self._file.fileno()).st_size
+        self._length = len(self._head) + self._file_size + len(self._tail)
+        self._position = 0
+        self._task = task
+        self._on_progress = on_progress
+        self._reported_at = 0.0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        if self._task is not None and self._task.cancelled:
+            raise UploadCancelled()
+        if size is None or size < 0:
+            size = self._length - self._position
+        chunk = b''
+        head_end = len(self._head)
+        file_end = head_end + self._file_size
+        while len(chunk) < size and self._position < self._length:
+            wanted = size - len(chunk)
+            if self._position < head_end:
+                part = self._head[self._position:self._position + wanted]
+            elif self._position < file_end:
+                part = self._file.read(min(wanted, file_end - self._position))
+                if not part:
+                    raise OSError(f'{self._file.name} shrank while it was being uploaded')
+            else:
+                offset = self._position - file_end
+                part = self._tail[offset:offset + wanted]
+            chunk += part
+            self._position += len(part)
+        self._report()
+        return chunk
+
+    def _report(self):
+        if self._on_progress is None:
+            return
+        now = time.monotonic()
+        if now - self._reported_at >= PROGRESS_INTERVAL or self._position == self._length:
+            self._reported_at = now
+            self._on_progress(self._position, self._length)
+
+    def close(self):
+        self._file.close()
+
+
+def upload_csv(client, task, path, params=None):
+    """Stream ``path`` to the upload endpoint, emitting ``task.signals.progress``"""
+    body = MultipartFileStream(path, task=task, on_progress=task.signals.progress.emit)
+    try:
+        response = client.request(
+            'POST', '/datasets/upload/', data=body, params=params,
+            headers={'Content-Type': body.content_type},
+            timeout=(client.timeout, UPLOAD_RESPONSE_TIMEOUT)
+        )
+    finally:
+        body.close()
+    if response.status_code not in (200, 201):
+        raise ApiError(error_message(response, 'Upload failed'), response.status_code)
+    return response.json()
@@ -45,7 +45,7 @@ pip install -r requirements.txt
 
 REM Run migrations
 python manage.py makemigrations equipment
-python manage.py migrate
+python manage.py shards
 
 echo.
 echo √ Backend setup complete!
@@ -49,7 +49,7 @@ fi
 
 # Run migrations
 python manage.py makemigrations equipment
-python manage.py migrate
+python manage.py shards
 
 echo ""
 echo "✓ Backend setup complete!"